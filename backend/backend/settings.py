@@ -49,10 +49,31 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "backend.wsgi.application"
 
+# Форма записи и сообщения о браке идут через очередь с одним писателем и групповой фиксацией.
+WRITE_BEHIND = False
+WRITE_BEHIND_TIMEOUT = 10.0
+
+# Настройки SQLite для режима записи (включаются вместе с WRITE_BEHIND, иначе — умолчания Django).
+SQLITE_WRITE_OPTIONS = {
+    # Выполняется при каждом подключении. WAL: чтение не ждёт запись; synchronous=NORMAL в WAL
+    # не портит базу при сбое, fsync идёт только на контрольных точках, а не на каждый COMMIT.
+    # При отключении питания могут пропасть последние подтверждённые транзакции.
+    "init_command": (
+        "PRAGMA journal_mode=WAL;"
+        "PRAGMA synchronous=NORMAL;"
+        "PRAGMA temp_store=MEMORY;"
+        "PRAGMA cache_size=-20000;"
+    ),
+    # Транзакция сразу берёт блокировку записи и ждёт её, а не падает при повышении.
+    "transaction_mode": "IMMEDIATE",
+    "timeout": 20,
+}
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": SQLITE_WRITE_OPTIONS if WRITE_BEHIND else {},
     }
 }
 
@@ -89,6 +110,29 @@ docs_dist_dir = BASE_DIR.parent / "docs" / "dist"
 if docs_dist_dir.exists():
     STATICFILES_DIRS.append(("dist", docs_dist_dir))
 
+EXPORT_ROOT = BASE_DIR / "exports"
+IMPORT_ROOT = BASE_DIR / "imports"
+
+# Записи старше этого срока команда archive_entries переносит в архив.
+RETENTION_DAYS = 365
+# Ключи Idempotency-Key пакетов шлюзов (IngestBatch) старше этого срока archive_entries удаляет.
+INGEST_KEY_RETENTION_DAYS = 30
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Готовые JSON-ответы API руководителя. Для нескольких процессов можно указать
+    # django.core.cache.backends.filebased.FileBasedCache с LOCATION в папке проекта.
+    "responses": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "responses",
+        "OPTIONS": {"MAX_ENTRIES": 256},
+    },
+}
+
+RESPONSE_CACHE_TIMEOUT = 300
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "monitoring.User"
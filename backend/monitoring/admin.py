@@ -1,7 +1,22 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
 
-from .models import Machine, ProductionEntry, Tool, ToolIssue, User
+from .models import (
+    ArchivedEntry,
+    DailyRollup,
+    ExportJob,
+    GatewayToken,
+    ImportJob,
+    IngestBatch,
+    Machine,
+    MachineAnomaly,
+    ProductionEntry,
+    StockMovement,
+    Tool,
+    ToolForecast,
+    ToolIssue,
+    User,
+)
 
 
 @admin.register(User)
@@ -33,6 +48,19 @@ class ProductionEntryAdmin(admin.ModelAdmin):
     search_fields = ("detail_name", "worker__username", "worker__last_name")
 
 
+@admin.register(ArchivedEntry)
+class ArchivedEntryAdmin(admin.ModelAdmin):
+    list_display = ("recorded_at", "month", "worker", "machine", "detail_name", "parts_made")
+    list_filter = ("month", "machine")
+    search_fields = ("detail_name", "worker__username")
+
+
+@admin.register(DailyRollup)
+class DailyRollupAdmin(admin.ModelAdmin):
+    list_display = ("day", "worker", "machine", "shift", "entries", "parts_made", "defective_parts")
+    list_filter = ("day", "shift", "machine")
+
+
 @admin.register(Tool)
 class ToolAdmin(admin.ModelAdmin):
     list_display = ("name", "stock", "defective_stock", "min_threshold", "location")
@@ -43,3 +71,50 @@ class ToolAdmin(admin.ModelAdmin):
 class ToolIssueAdmin(admin.ModelAdmin):
     list_display = ("recorded_at", "tool", "reported_by", "defective_count")
     list_filter = ("tool", "reported_by")
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ("recorded_at", "tool", "delta", "stock_after", "source")
+    list_filter = ("source",)
+    search_fields = ("tool__name",)
+
+
+@admin.register(ToolForecast)
+class ToolForecastAdmin(admin.ModelAdmin):
+    list_display = ("tool", "basis", "daily_outflow", "days_to_zero", "reorder_on", "computed_at")
+    list_filter = ("basis",)
+    search_fields = ("tool__name",)
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "export_format", "status", "requested_by", "file_size")
+    list_filter = ("status", "export_format")
+    readonly_fields = ("params_key", "data_version", "file_name", "started_at", "finished_at")
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "kind", "status", "requested_by", "accepted", "rejected")
+    list_filter = ("status", "kind")
+    readonly_fields = ("file_name", "position", "lines", "started_at", "finished_at")
+
+
+@admin.register(GatewayToken)
+class GatewayTokenAdmin(admin.ModelAdmin):
+    list_display = ("name", "default_worker", "is_active", "created_at", "last_used_at")
+    list_filter = ("is_active",)
+    readonly_fields = ("token_hash", "created_at", "last_used_at")
+
+
+@admin.register(IngestBatch)
+class IngestBatchAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "gateway", "idempotency_key", "accepted", "rejected")
+    list_filter = ("gateway",)
+
+
+@admin.register(MachineAnomaly)
+class MachineAnomalyAdmin(admin.ModelAdmin):
+    list_display = ("recorded_at", "machine", "kind", "channel", "value", "score")
+    list_filter = ("kind", "channel", "machine")
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, TypeVar
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import rollups
+from .models import Machine, ProductionEntry, Tool, ToolIssue, User
+from .synthetic import SyntheticProfile, generate_entries
+
+T = TypeVar("T")
+
+
+@contextmanager
+def temporary_database() -> Iterator[Path]:
+    old_name = connection.settings_dict["NAME"]
+    test_settings = connection.settings_dict.setdefault("TEST", {})
+    old_test_name = test_settings.get("NAME")
+    with tempfile.TemporaryDirectory(prefix="qm-bench-") as directory:
+        path = Path(directory) / "bench.sqlite3"
+        test_settings["NAME"] = str(path)
+        try:
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            yield path
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            test_settings["NAME"] = old_test_name
+
+
+def seed_entries(
+    count: int,
+    *,
+    seed: int = 42,
+    workers: int = 40,
+    tools: int = 60,
+    issues: int | None = None,
+    batch_size: int = 20000,
+) -> None:
+    rng = np.random.default_rng(seed)
+    profile = SyntheticProfile.default()
+    password = make_password("worker123")
+    with transaction.atomic():
+        machine_objs = Machine.objects.bulk_create(
+            [
+                Machine(name=machine.name, subdivision=f"Цех {index % 3 + 1}")
+                for index, machine in enumerate(profile.machines)
+            ]
+        )
+        worker_objs = User.objects.bulk_create(
+            [
+                User(
+                    username=f"bench{index:03d}",
+                    first_name=f"Сотрудник {index:03d}",
+                    role=User.Role.WORKER,
+                    password=password,
+                )
+                for index in range(workers)
+            ]
+        )
+        tool_objs = Tool.objects.bulk_create(
+            [
+                Tool(
+                    name=f"Инструмент {index:04d}",
+                    stock=int(rng.integers(0, 200)),
+                    min_threshold=int(rng.integers(5, 40)),
+                    location=f"Ряд {chr(65 + index % 6)}",
+                    avg_daily_outflow=Decimal(str(round(float(rng.uniform(0.2, 6.0)), 2))),
+                )
+                for index in range(tools)
+            ]
+        )
+
+    end = timezone.now()
+    for batch in generate_entries(
+        count,
+        profile,
+        {machine.name: machine.pk for machine in machine_objs},
+        [worker.pk for worker in worker_objs],
+        start=end - timedelta(days=365),
+        end=end,
+        seed=seed,
+        batch_size=batch_size,
+    ):
+        with transaction.atomic():
+            ProductionEntry.objects.bulk_create(batch, batch_size=2000)
+
+    issue_count = issues if issues is not None else max(count // 50, 1)
+    ToolIssue.objects.bulk_create(
+        [
+            ToolIssue(
+                tool=tool_objs[int(rng.integers(0, tools))],
+                reported_by=worker_objs[int(rng.integers(0, workers))],
+                defective_count=int(rng.integers(1, 4)),
+            )
+            for _ in range(issue_count)
+        ],
+        batch_size=2000,
+    )
+    rollups.rebuild()
+
+
+def measure_peak(fn: Callable[[], T]) -> tuple[T, int]:
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("Б", "КБ", "МБ"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} ГБ"
+
+
+class QueryRecorder:
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+def percentile(samples: list[float], q: float) -> float:
+    return float(np.percentile(np.asarray(samples), q)) if samples else 0.0
+
+
+def parse_scale(value: str) -> int:
+    text = value.strip().lower().replace("_", "")
+    multiplier = 1
+    if text.endswith("k"):
+        multiplier, text = 1_000, text[:-1]
+    elif text.endswith("m"):
+        multiplier, text = 1_000_000, text[:-1]
+    return int(float(text) * multiplier)
+
+
+def drain(response: Any) -> int:
+    if getattr(response, "streaming", False):
+        size = sum(len(chunk) for chunk in response.streaming_content)
+        response.close()
+        return size
+    return len(response.content)
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Callable
+from datetime import datetime
+from functools import wraps
+
+from django.db.models import Model
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .models import TableVersion
+
+TableState = tuple[dict[str, int], datetime | None]
+
+
+def tracked_tables(models: tuple[type[Model], ...]) -> tuple[str, ...]:
+    return tuple(model._meta.label_lower for model in models)
+
+
+def table_state(request: HttpRequest, tables: tuple[str, ...]) -> TableState | None:
+    """Версии таблиц для запроса руководителя; читаются один раз на запрос."""
+    user = request.user
+    if not user.is_authenticated or not user.is_manager():
+        return None
+    cache = request.__dict__.setdefault("_table_state", {})
+    if tables not in cache:
+        cache[tables] = TableVersion.state(tables)
+    return cache[tables]
+
+
+def state_digest(request: HttpRequest, tables: tuple[str, ...]) -> str | None:
+    state = table_state(request, tables)
+    if state is None:
+        return None
+    versions, _ = state
+    key = ";".join(f"{table}={version}" for table, version in versions.items())
+    key = f"{key}|{request.get_full_path()}"
+    # Формат, выбранный по заголовку Accept, в адресе не виден, но меняет тело ответа.
+    wire_format = getattr(request, "wire_format", None)
+    if wire_format:
+        key = f"{key}|{wire_format}"
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def versioned(*models: type[Model]) -> Callable:
+    """Условный GET по версиям таблиц: неизменившийся опрос стоит одного запроса к TableVersion."""
+    tables = tracked_tables(models)
+
+    def etag(request: HttpRequest, *args, **kwargs) -> str | None:
+        return state_digest(request, tables)
+
+    def last_modified(request: HttpRequest, *args, **kwargs) -> datetime | None:
+        state = table_state(request, tables)
+        return state[1] if state else None
+
+    def decorator(view: Callable[..., HttpResponse]) -> Callable[..., HttpResponse]:
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code not in (200, 304):
+                for header in ("ETag", "Last-Modified"):
+                    if response.has_header(header):
+                        del response[header]
+            elif response.has_header("ETag"):
+                # Браузер хранит ответ, но перед каждым использованием переспрашивает сервер.
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
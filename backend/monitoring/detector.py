@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import math
+from array import array
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from django.db import transaction
+
+from .models import MachineAnomaly, MachineDetectorState, ProductionEntry
+from .scoring import EPS, Thresholds
+
+# Каналы детектора; у доли брака выбросы не ищем — почти все значения нулевые.
+CHANNELS = ("t", "v", "w", "defect_rate")
+OUTLIER_CHANNELS = (True, True, True, False)
+DEFAULT_WINDOW = Thresholds().window
+Z_CRIT = 3.0
+DRIFT_CRIT = 3.0
+MIN_SAMPLES = 10
+
+# Поля состояния на канал, в порядке хранения; следом идёт окно замеров.
+FIELDS = ("pos", "filled", "sum", "sumsq", "ewma", "total", "mean", "m2", "drifting")
+
+
+@dataclass(frozen=True)
+class Finding:
+    kind: str
+    channel: str
+    value: float
+    score: float
+    mean: float
+    std: float
+
+
+def entry_channels(entry: ProductionEntry) -> tuple[float | None, ...]:
+    sensors = (entry.temperature_c, entry.vibration_mm, entry.tool_wear_percent)
+    defect_rate = entry.defective_parts / entry.parts_made if entry.parts_made else None
+    return (*(float(value) if value is not None else None for value in sensors), defect_rate)
+
+
+class RollingDetector:
+    """Скользящие среднее и дисперсия за последние N замеров, EWMA и долгосрочная база (Welford).
+
+    Каждое обновление — O(1): значение, выпадающее из окна, вычитается из сумм.
+    Выброс — |z| > Z_CRIT относительно окна до прихода значения. Дрейф — EWMA-карта:
+    отклонение EWMA от долгосрочного среднего больше DRIFT_CRIT её стандартных ошибок.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW, blob: bytes | None = None) -> None:
+        self.window = window
+        self.alpha = 2.0 / (window + 1)
+        width = len(CHANNELS)
+        if blob:
+            data = array("d")
+            data.frombytes(bytes(blob))
+            header = width * len(FIELDS)
+            self.fields = {
+                name: data[index * width : (index + 1) * width].tolist()
+                for index, name in enumerate(FIELDS)
+            }
+            self.values = data[header:].tolist()
+        else:
+            self.fields = {name: [0.0] * width for name in FIELDS}
+            self.values = [0.0] * (width * window)
+
+    def to_bytes(self) -> bytes:
+        data = array("d")
+        for name in FIELDS:
+            data.extend(self.fields[name])
+        data.extend(self.values)
+        return data.tobytes()
+
+    def observe(self, channels: tuple[float | None, ...]) -> list[Finding]:
+        findings: list[Finding] = []
+        f = self.fields
+        window = self.window
+        for c, x in enumerate(channels):
+            if x is None or not math.isfinite(x):
+                continue
+            filled = int(f["filled"][c])
+            if OUTLIER_CHANNELS[c] and filled >= MIN_SAMPLES:
+                mean = f["sum"][c] / filled
+                std = math.sqrt(max(f["sumsq"][c] / filled - mean * mean, 0.0))
+                if std > EPS:
+                    z = (x - mean) / std
+                    if abs(z) > Z_CRIT:
+                        findings.append(Finding("outlier", CHANNELS[c], x, z, mean, std))
+
+            pos = int(f["pos"][c])
+            slot = c * window + pos
+            if filled == window:
+                old = self.values[slot]
+                f["sum"][c] -= old
+                f["sumsq"][c] -= old * old
+            else:
+                f["filled"][c] = filled + 1
+            self.values[slot] = x
+            f["sum"][c] += x
+            f["sumsq"][c] += x * x
+            pos = (pos + 1) % window
+            f["pos"][c] = pos
+            if pos == 0:
+                # Раз в окно пересчитываем суммы заново, чтобы не копилась ошибка вычитания.
+                chunk = self.values[c * window : (c + 1) * window]
+                f["sum"][c] = math.fsum(chunk)
+                f["sumsq"][c] = math.fsum(value * value for value in chunk)
+
+            total = f["total"][c] + 1
+            f["total"][c] = total
+            delta = x - f["mean"][c]
+            f["mean"][c] += delta / total
+            f["m2"][c] += delta * (x - f["mean"][c])
+            f["ewma"][c] = x if total == 1 else f["ewma"][c] + self.alpha * (x - f["ewma"][c])
+
+            if total >= window:
+                std = math.sqrt(f["m2"][c] / (total - 1))
+                if std > EPS:
+                    z = (f["ewma"][c] - f["mean"][c]) / (
+                        std * math.sqrt(self.alpha / (2 - self.alpha))
+                    )
+                    if not f["drifting"][c] and abs(z) > DRIFT_CRIT:
+                        f["drifting"][c] = 1.0
+                        findings.append(
+                            Finding("drift", CHANNELS[c], f["ewma"][c], z, f["mean"][c], std)
+                        )
+                    elif f["drifting"][c] and abs(z) < DRIFT_CRIT / 2:
+                        f["drifting"][c] = 0.0
+        return findings
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        f = self.fields
+        result: dict[str, dict[str, Any]] = {}
+        for c, name in enumerate(CHANNELS):
+            filled = int(f["filled"][c])
+            total = int(f["total"][c])
+            mean = f["sum"][c] / filled if filled else None
+            variance = max(f["sumsq"][c] / filled - mean * mean, 0.0) if filled else None
+            result[name] = {
+                "window_count": filled,
+                "rolling_mean": mean,
+                "rolling_std": math.sqrt(variance) if variance is not None else None,
+                "ewma": f["ewma"][c] if total else None,
+                "baseline_mean": f["mean"][c] if total else None,
+                "baseline_std": math.sqrt(f["m2"][c] / (total - 1)) if total > 1 else None,
+                "drifting": bool(f["drifting"][c]),
+            }
+        return result
+
+
+def _anomaly(entry: ProductionEntry, finding: Finding) -> MachineAnomaly:
+    return MachineAnomaly(
+        machine_id=entry.machine_id,
+        entry=entry,
+        kind=finding.kind,
+        channel=finding.channel,
+        value=finding.value,
+        score=finding.score,
+        baseline_mean=finding.mean,
+        baseline_std=finding.std,
+        recorded_at=entry.recorded_at,
+    )
+
+
+def observe_entries(
+    entries: Iterable[ProductionEntry], window: int | None = None
+) -> list[MachineAnomaly]:
+    """Прогоняет новые записи через детекторы их станков; вызывается внутри транзакции записи.
+
+    Без window сохранённое состояние продолжается со своим окном (его задаёт
+    rebuild_detectors --window); новое состояние получает окно по умолчанию.
+    """
+    by_machine: dict[int, list[ProductionEntry]] = defaultdict(list)
+    for entry in entries:
+        by_machine[entry.machine_id].append(entry)
+    if not by_machine:
+        return []
+
+    with transaction.atomic():
+        states = MachineDetectorState.objects.in_bulk(list(by_machine))
+        anomalies: list[MachineAnomaly] = []
+        for machine_id, machine_entries in by_machine.items():
+            state = states.get(machine_id)
+            if state is None or (window is not None and state.window != window):
+                size = window or DEFAULT_WINDOW
+                state = MachineDetectorState(machine_id=machine_id, window=size)
+                detector = RollingDetector(size)
+            else:
+                detector = RollingDetector(state.window, state.state)
+            for entry in machine_entries:
+                anomalies.extend(
+                    _anomaly(entry, finding) for finding in detector.observe(entry_channels(entry))
+                )
+            state.state = detector.to_bytes()
+            state.observations += len(machine_entries)
+            state.last_entry = machine_entries[-1]
+            state.save()
+        MachineAnomaly.objects.bulk_create(anomalies)
+    return anomalies
+
+
+def rebuild(window: int = DEFAULT_WINDOW, batch_size: int = 5000) -> int:
+    """Пересчитывает состояния и аномалии по всей истории в порядке времени записи."""
+    detectors: dict[int, RollingDetector] = {}
+    counts: dict[int, int] = defaultdict(int)
+    last: dict[int, int] = {}
+    anomalies: list[MachineAnomaly] = []
+    total = 0
+    with transaction.atomic():
+        MachineAnomaly.objects.all().delete()
+        MachineDetectorState.objects.all().delete()
+        entries = (
+            ProductionEntry.objects.order_by("recorded_at", "id")
+            .only(
+                "id",
+                "machine_id",
+                "recorded_at",
+                "parts_made",
+                "defective_parts",
+                "temperature_c",
+                "vibration_mm",
+                "tool_wear_percent",
+            )
+            .iterator(chunk_size=batch_size)
+        )
+        for entry in entries:
+            detector = detectors.get(entry.machine_id)
+            if detector is None:
+                detector = detectors[entry.machine_id] = RollingDetector(window)
+            for finding in detector.observe(entry_channels(entry)):
+                anomalies.append(_anomaly(entry, finding))
+            counts[entry.machine_id] += 1
+            last[entry.machine_id] = entry.pk
+            total += 1
+            if len(anomalies) >= batch_size:
+                MachineAnomaly.objects.bulk_create(anomalies)
+                anomalies.clear()
+        MachineAnomaly.objects.bulk_create(anomalies)
+        MachineDetectorState.objects.bulk_create(
+            [
+                MachineDetectorState(
+                    machine_id=machine_id,
+                    window=window,
+                    observations=counts[machine_id],
+                    last_entry_id=last[machine_id],
+                    state=detector.to_bytes(),
+                )
+                for machine_id, detector in detectors.items()
+            ]
+        )
+    return total
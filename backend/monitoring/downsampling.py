@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+
+
+def _edges(size: int, buckets: int) -> np.ndarray:
+    return np.linspace(0, size, buckets + 1).astype(np.int64)
+
+
+def minmax_indices(y: np.ndarray, points: int) -> np.ndarray:
+    """Минимум и максимум каждой из points // 2 равных корзин, в порядке следования."""
+    size = y.shape[0]
+    if size <= points:
+        return np.arange(size)
+    edges = _edges(size, max(points // 2, 1))
+    bucket = np.repeat(np.arange(edges.size - 1), np.diff(edges))
+    # Сортировка по корзине, внутри — по значению: в начале корзины минимум, в конце максимум.
+    order = np.lexsort((y, bucket))
+    return np.union1d(order[edges[:-1]], order[edges[1:] - 1])
+
+
+def lttb_indices(
+    x: np.ndarray, y: np.ndarray, points: int, limit: float | None = None
+) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets; в корзине с превышением limit берётся её максимум."""
+    size = y.shape[0]
+    if size <= points:
+        return np.arange(size)
+    # Первая и последняя точки сохраняются, середина делится на points - 2 корзин.
+    edges = 1 + _edges(size - 2, points - 2)
+    spikes = (
+        np.maximum.reduceat(y[1:-1], edges[:-1] - 1) > limit
+        if limit is not None
+        else np.zeros(points - 2, dtype=bool)
+    )
+    picked = np.empty(points, dtype=np.int64)
+    picked[0], picked[-1] = 0, size - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if spikes[i]:
+            a = lo + int(np.argmax(y[lo:hi]))
+        else:
+            next_hi = edges[i + 2] if i + 2 < edges.size else size
+            cx, cy = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+            area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+            a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+def downsample_indices(
+    x: np.ndarray, y: np.ndarray, points: int, method: str = "lttb", limit: float | None = None
+) -> np.ndarray:
+    """Индексы не более points точек ряда; точки выше limit остаются хотя бы по одной на корзину."""
+    if method == "minmax":
+        # Максимум корзины уже содержит превышение, если оно в ней есть.
+        return minmax_indices(y, points)
+    return lttb_indices(x, y, points, limit)
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import secrets
+import threading
+from collections import deque
+from collections.abc import AsyncIterator, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from django.utils import timezone
+
+from .models import Machine, MachineAnomaly, ProductionEntry, ToolIssue
+from .scoring import Thresholds, sensor_reasons
+
+BUFFER_SIZE = 5000
+QUEUE_SIZE = 1000
+HEARTBEAT_SECONDS = 15.0
+RETRY_MS = 3000
+
+# Номера событий живут в памяти процесса; метка запуска отличает их от номеров прошлого запуска.
+BOOT_ID = secrets.token_hex(4)
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+@dataclass(frozen=True)
+class Event:
+    seq: int
+    kind: str
+    data: dict[str, Any]
+
+    @property
+    def event_id(self) -> str:
+        return f"{BOOT_ID}-{self.seq}"
+
+    def encode(self) -> bytes:
+        return f"id: {self.event_id}\nevent: {self.kind}\ndata: {_encode(self.data)}\n\n".encode()
+
+
+@dataclass(eq=False)
+class Subscriber:
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(QUEUE_SIZE))
+    overflowed: bool = False
+
+    def _put(self, event: Event) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Медленный клиент: очередь не растёт, клиент получит reset и перечитает данные.
+            self.overflowed = True
+
+    def notify(self, event: Event) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # цикл событий уже закрыт
+
+
+class ChangeFeed:
+    """Шина изменений в памяти процесса: кольцевой буфер последних событий и подписчики."""
+
+    def __init__(self, size: int = BUFFER_SIZE) -> None:
+        self._lock = threading.Lock()
+        self._events: deque[Event] = deque(maxlen=size)
+        self._seq = 0
+        self._subscribers: set[Subscriber] = set()
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def publish(self, kind: str, data: dict[str, Any]) -> Event:
+        with self._lock:
+            self._seq += 1
+            event = Event(self._seq, kind, data)
+            self._events.append(event)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.notify(event)
+        return event
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def since(self, last_event_id: str) -> list[Event] | None:
+        """События после last_event_id или None, если их уже нет в буфере."""
+        boot, _, raw_seq = last_event_id.partition("-")
+        try:
+            seq = int(raw_seq)
+        except ValueError:
+            return None
+        with self._lock:
+            if boot != BOOT_ID or seq > self._seq:
+                return None
+            if self._events and seq < self._events[0].seq - 1:
+                return None
+            return [event for event in self._events if event.seq > seq]
+
+
+FEED = ChangeFeed()
+
+
+def _reset_event(feed: ChangeFeed) -> bytes:
+    # Пропуск в истории: клиент перечитывает данные через REST и продолжает с текущего номера.
+    return Event(feed.last_seq, "reset", {}).encode()
+
+
+async def event_stream(last_event_id: str = "", feed: ChangeFeed = FEED) -> AsyncIterator[bytes]:
+    subscriber = feed.subscribe()
+    try:
+        yield f"retry: {RETRY_MS}\n\n".encode()
+        sent = feed.last_seq
+        if not last_event_id:
+            # Новый клиент получает текущий номер, чтобы при переподключении ничего не потерять.
+            yield Event(sent, "ready", {}).encode()
+        else:
+            backlog = feed.since(last_event_id)
+            if backlog is None:
+                yield _reset_event(feed)
+            else:
+                for event in backlog:
+                    yield event.encode()
+                sent = backlog[-1].seq if backlog else sent
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            if subscriber.overflowed:
+                subscriber.overflowed = False
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                sent = feed.last_seq
+                yield _reset_event(feed)
+                continue
+            if event.seq <= sent:
+                continue
+            sent = event.seq
+            yield event.encode()
+    finally:
+        feed.unsubscribe(subscriber)
+
+
+def publish_entries(entries: Iterable[ProductionEntry], feed: ChangeFeed = FEED) -> None:
+    entries = list(entries)
+    if not entries:
+        return
+    machines = {
+        pk: (name, subdivision)
+        for pk, name, subdivision in Machine.objects.filter(
+            pk__in={entry.machine_id for entry in entries}
+        ).values_list("pk", "name", "subdivision")
+    }
+    thresholds = Thresholds()
+    tz = timezone.get_current_timezone()
+    for entry in entries:
+        machine, subdivision = machines.get(entry.machine_id, ("", ""))
+        sensors = (entry.temperature_c, entry.vibration_mm, entry.tool_wear_percent)
+        t, v, w = (float(value) if value is not None else None for value in sensors)
+        ts = entry.recorded_at.astimezone(tz).isoformat()
+        feed.publish(
+            "entry",
+            {
+                "id": entry.pk,
+                "t": t,
+                "v": v,
+                "w": w,
+                "defect": 1 if entry.defective_parts > 0 else 0,
+                "machine": machine,
+                "machine_subdivision": subdivision,
+                "ts": ts,
+                "detail": entry.detail_name,
+                "shift": entry.shift,
+            },
+        )
+        if t is None or v is None or w is None:
+            continue
+        reasons = sensor_reasons(t, v, w, thresholds)
+        if reasons:
+            feed.publish(
+                "alert",
+                {
+                    "entry_id": entry.pk,
+                    "machine": machine,
+                    "ts": ts,
+                    "reasons": reasons,
+                    "message": f"⚠️ {machine} ({ts}): {', '.join(reasons)}",
+                },
+            )
+
+
+def publish_issue(issue: ToolIssue, feed: ChangeFeed = FEED) -> None:
+    tool_name, username = (
+        ToolIssue.objects.filter(pk=issue.pk)
+        .values_list("tool__name", "reported_by__username")
+        .first()
+        or ("", "")
+    )
+    feed.publish(
+        "tool_issue",
+        {
+            "id": issue.pk,
+            "tool_id": issue.tool_id,
+            "tool_name": tool_name,
+            "defective_count": issue.defective_count,
+            "description": issue.description,
+            "reported_by": username,
+            "ts": timezone.localtime(issue.recorded_at).isoformat(),
+        },
+    )
+
+
+def publish_anomalies(anomalies: Iterable[MachineAnomaly], feed: ChangeFeed = FEED) -> None:
+    anomalies = list(anomalies)
+    if not anomalies:
+        return
+    machines = dict(
+        Machine.objects.filter(pk__in={anomaly.machine_id for anomaly in anomalies}).values_list(
+            "pk", "name"
+        )
+    )
+    for anomaly in anomalies:
+        feed.publish("anomaly", anomaly_to_dict(anomaly, machines.get(anomaly.machine_id, "")))
+
+
+def anomaly_to_dict(anomaly: MachineAnomaly, machine: str) -> dict[str, Any]:
+    return {
+        "id": anomaly.pk,
+        "entry_id": anomaly.entry_id,
+        "machine": machine,
+        "kind": anomaly.kind,
+        "channel": anomaly.channel,
+        "value": anomaly.value,
+        "score": round(anomaly.score, 3),
+        "baseline_mean": anomaly.baseline_mean,
+        "baseline_std": anomaly.baseline_std,
+        "ts": timezone.localtime(anomaly.recorded_at).isoformat(),
+    }
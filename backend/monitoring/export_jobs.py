@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .exports import (
+    CSV_CONTENT_TYPE,
+    NPZ_CONTENT_TYPE,
+    XLSX_CONTENT_TYPE,
+    ExportFilter,
+    write_columns,
+    write_csv,
+    write_workbook,
+)
+from .models import ExportJob, TableVersion, User
+from .signals import TRACKED_MODELS, table_name
+
+CONTENT_TYPES = {
+    ExportJob.Format.XLSX: XLSX_CONTENT_TYPE,
+    ExportJob.Format.CSV: CSV_CONTENT_TYPE,
+    ExportJob.Format.NPZ: NPZ_CONTENT_TYPE,
+}
+
+RENDERERS = {
+    ExportJob.Format.XLSX: write_workbook,
+    ExportJob.Format.CSV: write_csv,
+    ExportJob.Format.NPZ: write_columns,
+}
+
+
+def export_root() -> Path:
+    root = Path(settings.EXPORT_ROOT)
+    root.mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def params_key(export_format: str, params: dict[str, Any]) -> str:
+    payload = json.dumps({"format": export_format, **params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def data_version() -> str:
+    tables = tuple(table_name(model) for model in TRACKED_MODELS)
+    versions = TableVersion.snapshot(tables)
+    return ",".join(f"{table}:{versions[table]}" for table in tables)
+
+
+def artifact_path(job: ExportJob) -> Path:
+    return export_root() / job.file_name
+
+
+def download_name(job: ExportJob) -> str:
+    return f"quality_monitor_{job.pk}.{job.export_format}"
+
+
+def _artifact_ready(job: ExportJob) -> bool:
+    return bool(job.file_name) and artifact_path(job).exists()
+
+
+def request_export(user: User, export_format: str, params: dict[str, Any]) -> tuple[ExportJob, bool]:
+    key = params_key(export_format, params)
+    version = data_version()
+    with transaction.atomic():
+        candidates = ExportJob.objects.filter(params_key=key).exclude(
+            status=ExportJob.Status.FAILED
+        )
+        for job in candidates.order_by("-created_at")[:5]:
+            if job.status == ExportJob.Status.DONE:
+                if job.data_version == version and _artifact_ready(job):
+                    return job, False
+                continue
+            return job, False
+        job = ExportJob.objects.create(
+            requested_by=user,
+            export_format=export_format,
+            params=params,
+            params_key=key,
+        )
+    return job, True
+
+
+def claim_next_job(stale_after: timedelta | None = None) -> ExportJob | None:
+    if stale_after is not None:
+        ExportJob.objects.filter(
+            status=ExportJob.Status.RUNNING,
+            started_at__lt=timezone.now() - stale_after,
+        ).update(status=ExportJob.Status.PENDING, started_at=None)
+
+    for job_id in (
+        ExportJob.objects.filter(status=ExportJob.Status.PENDING)
+        .order_by("created_at")
+        .values_list("id", flat=True)[:10]
+    ):
+        claimed = ExportJob.objects.filter(id=job_id, status=ExportJob.Status.PENDING).update(
+            status=ExportJob.Status.RUNNING,
+            started_at=timezone.now(),
+        )
+        if claimed:
+            return ExportJob.objects.get(id=job_id)
+    return None
+
+
+def run_job(job: ExportJob) -> ExportJob:
+    version = data_version()
+    root = export_root()
+    file_name = f"{job.params_key[:16]}-{job.pk}.{job.export_format}"
+    handle, temp_name = tempfile.mkstemp(dir=root, suffix=".part")
+    try:
+        with os.fdopen(handle, "wb") as target:
+            RENDERERS[ExportJob.Format(job.export_format)](
+                target, ExportFilter.from_params(job.params)
+            )
+        os.replace(temp_name, root / file_name)
+    except Exception as exc:
+        Path(temp_name).unlink(missing_ok=True)
+        job.status = ExportJob.Status.FAILED
+        job.error = f"{type(exc).__name__}: {exc}"
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "error", "finished_at"])
+        return job
+
+    job.status = ExportJob.Status.DONE
+    job.data_version = version
+    job.file_name = file_name
+    job.file_size = (root / file_name).stat().st_size
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "data_version", "file_name", "file_size", "finished_at"])
+    _discard_superseded(job)
+    return job
+
+
+def _discard_superseded(job: ExportJob) -> None:
+    superseded = ExportJob.objects.filter(
+        params_key=job.params_key,
+        status=ExportJob.Status.DONE,
+        finished_at__lt=job.finished_at,
+    ).exclude(file_name="")
+    for old in superseded:
+        artifact_path(old).unlink(missing_ok=True)
+    superseded.update(file_name="", file_size=None)
+
+
+def job_to_dict(job: ExportJob) -> dict[str, Any]:
+    return {
+        "id": job.pk,
+        "format": job.export_format,
+        "params": job.params,
+        "status": job.status,
+        "status_display": job.get_status_display(),
+        "error": job.error or None,
+        "file_size": job.file_size,
+        "created_at": timezone.localtime(job.created_at).isoformat(),
+        "finished_at": timezone.localtime(job.finished_at).isoformat()
+        if job.finished_at
+        else None,
+    }
@@ -0,0 +1,409 @@
+from __future__ import annotations
+
+import csv
+import io
+import tempfile
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from typing import IO, Any
+
+import numpy as np
+from django.db.models import QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from openpyxl import Workbook
+
+from .models import ArchivedEntry, Machine, ProductionEntry, Tool, ToolIssue, User
+from .wire import FLOAT64, INT64, TEXT, ColumnarTable, epoch_ms
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_CONTENT_TYPE = "text/csv; charset=utf-8"
+NPZ_CONTENT_TYPE = "application/octet-stream"
+EXPORT_FILENAME = "quality_monitor.xlsx"
+CSV_FILENAME = "quality_monitor.csv"
+CHUNK_SIZE = 2000
+
+PRODUCTION_HEADER = [
+    "Дата и время",
+    "Сотрудник",
+    "Смена",
+    "Станок",
+    "Подразделение",
+    "Деталь",
+    "Выпуск, шт.",
+    "Брак, шт.",
+    "Температура, °C",
+    "Вибрация, мм/с",
+    "Износ, %",
+    "Комментарий",
+]
+
+TOOL_HEADER = [
+    "Инструмент",
+    "Общий остаток",
+    "Брак",
+    "Мин. порог",
+    "Местоположение",
+    "Средний расход/день",
+    "Обновлено",
+]
+
+ISSUE_HEADER = [
+    "Дата",
+    "Сотрудник",
+    "Инструмент",
+    "Кол-во с браком",
+    "Комментарий",
+]
+
+
+# Столбцы производства в файле .npz: строки — коды и словарь «<имя>_dictionary».
+PRODUCTION_COLUMNS = {
+    "recorded_at": INT64,
+    "worker": TEXT,
+    "shift": TEXT,
+    "machine": TEXT,
+    "subdivision": TEXT,
+    "detail": TEXT,
+    "parts_made": INT64,
+    "defective_parts": INT64,
+    "temperature_c": FLOAT64,
+    "vibration_mm": FLOAT64,
+    "tool_wear_percent": FLOAT64,
+    "note": TEXT,
+}
+
+FLAG_VALUES = {"1": True, "true": True, "yes": True, "0": False, "false": False, "no": False}
+
+
+def _parse_bound(value: Any, field: str, end: bool = False) -> datetime | None:
+    if value in (None, ""):
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"Параметр «{field}» должен быть строкой с датой.")
+    try:
+        day = parse_date(value)
+        moment = None if day else parse_datetime(value)
+    except ValueError:
+        day = moment = None
+    if day is not None:
+        # Дата без времени означает весь день: верхняя граница — начало следующего.
+        moment = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    if moment is None:
+        raise ValueError(f"Параметр «{field}» должен быть датой или моментом в формате ISO 8601.")
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def _parse_flag(value: Any, field: str) -> bool:
+    if value in (None, ""):
+        return False
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in FLAG_VALUES:
+        return FLAG_VALUES[value.lower()]
+    raise ValueError(f"Поле «{field}» должно быть true или false.")
+
+
+@dataclass(frozen=True)
+class ExportFilter:
+    """Отбор строк выгрузки; пустые поля ничего не ограничивают.
+
+    Интервал полуоткрытый: [start, end). Станок, подразделение и сотрудник задаются именем
+    и логином и превращаются в подзапросы по id, чтобы СУБД шла по индексам записей.
+    """
+
+    start: datetime | None = None
+    end: datetime | None = None
+    machine: str = ""
+    subdivision: str = ""
+    shift: str = ""
+    worker: str = ""
+    include_archive: bool = False
+
+    @classmethod
+    def from_params(cls, params: Mapping[str, Any]) -> ExportFilter:
+        start = _parse_bound(params.get("from"), "from")
+        end = _parse_bound(params.get("to"), "to", end=True)
+        if start is not None and end is not None and start >= end:
+            raise ValueError("Параметр «from» должен быть раньше «to».")
+        text: dict[str, str] = {}
+        for field in ("machine", "subdivision", "shift", "worker"):
+            value = params.get(field) or ""
+            if not isinstance(value, str):
+                raise ValueError(f"Параметр «{field}» должен быть строкой.")
+            text[field] = value.strip()
+        return cls(
+            start=start,
+            end=end,
+            include_archive=_parse_flag(params.get("include_archive"), "include_archive"),
+            **text,
+        )
+
+    def to_params(self) -> dict[str, Any]:
+        """Параметры задания выгрузки: только заданные поля, чтобы ключ не зависел от пустых."""
+        params: dict[str, Any] = {}
+        if self.start is not None:
+            params["from"] = self.start.isoformat()
+        if self.end is not None:
+            params["to"] = self.end.isoformat()
+        for field in ("machine", "subdivision", "shift", "worker"):
+            if getattr(self, field):
+                params[field] = getattr(self, field)
+        if self.include_archive:
+            params["include_archive"] = True
+        return params
+
+    def _period(self, queryset: QuerySet) -> QuerySet:
+        if self.start is not None:
+            queryset = queryset.filter(recorded_at__gte=self.start)
+        if self.end is not None:
+            queryset = queryset.filter(recorded_at__lt=self.end)
+        return queryset
+
+    def entries(self, queryset: QuerySet) -> QuerySet:
+        """Фильтр для ProductionEntry и ArchivedEntry: у таблиц одинаковые поля отбора."""
+        queryset = self._period(queryset)
+        if self.machine:
+            queryset = queryset.filter(
+                machine_id__in=Machine.objects.filter(name=self.machine).values("id")
+            )
+        if self.subdivision:
+            queryset = queryset.filter(
+                machine_id__in=Machine.objects.filter(subdivision=self.subdivision).values("id")
+            )
+        if self.shift:
+            queryset = queryset.filter(shift=self.shift)
+        if self.worker:
+            queryset = queryset.filter(
+                worker_id__in=User.objects.filter(username__iexact=self.worker).values("id")
+            )
+        return queryset
+
+    def issues(self, queryset: QuerySet[ToolIssue]) -> QuerySet[ToolIssue]:
+        # У сообщений о браке нет станка и смены: отбираются только период и сотрудник.
+        queryset = self._period(queryset)
+        if self.worker:
+            queryset = queryset.filter(
+                reported_by_id__in=User.objects.filter(username__iexact=self.worker).values("id")
+            )
+        return queryset
+
+
+NO_FILTER = ExportFilter()
+
+
+def _person_name(first_name: str, last_name: str, username: str) -> str:
+    return f"{first_name} {last_name}".strip() or username
+
+
+def _production_records(export_filter: ExportFilter) -> Iterator[tuple[Any, ...]]:
+    querysets = [ProductionEntry.objects.order_by("-recorded_at")]
+    if export_filter.include_archive:
+        # Архив старше горячей таблицы, поэтому общий порядок по убыванию времени сохраняется.
+        querysets.append(ArchivedEntry.objects.order_by("-recorded_at", "-id"))
+    for queryset in querysets:
+        values = export_filter.entries(queryset).values_list(
+            "recorded_at",
+            "worker__first_name",
+            "worker__last_name",
+            "worker__username",
+            "shift",
+            "machine__name",
+            "machine__subdivision",
+            "detail_name",
+            "parts_made",
+            "defective_parts",
+            "temperature_c",
+            "vibration_mm",
+            "tool_wear_percent",
+            "note",
+        )
+        yield from values.iterator(chunk_size=CHUNK_SIZE)
+
+
+def production_rows(export_filter: ExportFilter = NO_FILTER) -> Iterator[list[Any]]:
+    for (
+        recorded_at,
+        first_name,
+        last_name,
+        username,
+        shift,
+        machine,
+        subdivision,
+        detail,
+        parts_made,
+        defective_parts,
+        temperature,
+        vibration,
+        wear,
+        note,
+    ) in _production_records(export_filter):
+        yield [
+            recorded_at.strftime("%Y-%m-%d %H:%M"),
+            _person_name(first_name, last_name, username),
+            shift,
+            machine,
+            subdivision,
+            detail,
+            parts_made,
+            defective_parts,
+            temperature,
+            vibration,
+            wear,
+            note,
+        ]
+
+
+def tool_rows(queryset: QuerySet[Tool] | None = None) -> Iterator[list[Any]]:
+    if queryset is None:
+        queryset = Tool.objects.order_by("name")
+    values = queryset.values_list(
+        "name",
+        "stock",
+        "defective_stock",
+        "min_threshold",
+        "location",
+        "avg_daily_outflow",
+        "last_updated_at",
+    )
+    for name, stock, defective, threshold, location, outflow, updated_at in values.iterator(
+        chunk_size=CHUNK_SIZE
+    ):
+        yield [
+            name,
+            stock,
+            defective,
+            threshold,
+            location,
+            outflow,
+            updated_at.strftime("%Y-%m-%d %H:%M"),
+        ]
+
+
+def issue_rows(
+    queryset: QuerySet[ToolIssue] | None = None, export_filter: ExportFilter = NO_FILTER
+) -> Iterator[list[Any]]:
+    if queryset is None:
+        queryset = ToolIssue.objects.order_by("-recorded_at")
+    values = export_filter.issues(queryset).values_list(
+        "recorded_at",
+        "reported_by__first_name",
+        "reported_by__last_name",
+        "reported_by__username",
+        "tool__name",
+        "defective_count",
+        "description",
+    )
+    for (
+        recorded_at,
+        first_name,
+        last_name,
+        username,
+        tool_name,
+        defective_count,
+        description,
+    ) in values.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            recorded_at.strftime("%Y-%m-%d %H:%M"),
+            _person_name(first_name, last_name, username),
+            tool_name,
+            defective_count,
+            description,
+        ]
+
+
+def write_workbook(target: IO[bytes] | str, export_filter: ExportFilter = NO_FILTER) -> None:
+    workbook = Workbook(write_only=True)
+    sheets = (
+        ("Производство", PRODUCTION_HEADER, production_rows(export_filter)),
+        ("Инструменты", TOOL_HEADER, tool_rows()),
+        ("Сообщения", ISSUE_HEADER, issue_rows(export_filter=export_filter)),
+    )
+    for title, header, rows in sheets:
+        sheet = workbook.create_sheet(title)
+        sheet.append(header)
+        for row in rows:
+            sheet.append(row)
+    workbook.save(target)
+
+
+def spool_workbook(export_filter: ExportFilter = NO_FILTER) -> IO[bytes]:
+    handle = tempfile.TemporaryFile(suffix=".xlsx")
+    try:
+        write_workbook(handle, export_filter)
+    except BaseException:
+        handle.close()
+        raise
+    handle.seek(0)
+    return handle
+
+
+def stream_csv(export_filter: ExportFilter = NO_FILTER) -> Iterator[bytes]:
+    """CSV производства частями по CHUNK_SIZE строк; BOM нужен Excel для UTF-8."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(PRODUCTION_HEADER)
+    for index, row in enumerate(production_rows(export_filter), start=1):
+        writer.writerow(row)
+        if index % CHUNK_SIZE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def write_csv(target: IO[bytes], export_filter: ExportFilter = NO_FILTER) -> None:
+    for chunk in stream_csv(export_filter):
+        target.write(chunk)
+
+
+def _float(value: Decimal | None) -> float:
+    return float("nan") if value is None else float(value)
+
+
+def write_columns(target: IO[bytes], export_filter: ExportFilter = NO_FILTER) -> None:
+    """Производство в сжатом .npz: по массиву на столбец, время — datetime64[ms] в UTC."""
+    table = ColumnarTable(PRODUCTION_COLUMNS)
+    append = table.append
+    for (
+        recorded_at,
+        first_name,
+        last_name,
+        username,
+        shift,
+        machine,
+        subdivision,
+        detail,
+        parts_made,
+        defective_parts,
+        temperature,
+        vibration,
+        wear,
+        note,
+    ) in _production_records(export_filter):
+        append(
+            (
+                epoch_ms(recorded_at),
+                _person_name(first_name, last_name, username),
+                shift,
+                machine,
+                subdivision,
+                detail,
+                parts_made,
+                defective_parts,
+                _float(temperature),
+                _float(vibration),
+                _float(wear),
+                note,
+            )
+        )
+    arrays: dict[str, np.ndarray] = {}
+    for name, values, dictionary in table.columns():
+        arrays[name] = values
+        if dictionary is not None:
+            arrays[f"{name}_dictionary"] = np.array(dictionary, dtype=str)
+    arrays["recorded_at"] = arrays["recorded_at"].view("datetime64[ms]")
+    np.savez_compressed(target, **arrays)
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from .models import StockMovement, TableVersion, Tool, ToolForecast, ToolIssue
+
+DEFAULT_WINDOW = 84
+DEFAULT_HALFLIFE = 14.0
+WEEK = 7
+# Даты исчерпания и заказа дальше горизонта не ставятся: прогноз там уже ничего не значит.
+HORIZON_DAYS = 730
+BATCH_SIZE = 2000
+
+FORECAST_FIELDS = (
+    "basis",
+    "daily_outflow",
+    "weekday_factors",
+    "available",
+    "days_to_zero",
+    "stockout_on",
+    "reorder_on",
+    "history_days",
+    "computed_at",
+)
+
+
+@dataclass
+class ForecastResult:
+    tools: int = 0
+    basis: dict[str, int] = field(default_factory=dict)
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+def _local_midnight(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def _microseconds(values: tuple) -> np.ndarray:
+    if values and isinstance(values[0], str):
+        # SQLite отдаёт моменты строками в UTC: NumPy разбирает их без цикла на Python.
+        return np.array(values, dtype="datetime64[us]").astype(np.int64)
+    return np.fromiter((round(value.timestamp() * 1e6) for value in values), dtype=np.int64)
+
+
+def daily_matrix(
+    queryset: QuerySet, value: str, tool_ids: np.ndarray, first_day: date, window: int
+) -> np.ndarray:
+    """Суммы value по дням окна: строка — инструмент (в порядке tool_ids), столбец — день.
+
+    Строки читаются курсором без конвертеров ORM, а день находится поиском по местным
+    полуночам: TruncDate в SQLite вызывал бы функцию на Python для каждой строки.
+    """
+    matrix = np.zeros((len(tool_ids), window), dtype=np.float64)
+    midnights = [_local_midnight(first_day + timedelta(days=day)) for day in range(window + 1)]
+    sql, params = (
+        queryset.filter(recorded_at__gte=midnights[0], recorded_at__lt=midnights[-1])
+        .order_by()
+        .values_list("tool_id", "recorded_at", value)
+        .query.sql_with_params()
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    if not rows:
+        return matrix
+    tools, moments, totals = zip(*rows)
+    tools = np.array(tools, dtype=np.int64)
+    bounds = np.array([round(midnight.timestamp() * 1e6) for midnight in midnights])
+    offsets = np.searchsorted(bounds, _microseconds(moments), side="right") - 1
+    positions = np.minimum(np.searchsorted(tool_ids, tools), len(tool_ids) - 1)
+    # Строки инструментов, созданных после выборки списка, отбрасываются.
+    known = (tool_ids[positions] == tools) & (offsets >= 0) & (offsets < window)
+    np.add.at(matrix, (positions[known], offsets[known]), np.array(totals, dtype=np.float64)[known])
+    return matrix
+
+
+def outflow_rates(
+    consumption: np.ndarray, first_day: date, halflife: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """EWMA дневного расхода и множители дней недели для всех инструментов сразу.
+
+    Веса окна убывают вдвое за halflife дней и нормированы, поэтому ставка — взвешенное
+    среднее за день. Множитель дня недели — его средний расход к общему, в сумме они дают 7.
+    """
+    window = consumption.shape[1]
+    ages = np.arange(window - 1, -1, -1, dtype=np.float64)
+    weights = 0.5 ** (ages / halflife)
+    rates = consumption @ (weights / weights.sum())
+
+    weekdays = (first_day.weekday() + np.arange(window)) % WEEK
+    onehot = np.zeros((window, WEEK))
+    onehot[np.arange(window), weekdays] = 1.0
+    weekday_means = (consumption @ onehot) / onehot.sum(axis=0)
+    totals = weekday_means.sum(axis=1, keepdims=True)
+    factors = np.divide(
+        weekday_means * WEEK, totals, out=np.ones_like(weekday_means), where=totals > 0
+    )
+    return rates, factors
+
+
+def days_until(
+    amount: np.ndarray, rates: np.ndarray, factors: np.ndarray, today: date
+) -> np.ndarray:
+    """Через сколько дней расход с недельным профилем съест amount; inf — никогда.
+
+    Недельный цикл повторяется, поэтому хватает числа целых недель и накопленной суммы
+    внутри одной недели: O(инструменты × 7) вместо развёртки на весь горизонт.
+    """
+    amount = np.maximum(amount, 0.0)
+    weekdays = (today.weekday() + np.arange(WEEK)) % WEEK
+    daily = rates[:, None] * factors[:, weekdays]
+    cumulative = np.cumsum(daily, axis=1)
+    weekly = cumulative[:, -1]
+    result = np.full(len(amount), np.inf)
+    result[amount <= 0] = 0.0
+
+    active = (amount > 0) & (weekly > 0)
+    if active.any():
+        need = amount[active]
+        week_total = weekly[active]
+        weeks = np.maximum(np.ceil(need / week_total) - 1, 0)
+        rest = need - weeks * week_total
+        spent = cumulative[active]
+        # Первый день недели, на котором накопленный расход покрывает остаток.
+        day = np.argmax(spent >= rest[:, None] - 1e-9, axis=1)
+        rows = np.arange(len(day))
+        before = np.where(day > 0, spent[rows, np.maximum(day - 1, 0)], 0.0)
+        used = daily[active][rows, day]
+        result[active] = weeks * WEEK + day + (rest - before) / used
+    return result
+
+
+def _due_dates(days: np.ndarray, today: date) -> list[date | None]:
+    return [
+        today + timedelta(days=math.floor(value)) if value <= HORIZON_DAYS else None
+        for value in days.tolist()
+    ]
+
+
+def _upsert_sql() -> str:
+    # Одна вставка с ON CONFLICT на строку вместо bulk_create: ORM тратит секунды на сборку
+    # SQL для десятков тысяч объектов, а здесь значения уже готовы.
+    quote = connection.ops.quote_name
+    columns = [
+        quote(ToolForecast._meta.get_field(name).column) for name in ("tool", *FORECAST_FIELDS)
+    ]
+    updates = ", ".join(f"{column} = excluded.{column}" for column in columns[1:])
+    return (
+        f"INSERT INTO {quote(ToolForecast._meta.db_table)} ({', '.join(columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT ({columns[0]}) DO UPDATE SET {updates}"
+    )
+
+
+def refresh_forecasts(
+    window: int = DEFAULT_WINDOW,
+    halflife: float = DEFAULT_HALFLIFE,
+    today: date | None = None,
+) -> ForecastResult:
+    """Пересчитывает ToolForecast для всех инструментов одним векторным проходом.
+
+    Расход инструмента — списания остатка (StockMovement с delta < 0) за последние window
+    полных дней; если списаний в окне нет, им служат сообщения о браке ToolIssue. Без истории
+    берётся ручной avg_daily_outflow. Годный остаток — общий минус брак; дата заказа — день,
+    когда прогнозный остаток опустится до min_threshold.
+    """
+    if window < WEEK:
+        raise ValueError(f"Окно прогноза должно быть не короче {WEEK} дней.")
+    if halflife <= 0:
+        raise ValueError("Период полураспада весов должен быть положительным.")
+    result = ForecastResult()
+    today = today or timezone.localdate()
+    first_day = today - timedelta(days=window)
+
+    started = time.perf_counter()
+    tools = list(
+        Tool.objects.order_by("id").values_list(
+            "id", "stock", "defective_stock", "min_threshold", "avg_daily_outflow"
+        )
+    )
+    result.tools = len(tools)
+    if not tools:
+        return result
+    ids, stock, defective, minimum, manual = zip(*tools)
+    tool_ids = np.array(ids, dtype=np.int64)
+    available = np.maximum(np.array(stock, dtype=np.float64) - np.array(defective), 0.0)
+    minimum = np.array(minimum, dtype=np.float64)
+    manual = np.array([float(value or 0) for value in manual])
+    issues = daily_matrix(ToolIssue.objects.all(), "defective_count", tool_ids, first_day, window)
+    # Сумма отрицательных изменений: расход получается со знаком минус.
+    movements = -daily_matrix(
+        StockMovement.objects.filter(delta__lt=0), "delta", tool_ids, first_day, window
+    )
+    result.timings["load"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    consumption = np.where(movements.any(axis=1)[:, None], movements, issues)
+    history_days = np.count_nonzero(consumption, axis=1)
+    rates, factors = outflow_rates(consumption, first_day, halflife)
+    from_manual = (history_days == 0) & (manual > 0)
+    rates = np.where(from_manual, manual, rates)
+    factors[from_manual] = 1.0
+    basis = np.where(
+        history_days > 0,
+        ToolForecast.Basis.HISTORY.value,
+        np.where(from_manual, ToolForecast.Basis.MANUAL.value, ToolForecast.Basis.NONE.value),
+    )
+    to_zero = days_until(available, rates, factors, today)
+    to_reorder = days_until(available - minimum, rates, factors, today)
+    result.timings["compute"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    now = timezone.now()
+    columns = zip(
+        ids,
+        basis.tolist(),
+        rates.tolist(),
+        np.round(factors, 3).tolist(),
+        available.tolist(),
+        to_zero.tolist(),
+        _due_dates(to_zero, today),
+        _due_dates(to_reorder, today),
+        history_days.tolist(),
+    )
+    factors_field = ToolForecast._meta.get_field("weekday_factors")
+    adapt_date = connection.ops.adapt_datefield_value
+    computed_at = ToolForecast._meta.get_field("computed_at").get_db_prep_save(now, connection)
+    rows = [
+        (
+            tool_id,
+            kind,
+            round(rate, 4),
+            factors_field.get_db_prep_save(weekday, connection),
+            int(left),
+            round(days, 2) if math.isfinite(days) else None,
+            adapt_date(stockout_on),
+            adapt_date(reorder_on),
+            observed,
+            computed_at,
+        )
+        for tool_id, kind, rate, weekday, left, days, stockout_on, reorder_on, observed in columns
+    ]
+    sql = _upsert_sql()
+    with transaction.atomic(), connection.cursor() as cursor:
+        for offset in range(0, len(rows), BATCH_SIZE):
+            cursor.executemany(sql, rows[offset : offset + BATCH_SIZE])
+        TableVersion.bump(ToolForecast._meta.label_lower)
+    result.timings["store"] = time.perf_counter() - started
+    kinds, counts = np.unique(basis, return_counts=True)
+    result.basis = dict(zip(kinds.tolist(), counts.tolist()))
+    return result
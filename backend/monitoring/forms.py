@@ -1,11 +1,28 @@
+from __future__ import annotations
+
+from typing import Any
+
 from django import forms
+from django.core.cache import cache
 
 from .models import ProductionEntry, ToolIssue
 
 
+def cached_choices(field: forms.ModelChoiceField, version: int) -> list[tuple[Any, str]]:
+    """Варианты выбора по версии таблицы: список строится заново, только когда таблица изменилась."""
+    key = f"choices:{field.queryset.model._meta.label_lower}:{version}"
+    choices = cache.get(key)
+    if choices is None:
+        choices = [(getattr(value, "value", value), label) for value, label in field.choices]
+        cache.set(key, choices, timeout=None)
+    return choices
+
+
 class ProductionEntryForm(forms.ModelForm):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, machine_version: int | None = None, **kwargs):
         super().__init__(*args, **kwargs)
+        if machine_version is not None:
+            self.fields["machine"].choices = cached_choices(self.fields["machine"], machine_version)
         self._apply_bulma_styles()
 
     class Meta:
@@ -28,8 +45,10 @@ class ProductionEntryForm(forms.ModelForm):
 
 
 class ToolIssueForm(forms.ModelForm):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, tool_version: int | None = None, **kwargs):
         super().__init__(*args, **kwargs)
+        if tool_version is not None:
+            self.fields["tool"].choices = cached_choices(self.fields["tool"], tool_version)
         for field in self.fields.values():
             widget = field.widget
             if isinstance(widget, forms.Textarea):
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import secrets
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Any
+
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import detector, events, rollups
+from .models import (
+    GatewayToken,
+    IngestBatch,
+    Machine,
+    ProductionEntry,
+    TableVersion,
+    User,
+)
+from .signals import bump_workers
+
+MAX_BATCH_ROWS = 5000
+MAX_COUNT = 2_147_483_647
+
+# (поле запроса, предел по модулю из max_digits/decimal_places, знаков после запятой)
+SENSOR_COLUMNS = (
+    ("temperature", 1000, 2),
+    ("vibration", 100, 3),
+    ("wear", 10000, 2),
+)
+
+
+class PayloadError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class MalformedLine:
+    """Строка NDJSON, которую не удалось разобрать: отклоняется одна, остальные принимаются."""
+
+    message: str
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_token(name: str, worker: User) -> tuple[GatewayToken, str]:
+    token = secrets.token_urlsafe(32)
+    gateway = GatewayToken.objects.create(
+        name=name, token_hash=hash_token(token), default_worker=worker
+    )
+    return gateway, token
+
+
+def authenticate(header: str) -> GatewayToken | None:
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    gateway = (
+        GatewayToken.objects.select_related("default_worker")
+        .filter(token_hash=hash_token(token.strip()), is_active=True)
+        .first()
+    )
+    if gateway is not None:
+        GatewayToken.objects.filter(pk=gateway.pk).update(last_used_at=timezone.now())
+    return gateway
+
+
+def parse_payload(body: bytes, content_type: str) -> tuple[list[Any], list[int] | None]:
+    """Записи пакета и, для NDJSON, номера их строк (с 1, пустые строки тоже считаются)."""
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError:
+        raise PayloadError("Тело запроса должно быть в UTF-8.") from None
+    lines: list[int] | None = None
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        numbered = [
+            (number, line) for number, line in enumerate(text.splitlines(), 1) if line.strip()
+        ]
+        lines = [number for number, _ in numbered]
+        rows = [_ndjson_row(line) for _, line in numbered]
+    else:
+        try:
+            payload = json.loads(text or "[]")
+        except json.JSONDecodeError:
+            raise PayloadError("Некорректный JSON.") from None
+        rows = payload.get("entries") if isinstance(payload, dict) else payload
+    if not isinstance(rows, list):
+        raise PayloadError("Ожидается список записей или объект с полем «entries».")
+    if len(rows) > MAX_BATCH_ROWS:
+        raise PayloadError(f"В пакете не больше {MAX_BATCH_ROWS} записей.")
+    return rows, lines
+
+
+def _ndjson_row(line: str) -> Any:
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as exc:
+        return MalformedLine(f"Некорректный JSON: {exc.msg} (позиция {exc.pos}).")
+
+
+def _numeric_column(rows: list[Any], name: str) -> tuple[np.ndarray, np.ndarray]:
+    values = np.full(len(rows), np.nan)
+    invalid = np.zeros(len(rows), dtype=bool)
+    for index, row in enumerate(rows):
+        raw = row.get(name) if isinstance(row, dict) else None
+        if raw is None or raw == "":
+            continue
+        try:
+            values[index] = float(str(raw).replace(",", "."))
+        except ValueError:
+            invalid[index] = True
+    invalid |= np.isinf(values)
+    return values, invalid
+
+
+def _text(row: Any, name: str) -> str:
+    if not isinstance(row, dict):
+        return ""
+    value = row.get(name)
+    return "" if value is None else str(value).strip()
+
+
+@dataclass
+class BatchResult:
+    entries: list[ProductionEntry] = field(default_factory=list)
+    indices: list[int] = field(default_factory=list)
+    errors: dict[int, list[str]] = field(default_factory=dict)
+
+    def reject(self, index: int, message: str) -> None:
+        self.errors.setdefault(index, []).append(message)
+
+
+def validate_rows(rows: list[Any], default_worker_id: int | None) -> BatchResult:
+    """Проверяет строки записей; строки без поля worker пишутся на default_worker_id."""
+    result = BatchResult()
+    size = len(rows)
+    is_object = np.array([isinstance(row, dict) for row in rows], dtype=bool)
+    for index in np.flatnonzero(~is_object).tolist():
+        row = rows[index]
+        if isinstance(row, MalformedLine):
+            result.reject(index, row.message)
+        else:
+            result.reject(index, "Запись должна быть JSON-объектом.")
+
+    parts, parts_bad = _numeric_column(rows, "parts_made")
+    defects, defects_bad = _numeric_column(rows, "defective_parts")
+    defects = np.where(np.isnan(defects), 0.0, defects)
+    has_parts = np.isfinite(parts)
+    checks = (
+        (parts_bad | ~has_parts, "Поле «parts_made» обязательно и должно быть числом."),
+        (defects_bad, "Поле «defective_parts» должно быть числом."),
+        (
+            has_parts & ((parts < 0) | (parts > MAX_COUNT) | (parts != np.floor(parts))),
+            "«parts_made» — целое неотрицательное.",
+        ),
+        (
+            (defects < 0) | (defects > MAX_COUNT) | (defects != np.floor(defects)),
+            "«defective_parts» — целое неотрицательное.",
+        ),
+        (has_parts & (parts >= 0) & (defects > parts), "Брак не может превышать выпуск."),
+    )
+    sensors: dict[str, np.ndarray] = {}
+    for name, bound, digits in SENSOR_COLUMNS:
+        values, bad = _numeric_column(rows, name)
+        sensors[name] = np.round(values, digits)
+        checks += (
+            (bad, f"Поле «{name}» должно быть числом."),
+            (np.abs(sensors[name]) >= bound, f"Поле «{name}» вне допустимого диапазона."),
+        )
+    with np.errstate(invalid="ignore"):
+        for mask, message in checks:
+            for index in np.flatnonzero(mask & is_object).tolist():
+                result.reject(index, message)
+
+    machine_names = {_text(row, "machine") for row in rows} - {""}
+    machines = dict(
+        Machine.objects.filter(name__in=machine_names).values_list("name", "id")
+    )
+    # Логины сравниваются без учёта регистра: в базе они могут храниться и не строчными.
+    usernames = {_text(row, "worker").lower() for row in rows} - {""}
+    workers = dict(
+        User.objects.annotate(login=Lower("username"))
+        .filter(login__in=usernames, role=User.Role.WORKER)
+        .values_list("login", "id")
+    )
+
+    now = timezone.now()
+    current_tz = timezone.get_current_timezone()
+    for index in range(size):
+        row = rows[index]
+        if not isinstance(row, dict):
+            continue
+        machine_name = _text(row, "machine")
+        if not machine_name:
+            result.reject(index, "Поле «machine» обязательно.")
+        elif machine_name not in machines:
+            result.reject(index, f"Станок «{machine_name}» не найден.")
+        username = _text(row, "worker").lower()
+        if username and username not in workers:
+            result.reject(index, f"Сотрудник «{_text(row, 'worker')}» не найден.")
+        elif not username and default_worker_id is None:
+            result.reject(index, "Поле «worker» обязательно.")
+        detail = _text(row, "detail") or _text(row, "detail_name")
+        if not detail:
+            result.reject(index, "Поле «detail» обязательно.")
+        recorded_at: datetime = now
+        stamp = _text(row, "recorded_at") or _text(row, "ts")
+        if stamp:
+            try:
+                parsed = parse_datetime(stamp)
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                result.reject(index, "Поле «recorded_at» должно быть в формате ISO 8601.")
+            else:
+                recorded_at = (
+                    timezone.make_aware(parsed, current_tz)
+                    if timezone.is_naive(parsed)
+                    else parsed
+                )
+        if index in result.errors:
+            continue
+        result.indices.append(index)
+        result.entries.append(
+            ProductionEntry(
+                worker_id=workers[username] if username else default_worker_id,
+                machine_id=machines[machine_name],
+                detail_name=detail[:160],
+                parts_made=int(parts[index]),
+                defective_parts=int(defects[index]),
+                temperature_c=_decimal(sensors["temperature"][index], 2),
+                vibration_mm=_decimal(sensors["vibration"][index], 3),
+                tool_wear_percent=_decimal(sensors["wear"][index], 2),
+                shift=_text(row, "shift")[:40],
+                note=_text(row, "note"),
+                recorded_at=recorded_at,
+            )
+        )
+    return result
+
+
+def _decimal(value: float, digits: int) -> Decimal | None:
+    if np.isnan(value):
+        return None
+    return Decimal(f"{value:.{digits}f}")
+
+
+def insert_entries(entries: list[ProductionEntry]) -> list[ProductionEntry]:
+    """Пакетная вставка с тем, что для одиночной записи делают сигналы; вызывать в транзакции."""
+    created = ProductionEntry.objects.bulk_create(entries)
+    if created:
+        rollups.add_entries(created)
+        TableVersion.bump(ProductionEntry._meta.label_lower)
+        bump_workers(entry.worker_id for entry in created)
+        anomalies = detector.observe_entries(created)
+        transaction.on_commit(lambda: events.publish_entries(created))
+        transaction.on_commit(lambda: events.publish_anomalies(anomalies))
+    return created
+
+
+def ingest(
+    rows: list[Any],
+    gateway: GatewayToken,
+    idempotency_key: str = "",
+    lines: list[int] | None = None,
+) -> tuple[dict, bool]:
+    if idempotency_key:
+        previous = IngestBatch.objects.filter(
+            gateway=gateway, idempotency_key=idempotency_key
+        ).first()
+        if previous is not None:
+            return previous.response, True
+
+    result = validate_rows(rows, gateway.default_worker_id)
+    try:
+        with transaction.atomic():
+            created = insert_entries(result.entries)
+            response = {
+                "accepted": len(created),
+                "rejected": len(result.errors),
+                "ids": [entry.pk for entry in created],
+                "rows": result.indices,
+                "errors": [
+                    {
+                        "index": index,
+                        **({"line": lines[index]} if lines else {}),
+                        "errors": messages,
+                    }
+                    for index, messages in sorted(result.errors.items())
+                ],
+            }
+            if idempotency_key:
+                IngestBatch.objects.create(
+                    gateway=gateway,
+                    idempotency_key=idempotency_key,
+                    accepted=response["accepted"],
+                    rejected=response["rejected"],
+                    response=response,
+                )
+    except IntegrityError:
+        previous = IngestBatch.objects.filter(
+            gateway=gateway, idempotency_key=idempotency_key
+        ).first()
+        if previous is None:
+            raise
+        return previous.response, True
+    return response, False
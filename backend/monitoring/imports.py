@@ -0,0 +1,506 @@
+from __future__ import annotations
+
+import csv
+import uuid
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .gateway import BatchResult, insert_entries, validate_rows
+from .inventory import parse_patch, stock_movements
+from .models import ImportJob, Machine, StockMovement, TableVersion, Tool, User
+
+CHUNK_ROWS = 2000
+MAX_WARNINGS = 1000
+DEFAULT_MACHINE = "Не указан"
+DEFAULT_DETAIL = "Импорт CSV"
+IMPORT_NOTE = "Импортировано из CSV"
+DELIMITERS = (",", ";", "\t")
+
+# Синонимы заголовков — те же, что у разбора CSV на дашборде (src/utils.ts).
+ALIASES: dict[str, dict[str, tuple[str, ...]]] = {
+    ImportJob.Kind.PROCESS: {
+        "temperature": ("temperature", "температура"),
+        "vibration": ("vibration", "вибрация"),
+        "wear": ("wear", "износ"),
+        "defect": ("defect", "брак"),
+        "machine": ("machine", "станок"),
+        "recorded_at": ("time", "timestamp", "datetime", "date"),
+        "worker": ("worker", "сотрудник"),
+    },
+    ImportJob.Kind.EMPLOYEES: {
+        "id": ("id", "employee_id"),
+        "name": ("name", "full_name"),
+        "shift": ("shift", "смена"),
+        "parts_made": ("parts_made", "parts", "выпуск"),
+        "defects": ("defects", "defect", "дефектов"),
+        "avg_temp": ("avg_temp", "avg_temperature", "ср_температура"),
+        "avg_vib": ("avg_vib", "avg_vibration", "ср_вибрация"),
+        "avg_wear": ("avg_wear", "ср_износ"),
+        "date": ("date", "дата", "timestamp"),
+        "machine": ("machine", "станок"),
+    },
+    ImportJob.Kind.INVENTORY: {
+        "tool_name": ("tool_name", "инструмент", "название"),
+        "stock": ("stock", "остаток", "qty"),
+        "min_threshold": ("min_threshold", "минимум", "min"),
+        "location": ("location",),
+        "avg_daily_outflow": ("avg_daily_outflow", "расход_в_день"),
+    },
+}
+
+REQUIRED_COLUMNS = {
+    ImportJob.Kind.PROCESS: ("temperature", "vibration", "wear"),
+    ImportJob.Kind.EMPLOYEES: ("id", "name", "parts_made", "defects", "date"),
+    ImportJob.Kind.INVENTORY: ("tool_name", "stock", "min_threshold"),
+}
+
+
+class ImportSuperseded(Exception):
+    """Задание продвинул другой обработчик: этот пакет отменяется."""
+
+
+@dataclass
+class Record:
+    line: int
+    values: dict[str, str]
+    offset: int
+    lines: int
+
+
+@dataclass
+class ChunkResult:
+    accepted: int
+    warnings: list[str]
+
+
+def import_root() -> Path:
+    root = Path(settings.IMPORT_ROOT)
+    root.mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def import_path(job: ImportJob) -> Path:
+    return import_root() / job.file_name
+
+
+def map_header(kind: str, cells: list[str]) -> list[str]:
+    """Поле загрузки для каждого столбца файла; неизвестные столбцы — пустая строка."""
+    lookup = {alias: name for name, aliases in ALIASES[kind].items() for alias in aliases}
+    columns: list[str] = []
+    for cell in cells:
+        name = lookup.get(cell.strip().lstrip("\ufeff").lower(), "")
+        columns.append("" if name in columns else name)
+    return columns
+
+
+def _read_header(path: Path, kind: str) -> tuple[list[str], str, int]:
+    with path.open("rb") as handle:
+        raw = handle.readline()
+    try:
+        text = raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("Файл должен быть в кодировке UTF-8.") from None
+    delimiter = max(DELIMITERS, key=text.count)
+    columns = map_header(kind, next(csv.reader([text], delimiter=delimiter), []))
+    missing = [name for name in REQUIRED_COLUMNS[kind] if name not in columns]
+    if missing:
+        raise ValueError(f"В заголовке нет столбцов: {', '.join(missing)}.")
+    return columns, delimiter, len(raw)
+
+
+def create_import(user: User, kind: str, upload: Any, params: dict[str, Any]) -> ImportJob:
+    """Сохраняет файл, проверяет заголовок и ставит задание в очередь."""
+    worker = params.get("worker")
+    if worker and not User.objects.filter(username=worker, role=User.Role.WORKER).exists():
+        raise ValueError(f"Сотрудник «{worker}» не найден.")
+    machine = params.get("machine")
+    if machine and not Machine.objects.filter(name=machine).exists():
+        raise ValueError(f"Станок «{machine}» не найден.")
+
+    file_name = f"{uuid.uuid4().hex}.csv"
+    path = import_root() / file_name
+    with path.open("wb") as target:
+        for chunk in upload.chunks():
+            target.write(chunk)
+    try:
+        columns, delimiter, header_size = _read_header(path, kind)
+        if kind == ImportJob.Kind.PROCESS and not worker and "worker" not in columns:
+            raise ValueError("Укажите сотрудника: параметр «worker» или столбец worker.")
+    except ValueError:
+        path.unlink(missing_ok=True)
+        raise
+    return ImportJob.objects.create(
+        requested_by=user,
+        kind=kind,
+        params=params,
+        file_name=file_name,
+        file_size=path.stat().st_size,
+        columns=columns,
+        delimiter=delimiter,
+        position=header_size,
+        lines=1,
+    )
+
+
+def claim_next_import(stale_after: timedelta | None = None) -> ImportJob | None:
+    if stale_after is not None:
+        # Прерванное задание продолжится с последнего зафиксированного пакета.
+        ImportJob.objects.filter(
+            status=ImportJob.Status.RUNNING,
+            heartbeat_at__lt=timezone.now() - stale_after,
+        ).update(status=ImportJob.Status.PENDING)
+
+    for job_id in (
+        ImportJob.objects.filter(status=ImportJob.Status.PENDING)
+        .order_by("created_at")
+        .values_list("id", flat=True)[:10]
+    ):
+        now = timezone.now()
+        claimed = ImportJob.objects.filter(id=job_id, status=ImportJob.Status.PENDING).update(
+            status=ImportJob.Status.RUNNING,
+            heartbeat_at=now,
+        )
+        if claimed:
+            job = ImportJob.objects.get(id=job_id)
+            if job.started_at is None:
+                job.started_at = now
+                job.save(update_fields=["started_at"])
+            return job
+    return None
+
+
+def _records(handle, job: ImportJob) -> Iterator[Record]:
+    offset = job.position
+
+    def lines() -> Iterator[str]:
+        nonlocal offset
+        for raw in iter(handle.readline, b""):
+            offset += len(raw)
+            yield raw.decode("utf-8")
+
+    # csv.reader не читает вперёд: после каждой записи offset указывает на её конец.
+    reader = csv.reader(lines(), delimiter=job.delimiter)
+    base = job.lines
+    consumed = 0
+    for cells in reader:
+        line = base + consumed + 1
+        consumed = reader.line_num
+        if not any(cell.strip() for cell in cells):
+            continue
+        values = {
+            name: cell.strip() for name, cell in zip(job.columns, cells) if name and cell.strip()
+        }
+        yield Record(line=line, values=values, offset=offset, lines=base + consumed)
+
+
+def _number(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return float(value.replace(",", "."))
+    except ValueError:
+        return None
+
+
+def _machine_name(job: ImportJob, values: dict[str, str]) -> str:
+    return values.get("machine") or job.params.get("machine") or DEFAULT_MACHINE
+
+
+def _default_machine(rows: list[dict[str, Any]]) -> None:
+    if any(row["machine"] == DEFAULT_MACHINE for row in rows):
+        _, created = Machine.objects.get_or_create(name=DEFAULT_MACHINE)
+        if created:
+            TableVersion.bump(Machine._meta.label_lower)
+
+
+def _rejections(records: list[Record], result: BatchResult) -> list[str]:
+    return [
+        f"Строка {records[index].line} пропущена: {' '.join(messages)}"
+        for index, messages in sorted(result.errors.items())
+    ]
+
+
+def _insert_entries(
+    job: ImportJob, records: list[Record], rows: list[dict[str, Any]]
+) -> ChunkResult:
+    _default_machine(rows)
+    worker = job.params.get("worker")
+    default_worker_id = (
+        User.objects.filter(username=worker, role=User.Role.WORKER)
+        .values_list("id", flat=True)
+        .first()
+        if worker
+        else None
+    )
+    result = validate_rows(rows, default_worker_id)
+    insert_entries(result.entries)
+    return ChunkResult(len(result.entries), _rejections(records, result))
+
+
+def _load_process(job: ImportJob, records: list[Record]) -> ChunkResult:
+    kept: list[Record] = []
+    rows: list[dict[str, Any]] = []
+    warnings: list[str] = []
+    for record in records:
+        values = record.values
+        if not all(values.get(name) for name in ("temperature", "vibration", "wear")):
+            warnings.append(f"Строка {record.line} пропущена: нет чисел t/v/w.")
+            continue
+        defect = _number(values.get("defect"))
+        kept.append(record)
+        rows.append(
+            {
+                "machine": _machine_name(job, values),
+                "detail": job.params.get("detail") or DEFAULT_DETAIL,
+                "parts_made": 1,
+                "defective_parts": 1 if defect is not None and defect >= 0.5 else 0,
+                "temperature": values["temperature"],
+                "vibration": values["vibration"],
+                "wear": values["wear"],
+                "recorded_at": values.get("recorded_at", ""),
+                "worker": values.get("worker", ""),
+                "note": IMPORT_NOTE,
+            }
+        )
+    result = _insert_entries(job, kept, rows)
+    return ChunkResult(result.accepted, warnings + result.warnings)
+
+
+def _load_employees(job: ImportJob, records: list[Record]) -> ChunkResult:
+    kept: list[Record] = []
+    rows: list[dict[str, Any]] = []
+    warnings: list[str] = []
+    names: dict[str, str] = {}
+    for record in records:
+        values = record.values
+        if not all(values.get(name) for name in REQUIRED_COLUMNS[ImportJob.Kind.EMPLOYEES]):
+            warnings.append(f"Строка {record.line} пропущена: нет id/name/даты/показателей.")
+            continue
+        employee_id = values["id"]
+        names.setdefault(employee_id.lower(), values["name"])
+        kept.append(record)
+        rows.append(
+            {
+                "worker": employee_id.lower(),
+                "machine": _machine_name(job, values),
+                "detail": f"Деталь {employee_id}",
+                "parts_made": values["parts_made"],
+                "defective_parts": values["defects"],
+                "temperature": values.get("avg_temp", ""),
+                "vibration": values.get("avg_vib", ""),
+                "wear": values.get("avg_wear", ""),
+                "shift": values.get("shift", ""),
+                "recorded_at": values["date"],
+                "note": IMPORT_NOTE,
+            }
+        )
+    # Строки ещё не заведённых сотрудников проверяются без поля worker: учётная запись
+    # создаётся только для тех, чья строка прошла проверку, и не остаётся от отклонённых.
+    logins = [row["worker"] for row in rows]
+    known = set(
+        User.objects.annotate(login=Lower("username"))
+        .filter(login__in=names)
+        .values_list("login", flat=True)
+    )
+    for row in rows:
+        if row["worker"] not in known:
+            row["worker"] = ""
+    _default_machine(rows)
+    result = validate_rows(rows, default_worker_id=0)
+    accepted = {logins[index] for index in result.indices} - known
+    if accepted:
+        # Сотрудники создаются как в fill_dummy_data: без пароля, вход настраивает администратор.
+        User.objects.bulk_create(
+            [
+                User(
+                    username=username,
+                    role=User.Role.WORKER,
+                    first_name=names[username],
+                    password=make_password(None),
+                )
+                for username in accepted
+            ],
+            ignore_conflicts=True,
+        )
+        TableVersion.bump(User._meta.label_lower)
+        ids = dict(User.objects.filter(username__in=accepted).values_list("username", "id"))
+        for index, entry in zip(result.indices, result.entries):
+            if logins[index] in accepted:
+                entry.worker_id = ids[logins[index]]
+    insert_entries(result.entries)
+    return ChunkResult(len(result.entries), warnings + _rejections(kept, result))
+
+
+def _integer_text(value: str) -> str:
+    # На дашборде остатки — любые числа; склад хранит целые, поэтому «12,0» принимается как 12.
+    try:
+        number = Decimal(value.replace(",", "."))
+    except InvalidOperation:
+        return value
+    return str(int(number)) if number.is_finite() and number == number.to_integral() else value
+
+
+def _load_inventory(job: ImportJob, records: list[Record]) -> ChunkResult:
+    warnings: list[str] = []
+    names = {record.values.get("tool_name", "") for record in records} - {""}
+    tools = {tool.name: tool for tool in Tool.objects.filter(name__in=names)}
+    created: dict[str, Tool] = {}
+    changed: dict[str, set[str]] = {}
+    previous_stock: dict[str, int] = {}
+    for record in records:
+        values = record.values
+        name = values.get("tool_name", "")[:180]
+        if not name or "stock" not in values or "min_threshold" not in values:
+            warnings.append(f"Строка {record.line} пропущена: нет названия или остатков.")
+            continue
+        patch: dict[str, Any] = {
+            "stock": _integer_text(values["stock"]),
+            "min_threshold": _integer_text(values["min_threshold"]),
+        }
+        if "location" in values:
+            patch["location"] = values["location"][:160]
+        if "avg_daily_outflow" in values:
+            patch["avg_daily_outflow"] = values["avg_daily_outflow"].replace(",", ".")
+        tool = tools.get(name) or created.get(name)
+        if tool is None:
+            tool = Tool(name=name)
+        changes, errors = parse_patch(tool, patch)
+        if errors:
+            warnings.append(f"Строка {record.line} пропущена: {' '.join(errors)}")
+            continue
+        if tool.pk is not None and "stock" in changes:
+            previous_stock.setdefault(name, tool.stock)
+        for field, value in changes.items():
+            setattr(tool, field, value)
+        if tool.pk is None:
+            created[name] = tool
+        elif changes:
+            changed.setdefault(name, set()).update(changes)
+
+    now = timezone.now()
+    for tool in created.values():
+        tool.last_updated_at = now
+    Tool.objects.bulk_create(created.values())
+    # bulk_update обходит auto_now и сигналы, как и пакетная правка склада.
+    groups: dict[tuple[str, ...], list[Tool]] = {}
+    for name, fields in changed.items():
+        tools[name].last_updated_at = now
+        groups.setdefault((*sorted(fields), "last_updated_at"), []).append(tools[name])
+    for fields, group in groups.items():
+        Tool.objects.bulk_update(group, fields, batch_size=500)
+    StockMovement.objects.bulk_create(
+        stock_movements(
+            ((tools[name], stock) for name, stock in previous_stock.items()),
+            StockMovement.Source.IMPORT,
+            now,
+        )
+    )
+    if created or changed:
+        TableVersion.bump(Tool._meta.label_lower)
+    return ChunkResult(len(records) - len(warnings), warnings)
+
+
+LOADERS: dict[str, Callable[[ImportJob, list[Record]], ChunkResult]] = {
+    ImportJob.Kind.PROCESS: _load_process,
+    ImportJob.Kind.EMPLOYEES: _load_employees,
+    ImportJob.Kind.INVENTORY: _load_inventory,
+}
+
+
+def _commit_chunk(job: ImportJob, records: list[Record]) -> None:
+    last = records[-1]
+    with transaction.atomic():
+        # Позиция сдвигается в той же транзакции, что и вставка: после сбоя пакет либо
+        # зафиксирован целиком вместе с позицией, либо будет прочитан заново.
+        moved = ImportJob.objects.filter(
+            pk=job.pk, status=ImportJob.Status.RUNNING, position=job.position
+        ).update(position=last.offset, lines=last.lines, heartbeat_at=timezone.now())
+        if not moved:
+            raise ImportSuperseded
+        result = LOADERS[job.kind](job, records)
+        job.position, job.lines = last.offset, last.lines
+        job.accepted += result.accepted
+        job.rejected += len(result.warnings)
+        room = MAX_WARNINGS - len(job.warnings)
+        if room > 0:
+            job.warnings = [*job.warnings, *result.warnings[:room]]
+        job.save(update_fields=["accepted", "rejected", "warnings"])
+
+
+def _finish(job: ImportJob, status: str, error: str = "") -> ImportJob:
+    job.status = status
+    job.error = error
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "error", "finished_at"])
+    return job
+
+
+def run_import(
+    job: ImportJob, chunk_rows: int = CHUNK_ROWS, max_chunks: int | None = None
+) -> ImportJob:
+    """Загружает файл пакетами по chunk_rows строк; max_chunks ограничивает один прогон."""
+    chunks = 0
+    try:
+        with import_path(job).open("rb") as handle:
+            handle.seek(job.position)
+            records = _records(handle, job)
+            while max_chunks is None or chunks < max_chunks:
+                batch = list(islice(records, chunk_rows))
+                if not batch:
+                    break
+                _commit_chunk(job, batch)
+                chunks += 1
+            else:
+                # Прогон остановлен по лимиту: задание ждёт следующего обработчика.
+                ImportJob.objects.filter(pk=job.pk).update(status=ImportJob.Status.PENDING)
+                job.status = ImportJob.Status.PENDING
+                return job
+    except ImportSuperseded:
+        job.refresh_from_db()
+        return job
+    except UnicodeDecodeError:
+        return _finish(
+            job,
+            ImportJob.Status.FAILED,
+            f"Строка {job.lines + 1}: файл должен быть в кодировке UTF-8.",
+        )
+    except Exception as exc:
+        return _finish(job, ImportJob.Status.FAILED, f"{type(exc).__name__}: {exc}")
+    import_path(job).unlink(missing_ok=True)
+    return _finish(job, ImportJob.Status.DONE)
+
+
+def import_to_dict(job: ImportJob) -> dict[str, Any]:
+    if job.status == ImportJob.Status.DONE or not job.file_size:
+        progress = 100.0 if job.status == ImportJob.Status.DONE else 0.0
+    else:
+        progress = round(100 * job.position / job.file_size, 1)
+    return {
+        "id": job.pk,
+        "kind": job.kind,
+        "params": job.params,
+        "status": job.status,
+        "status_display": job.get_status_display(),
+        "progress": progress,
+        "lines": job.lines,
+        "accepted": job.accepted,
+        "rejected": job.rejected,
+        "warnings": job.warnings,
+        "error": job.error or None,
+        "created_at": timezone.localtime(job.created_at).isoformat(),
+        "finished_at": timezone.localtime(job.finished_at).isoformat()
+        if job.finished_at
+        else None,
+    }
+
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import StockMovement, TableVersion, Tool, ToolIssue, User
+
+MAX_BATCH_ITEMS = 1000
+INT_FIELDS = ("stock", "defective_stock", "min_threshold")
+
+
+def report_defects(
+    tool_id: int, reported_by: User, defective_count: int, description: str = ""
+) -> ToolIssue:
+    # Первая операция транзакции — запись, поэтому SQLite сразу берёт блокировку на запись
+    # и не повышает её после чтения; счётчик увеличивается на стороне БД без потерь.
+    with transaction.atomic():
+        issue = ToolIssue.objects.create(
+            tool_id=tool_id,
+            reported_by=reported_by,
+            defective_count=defective_count,
+            description=description,
+        )
+        Tool.objects.filter(pk=tool_id).update(
+            defective_stock=F("defective_stock") + defective_count,
+            last_updated_at=timezone.now(),
+        )
+        TableVersion.bump(Tool._meta.label_lower)
+    return issue
+
+
+def parse_patch(tool: Tool, payload: dict[str, Any]) -> tuple[dict[str, Any], list[str]]:
+    """Проверяет правку остатков и возвращает только изменившиеся поля."""
+    changes: dict[str, Any] = {}
+    errors: list[str] = []
+
+    for name in INT_FIELDS:
+        if name not in payload:
+            continue
+        value = payload.get(name)
+        if value in ("", None):
+            errors.append(f"Поле «{name}» не может быть пустым.")
+            continue
+        try:
+            candidate = int(value)
+        except (TypeError, ValueError):
+            errors.append(f"Поле «{name}» должно быть числом.")
+            continue
+        if candidate < 0:
+            errors.append(f"Поле «{name}» должно быть неотрицательным.")
+        elif candidate != getattr(tool, name):
+            changes[name] = candidate
+
+    if "avg_daily_outflow" in payload:
+        avg_value = payload.get("avg_daily_outflow")
+        avg_daily_outflow: Decimal | None = None
+        valid = True
+        if avg_value not in (None, ""):
+            try:
+                avg_daily_outflow = Decimal(str(avg_value))
+                if not avg_daily_outflow.is_finite():
+                    raise ValueError
+                if avg_daily_outflow < 0:
+                    errors.append("Поле «avg_daily_outflow» должно быть неотрицательным.")
+                    valid = False
+            except (InvalidOperation, TypeError, ValueError):
+                errors.append("Поле «avg_daily_outflow» должно быть числом.")
+                valid = False
+        if valid and avg_daily_outflow != tool.avg_daily_outflow:
+            changes["avg_daily_outflow"] = avg_daily_outflow
+
+    if "location" in payload:
+        location = str(payload.get("location") or "")
+        if location != tool.location:
+            changes["location"] = location
+
+    return changes, errors
+
+
+def stock_movements(
+    changed: Iterable[tuple[Tool, int]], source: str, now: datetime
+) -> list[StockMovement]:
+    """Движения для пакетных правок: bulk_update не вызывает сигнал, который пишет их сам."""
+    return [
+        StockMovement(
+            tool=tool,
+            delta=tool.stock - previous,
+            stock_after=tool.stock,
+            source=source,
+            recorded_at=now,
+        )
+        for tool, previous in changed
+        if tool.stock != previous
+    ]
+
+
+@dataclass
+class BatchUpdate:
+    results: list[dict[str, Any]] = field(default_factory=list)
+    tools: dict[int, Tool] = field(default_factory=dict)
+    updated: int = 0
+    rejected: int = 0
+
+
+def apply_patches(items: list[Any]) -> BatchUpdate:
+    batch = BatchUpdate()
+    ids: set[int] = set()
+    for item in items:
+        if isinstance(item, dict):
+            try:
+                ids.add(int(item.get("id")))
+            except (TypeError, ValueError):
+                pass
+    batch.tools = Tool.objects.select_related("forecast").in_bulk(ids)
+
+    pending: dict[int, set[str]] = defaultdict(set)
+    previous_stock: dict[int, int] = {}
+    for index, item in enumerate(items):
+        result: dict[str, Any] = {"index": index, "id": None}
+        batch.results.append(result)
+        if not isinstance(item, dict):
+            result["errors"] = ["Элемент должен быть JSON-объектом."]
+            continue
+        try:
+            pk = int(item.get("id"))
+        except (TypeError, ValueError):
+            result["errors"] = ["Поле «id» обязательно и должно быть числом."]
+            continue
+        result["id"] = pk
+        tool = batch.tools.get(pk)
+        if tool is None:
+            result["errors"] = [f"Инструмент {pk} не найден."]
+            continue
+        changes, errors = parse_patch(tool, item)
+        if errors:
+            result["errors"] = errors
+            continue
+        if "stock" in changes:
+            previous_stock.setdefault(pk, tool.stock)
+        for name, value in changes.items():
+            setattr(tool, name, value)
+        pending[pk].update(changes)
+        result["changed"] = sorted(changes)
+
+    # bulk_update обходит auto_now и сигналы: время правки и версию таблицы выставляем сами.
+    now = timezone.now()
+    groups: dict[tuple[str, ...], list[Tool]] = defaultdict(list)
+    for pk, fields in pending.items():
+        if fields:
+            tool = batch.tools[pk]
+            tool.last_updated_at = now
+            groups[(*sorted(fields), "last_updated_at")].append(tool)
+    if groups:
+        with transaction.atomic():
+            for fields, tools in groups.items():
+                Tool.objects.bulk_update(tools, fields, batch_size=500)
+            StockMovement.objects.bulk_create(
+                stock_movements(
+                    ((batch.tools[pk], stock) for pk, stock in previous_stock.items()),
+                    StockMovement.Source.BATCH,
+                    now,
+                )
+            )
+            TableVersion.bump(Tool._meta.label_lower)
+
+    for result in batch.results:
+        if "errors" in result:
+            batch.rejected += 1
+        elif result["changed"]:
+            batch.updated += 1
+    return batch
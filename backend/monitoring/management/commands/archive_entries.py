@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from monitoring import retention
+
+
+class Command(BaseCommand):
+    help = (
+        "Переносит записи производства старше горизонта хранения в помесячный архив; "
+        "дневные сводки сохраняются. Работает короткими транзакциями, без остановки сервиса."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.RETENTION_DAYS,
+            help="Горизонт хранения в днях (по умолчанию settings.RETENTION_DAYS).",
+        )
+        parser.add_argument(
+            "--keys-days",
+            type=int,
+            default=settings.INGEST_KEY_RETENTION_DAYS,
+            help="Сколько дней хранить ключи идемпотентности пакетов шлюзов "
+            "(по умолчанию settings.INGEST_KEY_RETENTION_DAYS).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=retention.DEFAULT_BATCH_SIZE,
+            help="Записей в одной транзакции.",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=None,
+            help="Остановиться после N пакетов (остаток перенесёт следующий запуск).",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=retention.DEFAULT_PAUSE,
+            help="Пауза между пакетами в секундах, чтобы не задерживать запись сервиса.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать, сколько записей по месяцам будет перенесено.",
+        )
+        parser.add_argument(
+            "--vacuum",
+            action="store_true",
+            help="После переноса сжать файл SQLite (VACUUM блокирует запись на время работы).",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options["days"] < 1:
+            raise CommandError("Горизонт хранения должен быть не меньше 1 дня.")
+        if options["keys_days"] < 1:
+            raise CommandError("Срок хранения ключей идемпотентности должен быть не меньше 1 дня.")
+        if options["batch_size"] < 1:
+            raise CommandError("Размер пакета должен быть положительным.")
+        now = timezone.now()
+        cutoff = now - timedelta(days=options["days"])
+        keys_cutoff = now - timedelta(days=options["keys_days"])
+        self.stdout.write(f"Граница архива: {timezone.localtime(cutoff):%Y-%m-%d %H:%M}.")
+
+        if options["dry_run"]:
+            months = retention.pending_months(cutoff)
+            for month, count in sorted(months.items()):
+                self.stdout.write(f"  {month:%Y-%m}: {count}")
+            self.stdout.write(f"Будет перенесено записей: {sum(months.values())}.")
+            keys = retention.expired_ingest_batches(keys_cutoff).count()
+            self.stdout.write(f"Будет удалено ключей идемпотентности: {keys}.")
+            return
+
+        started = time.perf_counter()
+        result = retention.archive_entries(
+            cutoff,
+            batch_size=options["batch_size"],
+            max_batches=options["max_batches"],
+            pause=max(options["pause"], 0.0),
+        )
+        for month, count in sorted(result.months.items()):
+            self.stdout.write(f"  {month:%Y-%m}: {count}")
+        keys = retention.prune_ingest_batches(keys_cutoff)
+        self.stdout.write(f"Удалено ключей идемпотентности: {keys}.")
+        if options["vacuum"]:
+            retention.compact()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"В архив перенесено {result.moved} записей ({result.batches} пакетов) "
+                f"за {elapsed:.1f} с."
+            )
+        )
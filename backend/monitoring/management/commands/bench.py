@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import json
+import platform
+import subprocess
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.utils import timezone
+
+from monitoring.benchmarking import (
+    QueryRecorder,
+    drain,
+    measure_peak,
+    parse_scale,
+    percentile,
+    seed_entries,
+    temporary_database,
+)
+from monitoring.models import Tool, User
+from monitoring.response_cache import CACHE_ALIAS
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    role: str
+    method: str
+    path: Callable[[], str]
+    body: Callable[[int], dict[str, Any]] | None = None
+    max_iterations: int | None = None
+    conditional: bool = False
+
+
+def _first_tool_path() -> str:
+    return f"/api/manager/inventory/{Tool.objects.order_by('id').values_list('id', flat=True)[0]}/"
+
+
+SCENARIOS = (
+    Scenario("dashboard_manager", "manager", "get", lambda: "/"),
+    Scenario("dashboard_worker", "worker", "get", lambda: "/"),
+    Scenario("api_process_rows", "manager", "get", lambda: "/api/manager/process/"),
+    Scenario("api_employee_rows", "manager", "get", lambda: "/api/manager/employees/"),
+    Scenario("api_inventory_rows", "manager", "get", lambda: "/api/manager/inventory/"),
+    Scenario(
+        "api_process_rows_304", "manager", "get", lambda: "/api/manager/process/", conditional=True
+    ),
+    Scenario(
+        "api_employee_rows_304",
+        "manager",
+        "get",
+        lambda: "/api/manager/employees/",
+        conditional=True,
+    ),
+    Scenario(
+        "api_inventory_rows_304",
+        "manager",
+        "get",
+        lambda: "/api/manager/inventory/",
+        conditional=True,
+    ),
+    Scenario(
+        "api_inventory_update",
+        "manager",
+        "patch",
+        _first_tool_path,
+        body=lambda iteration: {"stock": 100 + iteration % 50},
+    ),
+    Scenario("export_excel", "manager", "get", lambda: "/export/excel/", max_iterations=3),
+)
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный замер основных представлений: задержки p50/p95/p99 с пустыми и прогретыми "
+        "кешами, число и время SQL, пик памяти и размер ответа на синтетической базе."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--scales",
+            nargs="+",
+            default=["1k", "100k"],
+            help="Объёмы базы: 1k, 100k, 1m и т. п.",
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=20,
+            help="Число запросов к каждому представлению.",
+        )
+        parser.add_argument(
+            "--views",
+            nargs="+",
+            choices=[scenario.name for scenario in SCENARIOS],
+            help="Замерить только указанные представления.",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default="bench_results.json",
+            help="Файл для результатов в формате JSON.",
+        )
+        parser.add_argument(
+            "--baseline",
+            type=str,
+            help="JSON предыдущего прогона для сравнения.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.25,
+            help="Допустимый рост p95 относительно базового прогона (0.25 = +25%%).",
+        )
+        parser.add_argument("--seed", type=int, default=42, help="Зерно генератора.")
+
+    def handle(self, *args, **options) -> None:
+        scenarios = [
+            scenario
+            for scenario in SCENARIOS
+            if not options["views"] or scenario.name in options["views"]
+        ]
+        iterations = max(options["iterations"], 1)
+        report: dict[str, Any] = {
+            "meta": {
+                "revision": _git_revision(),
+                "created_at": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "iterations": iterations,
+            },
+            "results": {},
+        }
+
+        for label in options["scales"]:
+            size = parse_scale(label)
+            self.stdout.write(self.style.MIGRATE_HEADING(f"Объём {label} ({size} записей)"))
+            with temporary_database():
+                started = time.perf_counter()
+                seed_entries(size, seed=options["seed"])
+                self.stdout.write(f"  наполнение: {time.perf_counter() - started:.1f} с")
+                report["results"][label] = self._run_scale(scenarios, iterations)
+
+        output = Path(options["output"])
+        output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        self.stdout.write(self.style.SUCCESS(f"Результаты записаны в {output}"))
+
+        if options["baseline"]:
+            self._compare(report, Path(options["baseline"]), options["threshold"])
+
+    def _clients(self) -> dict[str, Client]:
+        manager = User.objects.create(username="bench-manager", role=User.Role.MANAGER)
+        worker = User.objects.filter(role=User.Role.WORKER).order_by("id").first()
+        clients = {}
+        for role, user in (("manager", manager), ("worker", worker)):
+            client = Client(SERVER_NAME="localhost")
+            client.force_login(user)
+            clients[role] = client
+        return clients
+
+    def _request(
+        self,
+        client: Client,
+        scenario: Scenario,
+        path: str,
+        iteration: int,
+        headers: dict[str, str],
+    ) -> tuple[Any, int]:
+        kwargs: dict[str, Any] = {"headers": headers}
+        if scenario.body is not None:
+            kwargs["data"] = json.dumps(scenario.body(iteration))
+            kwargs["content_type"] = "application/json"
+        response = getattr(client, scenario.method)(path, **kwargs)
+        return response, drain(response)
+
+    def _series(
+        self,
+        client: Client,
+        scenario: Scenario,
+        path: str,
+        runs: int,
+        cold: bool,
+        headers: dict[str, str],
+    ) -> tuple[dict[str, Any], Any, int]:
+        latencies: list[float] = []
+        query_counts: list[int] = []
+        query_seconds: list[float] = []
+        response, payload = None, 0
+        for iteration in range(runs):
+            if cold:
+                self._clear_caches()
+            recorder = QueryRecorder()
+            with connection.execute_wrapper(recorder):
+                started = time.perf_counter()
+                response, payload = self._request(client, scenario, path, iteration, headers)
+                latencies.append(time.perf_counter() - started)
+            query_counts.append(recorder.count)
+            query_seconds.append(recorder.seconds)
+        timings = {
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "queries": max(query_counts),
+            "sql_ms": round(percentile(query_seconds, 50) * 1000, 2),
+        }
+        return timings, response, payload
+
+    def _clear_caches(self) -> None:
+        caches[CACHE_ALIAS].clear()
+        caches["default"].clear()
+
+    def _run_scale(self, scenarios: list[Scenario], iterations: int) -> dict[str, Any]:
+        clients = self._clients()
+        results: dict[str, Any] = {}
+        for scenario in scenarios:
+            client = clients[scenario.role]
+            path = scenario.path()
+            runs = min(iterations, scenario.max_iterations or iterations)
+            headers: dict[str, str] = {}
+            result: dict[str, Any] = {"iterations": runs}
+            if scenario.conditional:
+                # 304 имеет смысл только с ETag прогретого ответа.
+                self._clear_caches()
+                warmup = client.get(path)
+                drain(warmup)
+                headers["If-None-Match"] = warmup.get("ETag", "")
+                modes = ("warm",)
+            elif scenario.method == "get":
+                modes = ("cold", "warm")
+            else:
+                modes = ("cold",)
+
+            for mode in modes:
+                if mode == "warm" and not scenario.conditional:
+                    self._clear_caches()
+                    drain(client.get(path))
+                timings, response, payload = self._series(
+                    client, scenario, path, runs, mode == "cold", headers
+                )
+                result[mode] = timings
+                result["status"] = response.status_code
+                result["response_bytes"] = payload
+
+            # Пик памяти — отдельным запросом под tracemalloc: он замедляет код и исказил бы
+            # задержки, зато не копится между сценариями, как ru_maxrss процесса.
+            if "cold" in modes:
+                self._clear_caches()
+            _, peak = measure_peak(lambda: self._request(client, scenario, path, runs, headers))
+            result["peak_mb"] = round(peak / (1024 * 1024), 2)
+            results[scenario.name] = result
+
+            columns = " | ".join(
+                f"{mode} p50 {result[mode]['p50_ms']:>8.1f} p95 {result[mode]['p95_ms']:>8.1f} мс "
+                f"SQL {result[mode]['queries']:>3}"
+                for mode in modes
+            )
+            self.stdout.write(
+                f"  {scenario.name:<22} {result['status']} {columns}; "
+                f"память {result['peak_mb']} МБ, ответ {result['response_bytes']} Б"
+            )
+        return results
+
+    def _compare(self, report: dict[str, Any], baseline_path: Path, threshold: float) -> None:
+        try:
+            baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as exc:
+            raise CommandError(f"Не удалось прочитать базовый прогон: {exc}") from exc
+
+        regressions: list[str] = []
+        for scale, views in report["results"].items():
+            for name, result in views.items():
+                # Сравнивается прогон без кешей: он отражает работу самого представления.
+                current = _primary(result)
+                previous = baseline.get("results", {}).get(scale, {}).get(name)
+                previous = _primary(previous) if previous else None
+                if not previous or not previous.get("p95_ms"):
+                    continue
+                ratio = current["p95_ms"] / previous["p95_ms"]
+                line = (
+                    f"{scale}/{name}: p95 {previous['p95_ms']} → {current['p95_ms']} мс "
+                    f"(×{ratio:.2f}), SQL {previous['queries']} → {current['queries']}"
+                )
+                if ratio > 1 + threshold or current["queries"] > previous["queries"]:
+                    regressions.append(line)
+                    self.stdout.write(self.style.ERROR(f"  регрессия {line}"))
+                else:
+                    self.stdout.write(f"  {line}")
+        if regressions:
+            raise CommandError(f"Обнаружены регрессии: {len(regressions)}.")
+
+
+def _primary(result: dict[str, Any]) -> dict[str, Any]:
+    # Прогоны до разделения на cold/warm хранили задержки прямо в результате.
+    return result.get("cold") or result.get("warm") or result
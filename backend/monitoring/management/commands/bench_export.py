@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from openpyxl import Workbook
+
+from monitoring.benchmarking import format_bytes, measure_peak, seed_entries, temporary_database
+from monitoring.exports import ISSUE_HEADER, PRODUCTION_HEADER, TOOL_HEADER, spool_workbook
+from monitoring.models import ProductionEntry, Tool, ToolIssue
+
+
+def build_in_memory() -> int:
+    # Прежний путь export_excel: полная книга в памяти и объекты моделей.
+    workbook = Workbook()
+    production_sheet = workbook.active
+    production_sheet.title = "Производство"
+    production_sheet.append(PRODUCTION_HEADER)
+    for entry in ProductionEntry.objects.select_related("worker", "machine").order_by(
+        "-recorded_at"
+    ):
+        production_sheet.append(
+            [
+                entry.recorded_at.strftime("%Y-%m-%d %H:%M"),
+                entry.worker.get_full_name() or entry.worker.username,
+                entry.shift,
+                entry.machine.name,
+                entry.machine.subdivision,
+                entry.detail_name,
+                entry.parts_made,
+                entry.defective_parts,
+                entry.temperature_c,
+                entry.vibration_mm,
+                entry.tool_wear_percent,
+                entry.note,
+            ]
+        )
+    tool_sheet = workbook.create_sheet("Инструменты")
+    tool_sheet.append(TOOL_HEADER)
+    for tool in Tool.objects.all():
+        tool_sheet.append(
+            [
+                tool.name,
+                tool.stock,
+                tool.defective_stock,
+                tool.min_threshold,
+                tool.location,
+                tool.avg_daily_outflow,
+                tool.last_updated_at.strftime("%Y-%m-%d %H:%M"),
+            ]
+        )
+    issues_sheet = workbook.create_sheet("Сообщения")
+    issues_sheet.append(ISSUE_HEADER)
+    for issue in ToolIssue.objects.select_related("tool", "reported_by").all():
+        issues_sheet.append(
+            [
+                issue.recorded_at.strftime("%Y-%m-%d %H:%M"),
+                issue.reported_by.get_full_name() or issue.reported_by.username,
+                issue.tool.name,
+                issue.defective_count,
+                issue.description,
+            ]
+        )
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.tell()
+
+
+def build_streaming() -> int:
+    with spool_workbook() as handle:
+        handle.seek(0, io.SEEK_END)
+        return handle.tell()
+
+
+class Command(BaseCommand):
+    help = "Сравнивает пиковую память выгрузки Excel в памяти и потоковой выгрузки."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--rows",
+            type=int,
+            nargs="+",
+            default=[1_000, 10_000, 50_000],
+            help="Число записей производства для каждого прогона.",
+        )
+        parser.add_argument(
+            "--skip-legacy",
+            action="store_true",
+            help="Не запускать прежнюю выгрузку (для больших объёмов).",
+        )
+        parser.add_argument("--seed", type=int, default=42, help="Зерно генератора.")
+
+    def handle(self, *args, **options) -> None:
+        for size in options["rows"]:
+            with temporary_database():
+                seed_entries(size, seed=options["seed"])
+                results = []
+                if not options["skip_legacy"]:
+                    results.append(("в памяти", build_in_memory))
+                results.append(("потоково", build_streaming))
+                for label, builder in results:
+                    started = time.perf_counter()
+                    file_size, peak = measure_peak(builder)
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(
+                        f"{size:>9} записей, {label:<9}: пик {format_bytes(peak):>10}, "
+                        f"{elapsed:6.2f} с, файл {format_bytes(file_size)}"
+                    )
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import math
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from monitoring import forecasting
+from monitoring.benchmarking import temporary_database
+from monitoring.models import StockMovement, Tool, ToolForecast, ToolIssue, User
+
+
+def seed_tools(count: int, events: int, window: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    worker = User.objects.create(
+        username="bench-worker", role=User.Role.WORKER, password=make_password("worker123")
+    )
+    tools = Tool.objects.bulk_create(
+        [
+            Tool(
+                name=f"Инструмент {index:06d}",
+                stock=int(rng.integers(0, 400)),
+                defective_stock=int(rng.integers(0, 5)),
+                min_threshold=int(rng.integers(5, 40)),
+                avg_daily_outflow=Decimal(str(round(float(rng.uniform(0.2, 6.0)), 2))),
+            )
+            for index in range(count)
+        ],
+        batch_size=2000,
+    )
+    # Треть инструментов списывается со склада, треть известна только по сообщениям о браке,
+    # у остальных истории нет.
+    today = timezone.localdate()
+    midnight = timezone.make_aware(datetime.combine(today, datetime.min.time()))
+    ages = rng.integers(1, window + 1, size=count * events)
+    owners = np.repeat(np.arange(count), events)
+    moved = owners % 3 == 0
+    StockMovement.objects.bulk_create(
+        (
+            StockMovement(
+                tool=tools[owner],
+                delta=-int(rng.integers(1, 6)),
+                stock_after=tools[owner].stock,
+                recorded_at=midnight - timedelta(days=int(age)) + timedelta(hours=10),
+            )
+            for owner, age in zip(owners[moved].tolist(), ages[moved].tolist())
+        ),
+        batch_size=2000,
+    )
+    # recorded_at у сообщений ставится при создании: сообщения одного дня идут подряд по id
+    # и сдвигаются в прошлое одним UPDATE на день.
+    reported = owners % 3 == 1
+    order = np.argsort(ages[reported], kind="stable")
+    issue_owners = owners[reported][order].tolist()
+    issue_ages = ages[reported][order]
+    created = ToolIssue.objects.bulk_create(
+        (
+            ToolIssue(
+                tool=tools[owner], reported_by=worker, defective_count=int(rng.integers(1, 4))
+            )
+            for owner in issue_owners
+        ),
+        batch_size=2000,
+    )
+    ids = np.array([issue.pk for issue in created])
+    for age in np.unique(issue_ages).tolist():
+        day_ids = ids[issue_ages == age]
+        ToolIssue.objects.filter(pk__range=(int(day_ids.min()), int(day_ids.max()))).update(
+            recorded_at=midnight - timedelta(days=age) + timedelta(hours=14)
+        )
+
+
+def reference_days(tool: Tool, window: int, halflife: float, today) -> float:
+    # Построчный эталон: свои запросы на инструмент и пошаговая развёртка по дням.
+    first_day = today - timedelta(days=window)
+    consumption = [0.0] * window
+    moves = StockMovement.objects.filter(tool=tool, delta__lt=0)
+    issues = ToolIssue.objects.filter(tool=tool)
+    source = [(-move.delta, move.recorded_at) for move in moves]
+    if not any(0 <= (timezone.localtime(at).date() - first_day).days < window for _, at in source):
+        source = [(issue.defective_count, issue.recorded_at) for issue in issues]
+    for amount, at in source:
+        offset = (timezone.localtime(at).date() - first_day).days
+        if 0 <= offset < window:
+            consumption[offset] += amount
+    weights = [0.5 ** ((window - 1 - day) / halflife) for day in range(window)]
+    rate = sum(w * c for w, c in zip(weights, consumption)) / sum(weights)
+    if not any(consumption):
+        rate = float(tool.avg_daily_outflow or 0)
+        factors = [1.0] * 7
+    else:
+        sums, days = [0.0] * 7, [0] * 7
+        for day, value in enumerate(consumption):
+            weekday = (first_day + timedelta(days=day)).weekday()
+            sums[weekday] += value
+            days[weekday] += 1
+        means = [total / n for total, n in zip(sums, days)]
+        factors = [mean * 7 / sum(means) for mean in means]
+    remaining = max(tool.stock - tool.defective_stock, 0)
+    if remaining == 0:
+        return 0.0
+    for day in range(forecasting.HORIZON_DAYS * 2):
+        used = rate * factors[(today + timedelta(days=day)).weekday()]
+        if used >= remaining:
+            return day + remaining / used
+        remaining -= used
+    return math.inf
+
+
+class Command(BaseCommand):
+    help = "Замеряет пересчёт прогноза расхода для десятков тысяч инструментов."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--tools",
+            type=int,
+            nargs="+",
+            default=[10_000, 50_000],
+            help="Число инструментов в базе для каждого прогона.",
+        )
+        parser.add_argument(
+            "--events", type=int, default=8, help="Списаний или сообщений на инструмент."
+        )
+        parser.add_argument(
+            "--check", type=int, default=200, help="Инструментов для сверки с эталоном."
+        )
+        parser.add_argument("--seed", type=int, default=42, help="Зерно генератора.")
+
+    def handle(self, *args, **options) -> None:
+        window, halflife = forecasting.DEFAULT_WINDOW, forecasting.DEFAULT_HALFLIFE
+        for size in options["tools"]:
+            with temporary_database():
+                self.stdout.write(f"Наполнение базы: {size} инструментов…")
+                seed_tools(size, options["events"], window, options["seed"])
+
+                started = time.perf_counter()
+                result = forecasting.refresh_forecasts(window, halflife)
+                elapsed = time.perf_counter() - started
+                timings = ", ".join(
+                    f"{name} {value * 1000:.0f} мс" for name, value in result.timings.items()
+                )
+                self.stdout.write(f"  векторно: {elapsed:.2f} с ({timings}), {result.basis}")
+
+                today = timezone.localdate()
+                sample = list(
+                    Tool.objects.select_related("forecast").order_by("?")[: options["check"]]
+                )
+                started = time.perf_counter()
+                expected = [reference_days(tool, window, halflife, today) for tool in sample]
+                per_tool = (time.perf_counter() - started) / max(len(sample), 1)
+                mismatched = sum(
+                    1
+                    for tool, days in zip(sample, expected)
+                    if not _close(tool.forecast, days)
+                )
+                if mismatched:
+                    self.stderr.write(
+                        self.style.ERROR(f"  расходится с эталоном: {mismatched} из {len(sample)}")
+                    )
+                self.stdout.write(
+                    f"  построчно: {per_tool * 1000:.1f} мс на инструмент, "
+                    f"≈{per_tool * size:.0f} с на все; сверено {len(sample)}"
+                )
+
+
+def _close(forecast: ToolForecast, days: float) -> bool:
+    if forecast.days_to_zero is None:
+        return math.isinf(days)
+    return abs(forecast.days_to_zero - days) <= 0.01 + 1e-6 * days
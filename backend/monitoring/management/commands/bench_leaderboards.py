@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import json
+import time
+from collections import defaultdict
+from typing import Any
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from monitoring.benchmarking import format_bytes, percentile, seed_entries, temporary_database
+from monitoring.models import ProductionEntry, User
+from monitoring.pagination import MAX_PAGE_SIZE
+from monitoring.response_cache import CACHE_ALIAS
+from monitoring.views import api_employee_leaders, api_employee_rows, api_employee_series
+
+LEADERS = 5
+
+
+def client_side(rows: list[dict[str, Any]], shift: str, worker: str) -> dict[str, Any]:
+    # Построчный эталон: buildEmployeeAnalytics, topEmployeesBy* и buildDailySeries из src/utils.ts.
+    by_employee: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    by_date: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    for row in rows:
+        if shift and row["shift"] != shift or worker and row["id"] != worker:
+            continue
+        by_employee[row["id"]].append(row)
+        by_date[row["date"]].append(row)
+    totals = []
+    for group in by_employee.values():
+        parts = sum(row["parts_made"] for row in group)
+        defects = sum(row["defects"] for row in group)
+        rate = defects / parts * 100 if parts > 0 else 0.0
+        totals.append({"id": group[0]["id"], "total": parts, "defects": defects, "rate": rate})
+    series = [
+        {
+            "date": day,
+            "parts": sum(row["parts_made"] for row in by_date[day]),
+            "defects": sum(row["defects"] for row in by_date[day]),
+        }
+        for day in sorted(by_date)
+    ]
+    return {
+        "parts": sorted(totals, key=lambda row: -row["total"])[:LEADERS],
+        "defect_rate": sorted(totals, key=lambda row: -row["rate"])[:LEADERS],
+        "series": series,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает рейтинги сотрудников и дневной ряд в SQL по сводкам с расчётом на клиенте "
+        "по всем строкам /api/manager/employees/."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--rows",
+            type=int,
+            nargs="+",
+            default=[10_000, 100_000],
+            help="Число записей в базе для каждого прогона.",
+        )
+        parser.add_argument("--iterations", type=int, default=5, help="Замеров на фильтр.")
+        parser.add_argument("--seed", type=int, default=42, help="Зерно генератора.")
+
+    def _call(self, view, path: str, params: dict[str, str]) -> tuple[bytes, dict[str, Any]]:
+        request = self.factory.get(path, params)
+        request.user = self.manager
+        response = view(request)
+        return response.content, json.loads(response.content)
+
+    def _download(self) -> tuple[list[dict[str, Any]], int]:
+        rows: list[dict[str, Any]] = []
+        size = 0
+        params = {"limit": str(MAX_PAGE_SIZE)}
+        while True:
+            content, payload = self._call(api_employee_rows, "/api/manager/employees/", params)
+            size += len(content)
+            rows.extend(payload["rows"])
+            if not payload["has_more"]:
+                return rows, size
+            params["cursor"] = payload["next_cursor"]
+
+    def _server_side(self, params: dict[str, str]) -> tuple[dict[str, Any], int]:
+        result: dict[str, Any] = {}
+        size = 0
+        for by in ("parts", "defect_rate"):
+            content, payload = self._call(
+                api_employee_leaders,
+                "/api/manager/employees/leaders/",
+                {**params, "by": by, "limit": str(LEADERS)},
+            )
+            size += len(content)
+            result[by] = payload["rows"]
+        content, payload = self._call(api_employee_series, "/api/manager/employees/series/", params)
+        result["series"] = payload["rows"]
+        return result, size + len(content)
+
+    def handle(self, *args, **options) -> None:
+        self.factory = RequestFactory()
+        response_cache = caches[CACHE_ALIAS]
+        iterations = max(options["iterations"], 1)
+        for size in options["rows"]:
+            with temporary_database():
+                self.stdout.write(f"Наполнение базы: {size} записей…")
+                seed_entries(size, seed=options["seed"])
+                self.manager = User.objects.create(
+                    username="bench-manager", role=User.Role.MANAGER
+                )
+                shift = ProductionEntry.objects.values_list("shift", flat=True).first() or ""
+                worker = User.objects.filter(role=User.Role.WORKER).first().username.upper()
+                filters = {
+                    "все": {},
+                    "смена": {"shift": shift},
+                    "сотрудник": {"worker": worker},
+                }
+
+                # Клиент скачивает историю один раз, затем пересчитывает её на каждый фильтр.
+                response_cache.clear()
+                started = time.perf_counter()
+                rows, download_size = self._download()
+                download_time = time.perf_counter() - started
+                self.stdout.write(
+                    f"  клиент: загрузка {len(rows)} строк за {download_time * 1000:.1f} мс, "
+                    f"{format_bytes(download_size)}"
+                )
+
+                for label, params in filters.items():
+                    client_timings: list[float] = []
+                    server_timings: list[float] = []
+                    for _ in range(iterations):
+                        started = time.perf_counter()
+                        expected = client_side(
+                            rows, params.get("shift", ""), params.get("worker", "")
+                        )
+                        client_timings.append(time.perf_counter() - started)
+                        response_cache.clear()
+                        started = time.perf_counter()
+                        result, payload_size = self._server_side(params)
+                        server_timings.append(time.perf_counter() - started)
+
+                    # Порядок равных значений у клиента не определён: сверяются значения.
+                    mismatched = [
+                        name
+                        for name, key in (("parts", "total"), ("defect_rate", "rate"))
+                        if [round(row[key], 3) for row in expected[name]]
+                        != [row[key] for row in result[name]]
+                    ]
+                    if expected["series"] != result["series"]:
+                        mismatched.append("series")
+                    if mismatched:
+                        self.stderr.write(
+                            self.style.ERROR(
+                                f"  {label}: результаты расходятся ({', '.join(mismatched)})."
+                            )
+                        )
+                        continue
+                    client_p50 = percentile(client_timings, 50) * 1000
+                    server_p50 = percentile(server_timings, 50) * 1000
+                    self.stdout.write(
+                        f"  {label:<9}: клиент p50 {client_p50:8.1f} мс, "
+                        f"SQL p50 {server_p50:7.1f} мс, "
+                        f"ответы {format_bytes(payload_size):>9}, "
+                        f"точек ряда {len(result['series'])}"
+                    )
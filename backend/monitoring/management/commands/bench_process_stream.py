@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse, JsonResponse
+from django.test import RequestFactory
+from django.utils import timezone
+
+from monitoring.benchmarking import format_bytes, measure_peak, seed_entries, temporary_database
+from monitoring.models import ProductionEntry, User
+from monitoring.response_cache import CACHE_ALIAS
+from monitoring.views import api_process_rows
+
+
+def legacy_process_rows() -> HttpResponse:
+    # Прежняя реализация api_process_rows: объекты моделей и список словарей.
+    rows = []
+    warnings = []
+    for entry in ProductionEntry.objects.select_related("machine").order_by("recorded_at"):
+        if (
+            entry.temperature_c is None
+            or entry.vibration_mm is None
+            or entry.tool_wear_percent is None
+        ):
+            warnings.append(f"Запись {entry.pk} пропущена: нет замеров.")
+            continue
+        rows.append(
+            {
+                "id": entry.pk,
+                "t": float(entry.temperature_c),
+                "v": float(entry.vibration_mm),
+                "w": float(entry.tool_wear_percent),
+                "defect": 1 if entry.defective_parts > 0 else 0,
+                "machine": entry.machine.name,
+                "machine_subdivision": entry.machine.subdivision,
+                "ts": timezone.localtime(entry.recorded_at).isoformat(),
+                "detail": entry.detail_name,
+                "shift": entry.shift,
+            }
+        )
+    return JsonResponse({"rows": rows, "warnings": warnings})
+
+
+def consume(build: Callable[[], HttpResponse]) -> tuple[float, float, int]:
+    started = time.perf_counter()
+    response = build()
+    if not getattr(response, "streaming", False):
+        first_byte = time.perf_counter() - started
+        return first_byte, first_byte, len(response.content)
+    chunks = iter(response.streaming_content)
+    size = len(next(chunks))
+    first_byte = time.perf_counter() - started
+    size += sum(len(chunk) for chunk in chunks)
+    response.close()
+    return first_byte, time.perf_counter() - started, size
+
+
+class Command(BaseCommand):
+    help = "Сравнивает прежнюю и потоковую выдачу /api/manager/process/ (TTFB, время, память)."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--rows",
+            type=int,
+            nargs="+",
+            default=[10_000, 100_000],
+            help="Число записей в базе для каждого прогона (например, 1000000).",
+        )
+        parser.add_argument(
+            "--skip-memory",
+            action="store_true",
+            help="Не замерять пиковую память (tracemalloc заметно замедляет прогон).",
+        )
+        parser.add_argument("--seed", type=int, default=42, help="Зерно генератора.")
+
+    def handle(self, *args, **options) -> None:
+        factory = RequestFactory()
+        for size in options["rows"]:
+            with temporary_database():
+                self.stdout.write(f"Наполнение базы: {size} записей…")
+                seed_entries(size, seed=options["seed"])
+                manager = User.objects.create(username="bench-manager", role=User.Role.MANAGER)
+
+                def streaming() -> HttpResponse:
+                    # Каждый прогон строит ответ заново: замер памяти не должен попасть на кеш.
+                    caches[CACHE_ALIAS].clear()
+                    request = factory.get("/api/manager/process/", {"limit": "all"})
+                    request.user = manager
+                    return api_process_rows(request)
+
+                for label, build in (("прежний", legacy_process_rows), ("потоковый", streaming)):
+                    first_byte, total, payload = consume(build)
+                    line = (
+                        f"{size:>9} записей, {label:<9}: TTFB {first_byte * 1000:8.1f} мс, "
+                        f"всего {total:6.2f} с, ответ {format_bytes(payload)}"
+                    )
+                    if not options["skip_memory"]:
+                        _, peak = measure_peak(lambda: consume(build))
+                        line += f", пик памяти {format_bytes(peak)}"
+                    self.stdout.write(line)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import math
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from monitoring.scoring import EPS, Thresholds, alert_message, score_process
+
+
+def _scaler(values: list[float]):
+    finite = [value for value in values if math.isfinite(value)]
+    if not finite:
+        return lambda x: 0.0
+    low = min(finite)
+    span = max(finite) - low
+    if span < EPS:
+        return lambda x: 0.0
+    return lambda x: (x - low) / (span + EPS)
+
+
+def evaluate_rows_per_row(
+    rows: list[tuple[float, float, float]], thresholds: Thresholds
+) -> tuple[list[float], list[str], float]:
+    # Построчный эталон, повторяющий evaluateProcessRows из src/utils.ts.
+    if not rows:
+        return [], [], 0.0
+    t_scale = _scaler([row[0] for row in rows])
+    v_scale = _scaler([row[1] for row in rows])
+    w_scale = _scaler([row[2] for row in rows])
+    probabilities: list[float] = []
+    alerts: list[str] = []
+    for index, (t, v, w) in enumerate(rows):
+        q = 0.87 * t_scale(t) + 0.45 * v_scale(v) + 0.32 * w_scale(w)
+        p = 1 / (1 + math.exp(-(2 * q - 1)))
+        probabilities.append(p)
+        reasons: list[str] = []
+        if p > thresholds.p_crit:
+            reasons.append(f"p={p:.2f}>{thresholds.p_crit:.2f}")
+        if t > thresholds.T_crit:
+            reasons.append(f"T={t:.2f}>{thresholds.T_crit:.2f}")
+        if v > thresholds.V_crit:
+            reasons.append(f"V={v:.3f}>{thresholds.V_crit:.3f}")
+        if w > thresholds.W_crit:
+            reasons.append(f"W={w:.1f}>{thresholds.W_crit:.1f}")
+        if reasons:
+            alerts.append(alert_message(index, reasons))
+    return probabilities, alerts, sum(probabilities) / len(probabilities)
+
+
+class Command(BaseCommand):
+    help = "Сравнивает векторный расчёт риска с построчным (как в src/utils.ts)."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--rows",
+            type=int,
+            nargs="+",
+            default=[1_000, 100_000, 500_000],
+            help="Размеры выборок для замера.",
+        )
+        parser.add_argument("--repeat", type=int, default=3, help="Число повторов замера.")
+        parser.add_argument("--seed", type=int, default=42, help="Зерно генератора.")
+
+    def handle(self, *args, **options) -> None:
+        thresholds = Thresholds()
+        rng = np.random.default_rng(options["seed"])
+        repeat = max(options["repeat"], 1)
+
+        for size in options["rows"]:
+            t = rng.normal(24.5, 1.6, size).round(2)
+            v = np.abs(rng.normal(0.14, 0.04, size)).round(3)
+            w = rng.normal(35.0, 11.0, size).clip(0.0, 100.0).round(1)
+            rows = list(zip(t.tolist(), v.tolist(), w.tolist()))
+
+            per_row_best = math.inf
+            for _ in range(repeat):
+                started = time.perf_counter()
+                probabilities, alerts, avg_p = evaluate_rows_per_row(rows, thresholds)
+                per_row_best = min(per_row_best, time.perf_counter() - started)
+
+            vector_best = math.inf
+            for _ in range(repeat):
+                started = time.perf_counter()
+                scores = score_process(t, v, w, thresholds)
+                messages = [
+                    alert_message(index, reasons)
+                    for index, reasons in scores.alert_reasons(thresholds)
+                ]
+                vector_best = min(vector_best, time.perf_counter() - started)
+
+            max_diff = float(np.max(np.abs(scores.p - np.array(probabilities))))
+            if messages != alerts or abs(scores.avg_p - avg_p) > 1e-9 or max_diff > 1e-9:
+                self.stderr.write(
+                    self.style.ERROR(f"{size} строк: результаты расходятся (Δp={max_diff:.2e}).")
+                )
+                continue
+
+            self.stdout.write(
+                f"{size:>9} строк: построчно {per_row_best * 1000:9.1f} мс, "
+                f"векторно {vector_best * 1000:8.1f} мс, "
+                f"ускорение ×{per_row_best / max(vector_best, 1e-9):.1f}, "
+                f"тревог {len(alerts)}"
+            )
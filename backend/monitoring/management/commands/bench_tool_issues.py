@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Sum
+
+from monitoring.benchmarking import percentile, seed_entries, temporary_database
+from monitoring.inventory import report_defects
+from monitoring.models import Tool, ToolIssue, User
+
+
+def report_defects_read_modify_write(
+    tool_id: int, reported_by: User, defective_count: int, description: str = ""
+) -> ToolIssue:
+    # Прежняя схема из report_tool_issue: чтение остатка, сложение в Python и сохранение.
+    issue = ToolIssue.objects.create(
+        tool_id=tool_id,
+        reported_by=reported_by,
+        defective_count=defective_count,
+        description=description,
+    )
+    tool = Tool.objects.get(pk=tool_id)
+    tool.defective_stock += defective_count
+    tool.save(update_fields=["defective_stock", "last_updated_at"])
+    return issue
+
+
+MODES = {
+    "atomic": report_defects,
+    "legacy": report_defects_read_modify_write,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочная проверка сообщений о браке инструмента: параллельные потоки отправляют "
+        "тысячи сообщений, затем остаток брака сверяется с суммой сообщений."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--reports", type=int, default=2000, help="Сообщений на прогон.")
+        parser.add_argument(
+            "--threads",
+            type=int,
+            nargs="+",
+            default=[1, 2, 4, 8, 16],
+            help="Числа потоков для замера.",
+        )
+        parser.add_argument(
+            "--tools",
+            type=int,
+            default=3,
+            help="Сколько инструментов делят сообщения (меньше — выше конкуренция).",
+        )
+        parser.add_argument(
+            "--mode",
+            choices=sorted(MODES),
+            nargs="+",
+            default=["atomic"],
+            help="atomic — текущая схема, legacy — чтение-изменение-запись для сравнения.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        reports = max(options["reports"], 1)
+        failed = False
+        with temporary_database():
+            seed_entries(0, workers=16, tools=max(options["tools"], 1), issues=0)
+            tool_ids = list(Tool.objects.order_by("id").values_list("id", flat=True))
+            workers = list(User.objects.filter(role=User.Role.WORKER).order_by("id"))
+
+            for mode in options["mode"]:
+                report = MODES[mode]
+                for threads in options["threads"]:
+                    Tool.objects.update(defective_stock=0)
+                    ToolIssue.objects.all().delete()
+                    latencies: list[float] = []
+                    errors: list[str] = []
+                    lock = threading.Lock()
+
+                    def send(indices: range) -> None:
+                        try:
+                            for index in indices:
+                                started = time.perf_counter()
+                                try:
+                                    report(
+                                        tool_ids[index % len(tool_ids)],
+                                        workers[index % len(workers)],
+                                        index % 3 + 1,
+                                    )
+                                except OperationalError as exc:
+                                    with lock:
+                                        errors.append(str(exc))
+                                    continue
+                                with lock:
+                                    latencies.append(time.perf_counter() - started)
+                        finally:
+                            connection.close()
+
+                    count = max(threads, 1)
+                    started = time.perf_counter()
+                    with ThreadPoolExecutor(max_workers=count) as pool:
+                        list(pool.map(send, (range(i, reports, count) for i in range(count))))
+                    elapsed = time.perf_counter() - started
+
+                    expected = (
+                        ToolIssue.objects.aggregate(total=Sum("defective_count"))["total"] or 0
+                    )
+                    actual = Tool.objects.aggregate(total=Sum("defective_stock"))["total"] or 0
+                    consistent = expected == actual and not errors
+                    failed |= mode == "atomic" and not consistent
+                    style = self.style.SUCCESS if consistent else self.style.ERROR
+                    rate = len(latencies) / elapsed
+                    self.stdout.write(
+                        style(
+                            f"{mode:<6} потоков {threads:>3}: {rate:8.0f} сообщ./с, "
+                            f"p95 {percentile(latencies, 95) * 1000:7.1f} мс, "
+                            f"брак {actual} из {expected}, ошибок БД {len(errors)}"
+                        )
+                    )
+
+        if failed:
+            raise CommandError("Остаток брака разошёлся с суммой сообщений.")
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import time
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.utils.text import compress_string
+
+from monitoring.benchmarking import format_bytes, percentile, seed_entries, temporary_database
+from monitoring.models import User
+from monitoring.pagination import MAX_PAGE_SIZE, PageRequest
+from monitoring.response_cache import CACHE_ALIAS
+from monitoring.streaming import ProcessScan
+from monitoring.views import api_employee_rows, api_process_rows
+from monitoring.wire import available_formats
+
+ENDPOINTS = (
+    ("process", "/api/manager/process/", api_process_rows, "all"),
+    ("employees", "/api/manager/employees/", api_employee_rows, str(MAX_PAGE_SIZE)),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает размер и время выдачи строк руководителя в JSON, столбцовом JSON "
+        "и MessagePack, с gzip и без."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--rows",
+            type=int,
+            nargs="+",
+            default=[10_000, 100_000],
+            help="Число записей в базе для каждого прогона.",
+        )
+        parser.add_argument("--iterations", type=int, default=5, help="Замеров на формат.")
+        parser.add_argument("--seed", type=int, default=42, help="Зерно генератора.")
+
+    def handle(self, *args, **options) -> None:
+        factory = RequestFactory()
+        response_cache = caches[CACHE_ALIAS]
+        iterations = max(options["iterations"], 1)
+        for size in options["rows"]:
+            with temporary_database():
+                self.stdout.write(f"Наполнение базы: {size} записей…")
+                seed_entries(size, seed=options["seed"])
+                manager = User.objects.create(username="bench-manager", role=User.Role.MANAGER)
+
+                # Выборка без кодирования: общая часть времени всех форматов.
+                started = time.perf_counter()
+                for _ in ProcessScan(PageRequest(cursor=None, limit=None)).rows():
+                    pass
+                self.stdout.write(f"  выборка строк process: {time.perf_counter() - started:.2f} с")
+
+                for label, path, view, limit in ENDPOINTS:
+                    baseline = None
+                    for wire_format in available_formats():
+                        timings: list[float] = []
+                        payload = b""
+                        for _ in range(iterations):
+                            # Без кеша ответов: замеряется построение ответа, а не его копия.
+                            response_cache.clear()
+                            request = factory.get(path, {"limit": limit, "format": wire_format})
+                            request.user = manager
+                            started = time.perf_counter()
+                            response = view(request)
+                            if response.streaming:
+                                payload = b"".join(response.streaming_content)
+                                response.close()
+                            else:
+                                payload = response.content
+                            timings.append(time.perf_counter() - started)
+                        started = time.perf_counter()
+                        compressed = len(compress_string(payload))
+                        gzip_time = time.perf_counter() - started
+                        baseline = baseline or len(payload)
+                        self.stdout.write(
+                            f"  {label:<9} {wire_format:<8}: "
+                            f"p50 {percentile(timings, 50) * 1000:8.1f} мс, "
+                            f"ответ {format_bytes(len(payload)):>10} "
+                            f"({len(payload) / baseline:5.1%}), "
+                            f"gzip {format_bytes(compressed):>10} за {gzip_time * 1000:6.1f} мс"
+                        )
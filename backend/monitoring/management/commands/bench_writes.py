@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+
+from monitoring.benchmarking import percentile, seed_entries, temporary_database
+from monitoring.models import Machine, ProductionEntry, Tool, ToolIssue, User
+from monitoring.write_behind import QUEUE
+
+MODES = ("legacy", "direct", "write_behind")
+
+# Настройки SQLite по умолчанию в Django: журнал отката, отложенные транзакции, ожидание 5 с.
+LEGACY_OPTIONS: dict = {}
+
+
+@contextmanager
+def sqlite_options(options: dict) -> Iterator[None]:
+    # Потоки открывают подключения по тому же словарю настроек, поэтому подмена видна всем.
+    # Режим журнала переключает основной поток заранее: это требует монопольного доступа.
+    saved = connection.settings_dict["OPTIONS"]
+    connection.close()
+    connection.settings_dict["OPTIONS"] = options
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode=DELETE")
+    try:
+        yield
+    finally:
+        connection.close()
+        connection.settings_dict["OPTIONS"] = saved
+        connection.ensure_connection()
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочная проверка формы записи и сообщений о браке: параллельные сотрудники "
+        "отправляют формы через тестовый клиент, сравниваются прямая запись и очередь "
+        "с групповой фиксацией."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--requests", type=int, default=2000, help="Отправок на прогон.")
+        parser.add_argument(
+            "--threads",
+            type=int,
+            nargs="+",
+            default=[1, 8, 32],
+            help="Числа одновременно отправляющих сотрудников.",
+        )
+        parser.add_argument(
+            "--mode",
+            choices=MODES,
+            nargs="+",
+            default=list(MODES),
+            help=(
+                "legacy — прежние настройки SQLite, direct — запись в потоке запроса с WAL, "
+                "write_behind — через очередь с групповой фиксацией."
+            ),
+        )
+        parser.add_argument(
+            "--issues",
+            type=float,
+            default=0.2,
+            help="Доля сообщений о браке среди отправок.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        requests = max(options["requests"], 1)
+        failed = False
+        # Ошибки «database is locked» считаются в сводке, а не печатаются трассировками.
+        logging.getLogger("django.request").setLevel(logging.CRITICAL)
+        with temporary_database():
+            seed_entries(0, workers=max(options["threads"]), tools=5, issues=0)
+            workers = list(User.objects.filter(role=User.Role.WORKER).order_by("id"))
+            machine_ids = list(Machine.objects.values_list("id", flat=True))
+            tool_ids = list(Tool.objects.values_list("id", flat=True))
+            issue_every = round(1 / options["issues"]) if options["issues"] > 0 else 0
+
+            def form(index: int) -> tuple[str, dict[str, str]]:
+                if issue_every and index % issue_every == 0:
+                    return "/tools/report/", {
+                        "tool": str(tool_ids[index % len(tool_ids)]),
+                        "defective_count": "1",
+                        "description": "bench",
+                    }
+                return "/entries/new/", {
+                    "machine": str(machine_ids[index % len(machine_ids)]),
+                    "detail_name": "Корпус",
+                    "parts_made": "10",
+                    "defective_parts": str(index % 2),
+                    "temperature_c": "24.50",
+                    "vibration_mm": "0.120",
+                    "tool_wear_percent": "35.00",
+                    "shift": "Дневная",
+                }
+
+            for mode in options["mode"]:
+                for threads in options["threads"]:
+                    count = max(threads, 1)
+                    before = ProductionEntry.objects.count() + ToolIssue.objects.count()
+                    latencies: list[float] = []
+                    errors: list[str] = []
+                    lock = threading.Lock()
+                    batches = QUEUE.batches
+
+                    clients = []
+                    for position in range(count):
+                        client = Client(SERVER_NAME="localhost", raise_request_exception=False)
+                        client.force_login(workers[position % len(workers)])
+                        clients.append(client)
+
+                    def send(position: int) -> None:
+                        client = clients[position]
+                        try:
+                            for index in range(position, requests, count):
+                                path, data = form(index)
+                                started = time.perf_counter()
+                                response = client.post(path, data)
+                                elapsed = time.perf_counter() - started
+                                with lock:
+                                    if response.status_code == 302:
+                                        latencies.append(elapsed)
+                                    else:
+                                        errors.append(str(response.status_code))
+                        finally:
+                            connection.close()
+
+                    sqlite = LEGACY_OPTIONS if mode == "legacy" else settings.SQLITE_WRITE_OPTIONS
+                    with sqlite_options(sqlite), override_settings(
+                        WRITE_BEHIND=mode == "write_behind"
+                    ):
+                        started = time.perf_counter()
+                        with ThreadPoolExecutor(max_workers=count) as pool:
+                            list(pool.map(send, range(count)))
+                        elapsed = time.perf_counter() - started
+
+                    written = ProductionEntry.objects.count() + ToolIssue.objects.count() - before
+                    consistent = written == len(latencies) and not errors
+                    # Прежние настройки приведены для сравнения, их ошибки ожидаемы.
+                    failed |= mode != "legacy" and not consistent
+                    group = ""
+                    if mode == "write_behind" and QUEUE.batches > batches:
+                        group = f", в группе {len(latencies) / (QUEUE.batches - batches):.1f}"
+                    style = self.style.SUCCESS if consistent else self.style.ERROR
+                    self.stdout.write(
+                        style(
+                            f"{mode:<12} потоков {threads:>3}: "
+                            f"{len(latencies) / elapsed:7.0f} форм/с, "
+                            f"p50 {percentile(latencies, 50) * 1000:6.1f} мс, "
+                            f"p95 {percentile(latencies, 95) * 1000:6.1f} мс, "
+                            f"записано {written}, ошибок {len(errors)}{group}"
+                        )
+                    )
+
+        if failed:
+            raise CommandError("Часть отправок завершилась ошибкой или не попала в базу.")
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring.gateway import issue_token
+from monitoring.models import GatewayToken, User
+
+
+class Command(BaseCommand):
+    help = "Создаёт токен для пакетной загрузки записей со шлюза станков."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("name", type=str, help="Название шлюза.")
+        parser.add_argument(
+            "--worker",
+            type=str,
+            default="worker",
+            help="Логин сотрудника по умолчанию для записей без поля worker.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        worker = User.objects.filter(
+            username=options["worker"], role=User.Role.WORKER
+        ).first()
+        if worker is None:
+            raise CommandError(f"Сотрудник {options['worker']} не найден.")
+        if GatewayToken.objects.filter(name=options["name"]).exists():
+            raise CommandError(f"Шлюз «{options['name']}» уже зарегистрирован.")
+        _, token = issue_token(options["name"], worker)
+        self.stdout.write(self.style.SUCCESS(f"Токен шлюза «{options['name']}»: {token}"))
+        self.stdout.write("Сохраните его: в базе хранится только хеш.")
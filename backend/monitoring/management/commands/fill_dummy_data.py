@@ -1,20 +1,32 @@
 from __future__ import annotations
 
 import csv
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 from decimal import Decimal
 from pathlib import Path
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.utils import timezone
 
-from monitoring.models import Machine, ProductionEntry, Tool
+from monitoring import detector, rollups
+from monitoring.models import Machine, ProductionEntry, TableVersion, Tool
+from monitoring.synthetic import SyntheticProfile, generate_entries
 
 User = get_user_model()
 
+BATCH_SIZE = 2000
+
+
+def _decimal(value: str | None) -> Decimal | None:
+    if not value:
+        return None
+    return Decimal(str(value).replace(",", "."))
+
 
 class Command(BaseCommand):
     help = "Загружает демо-данные из CSV и создаёт тестовые учётные записи."
@@ -38,6 +50,31 @@ class Command(BaseCommand):
             default="worker123",
             help="Пароль, который получат все созданные сотрудники.",
         )
+        parser.add_argument(
+            "--synthetic",
+            type=int,
+            default=0,
+            metavar="N",
+            help="Дополнительно сгенерировать N синтетических записей производства.",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="За сколько последних дней распределить синтетические записи.",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=42,
+            help="Зерно генератора синтетических данных.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=20000,
+            help="Размер пакета вставки синтетических записей.",
+        )
 
     def handle(self, *args, **options) -> None:
         data_dir = Path(options["data_dir"]).resolve()
@@ -58,13 +95,29 @@ class Command(BaseCommand):
             )
             return
 
+        worker_password = make_password(options["worker_password"])
         with transaction.atomic():
             self._ensure_manager(password=options["manager_password"])
-            self._ensure_demo_worker(password=options["worker_password"])
+            self._ensure_demo_worker(password_hash=worker_password)
             machines = self._load_machines(demo_csv)
             self._load_inventory(inventory_csv)
-            self._load_employees(employees_csv, machines, options["worker_password"])
+            created = self._load_employees(employees_csv, machines, worker_password)
+            rollups.add_entries(created)
+            TableVersion.bump(
+                *(model._meta.label_lower for model in (User, Machine, Tool, ProductionEntry))
+            )
+
+        if options["synthetic"] > 0:
+            self._load_synthetic(
+                count=options["synthetic"],
+                profile=SyntheticProfile.from_csv(demo_csv, employees_csv),
+                days=options["days"],
+                seed=options["seed"],
+                batch_size=options["batch_size"],
+            )
 
+        processed = detector.rebuild()
+        self.stdout.write(f"Детекторы станков пересчитаны по {processed} записям.")
         self.stdout.write(self.style.SUCCESS("Демо-данные успешно загружены."))
 
     def _ensure_manager(self, password: str) -> None:
@@ -88,7 +141,7 @@ class Command(BaseCommand):
             manager.set_password(password)
             manager.save(update_fields=["password"])
 
-    def _ensure_demo_worker(self, password: str) -> None:
+    def _ensure_demo_worker(self, password_hash: str) -> None:
         worker, created = User.objects.get_or_create(
             username="worker",
             defaults={
@@ -100,7 +153,7 @@ class Command(BaseCommand):
                 "is_superuser": False,
             },
         )
-        worker.set_password(password)
+        worker.password = password_hash
         worker.save(update_fields=["password"])
         if created:
             self.stdout.write("Создан тестовый сотрудник: login=worker")
@@ -108,102 +161,174 @@ class Command(BaseCommand):
             self.stdout.write("Пароль тестового сотрудника обновлён.")
 
     def _load_machines(self, demo_csv: Path) -> list[Machine]:
-        machines: list[Machine] = []
-        seen: set[str] = set()
+        names: list[str] = []
         with demo_csv.open(newline="", encoding="utf-8") as fp:
-            reader = csv.DictReader(fp)
-            for row in reader:
+            for row in csv.DictReader(fp):
                 machine_name = row.get("machine", "").strip()
-                if not machine_name or machine_name in seen:
-                    continue
-                machine, _ = Machine.objects.get_or_create(name=machine_name)
-                machines.append(machine)
-                seen.add(machine_name)
-        if not machines:
-            default_machine, _ = Machine.objects.get_or_create(name="Не указан")
-            machines.append(default_machine)
+                if machine_name and machine_name not in names:
+                    names.append(machine_name)
+        if not names:
+            names = ["Не указан"]
+
+        existing = {machine.name: machine for machine in Machine.objects.filter(name__in=names)}
+        missing = [Machine(name=name) for name in names if name not in existing]
+        if missing:
+            Machine.objects.bulk_create(missing, ignore_conflicts=True)
+            existing = {
+                machine.name: machine for machine in Machine.objects.filter(name__in=names)
+            }
+        machines = [existing[name] for name in names]
         self.stdout.write(f"Подготовлено станков: {len(machines)}")
         return machines
 
     def _load_inventory(self, inventory_csv: Path) -> None:
+        rows: dict[str, dict[str, str]] = {}
         with inventory_csv.open(newline="", encoding="utf-8") as fp:
-            reader = csv.DictReader(fp)
-            for row in reader:
+            for row in csv.DictReader(fp):
                 name = row.get("tool_name", "").strip()
-                if not name:
-                    continue
-                tool, _ = Tool.objects.get_or_create(name=name)
-                tool.stock = int(row.get("stock", 0) or 0)
-                tool.min_threshold = int(row.get("min_threshold", 0) or 0)
-                tool.location = row.get("location", "").strip()
-                avg = row.get("avg_daily_outflow", "")
-                tool.avg_daily_outflow = Decimal(avg.replace(",", ".") or "0") if avg else None
-                tool.save()
+                if name:
+                    rows[name] = row
+
+        existing = {tool.name: tool for tool in Tool.objects.filter(name__in=rows)}
+        now = timezone.now()
+        to_create: list[Tool] = []
+        to_update: list[Tool] = []
+        for name, row in rows.items():
+            tool = existing.get(name)
+            if tool is None:
+                tool = Tool(name=name)
+                to_create.append(tool)
+            else:
+                to_update.append(tool)
+            tool.stock = int(row.get("stock", 0) or 0)
+            tool.min_threshold = int(row.get("min_threshold", 0) or 0)
+            tool.location = row.get("location", "").strip()
+            avg = row.get("avg_daily_outflow", "")
+            tool.avg_daily_outflow = Decimal(avg.replace(",", ".") or "0") if avg else None
+            tool.last_updated_at = now
+
+        Tool.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+        Tool.objects.bulk_update(
+            to_update,
+            ["stock", "min_threshold", "location", "avg_daily_outflow", "last_updated_at"],
+            batch_size=BATCH_SIZE,
+        )
         self.stdout.write("Инструменты обновлены.")
 
     def _load_employees(
-        self, employees_csv: Path, machines: list[Machine], password: str
-    ) -> None:
+        self, employees_csv: Path, machines: list[Machine], password_hash: str
+    ) -> list[ProductionEntry]:
         if not machines:
             machines = [Machine.objects.get_or_create(name="Не указан")[0]]
-        cycle_index = 0
+        current_tz = timezone.get_current_timezone()
+
+        rows: list[dict[str, str]] = []
         with employees_csv.open(newline="", encoding="utf-8") as fp:
-            reader = csv.DictReader(fp)
-            for row in reader:
-                employee_id = row.get("id", "").strip()
-                if not employee_id:
-                    continue
-
-                username = employee_id.lower()
-                full_name = row.get("name", "").strip()
-                shift = row.get("shift", "").strip()
-                parts_made = int(row.get("parts_made", 0) or 0)
-                defects = int(row.get("defects", 0) or 0)
-                avg_temp = row.get("avg_temp", "")
-                avg_vib = row.get("avg_vib", "")
-                avg_wear = row.get("avg_wear", "")
-                date_str = row.get("date", "")
-
-                worker, created = User.objects.get_or_create(
-                    username=username,
-                    defaults={
-                        "role": User.Role.WORKER,
-                        "first_name": full_name,
-                        "is_staff": False,
-                        "is_superuser": False,
-                    },
-                )
-                if created:
-                    worker.set_password(password)
-                    worker.save()
+            for row in csv.DictReader(fp):
+                if row.get("id", "").strip():
+                    rows.append(row)
 
-                machine = machines[cycle_index % len(machines)]
-                cycle_index += 1
+        names = {row["id"].strip().lower(): row.get("name", "").strip() for row in rows}
+        workers = {user.username: user for user in User.objects.filter(username__in=names)}
+        new_workers = [
+            User(
+                username=username,
+                role=User.Role.WORKER,
+                first_name=full_name,
+                is_staff=False,
+                is_superuser=False,
+                password=password_hash,
+            )
+            for username, full_name in names.items()
+            if username not in workers
+        ]
+        if new_workers:
+            User.objects.bulk_create(new_workers, batch_size=BATCH_SIZE)
+            workers = {user.username: user for user in User.objects.filter(username__in=names)}
 
-                detail_name = f"Деталь {employee_id}"
-                recorded_at = datetime.fromisoformat(date_str) if date_str else datetime.now()
-                if timezone.is_naive(recorded_at):
-                    recorded_at = timezone.make_aware(recorded_at, timezone.get_current_timezone())
+        detail_names = {f"Деталь {row['id'].strip()}" for row in rows}
+        seen = {
+            (worker_id, detail_name, timezone.localtime(recorded_at, current_tz).date())
+            for worker_id, detail_name, recorded_at in ProductionEntry.objects.filter(
+                worker__in=workers.values(), detail_name__in=detail_names
+            ).values_list("worker_id", "detail_name", "recorded_at")
+        }
 
-                entry_exists = ProductionEntry.objects.filter(
-                    worker=worker,
-                    detail_name=detail_name,
-                    recorded_at__date=recorded_at.date(),
-                ).exists()
-                if entry_exists:
-                    continue
+        entries: list[ProductionEntry] = []
+        for cycle_index, row in enumerate(rows):
+            employee_id = row["id"].strip()
+            worker = workers[employee_id.lower()]
+            machine = machines[cycle_index % len(machines)]
+            detail_name = f"Деталь {employee_id}"
+            date_str = row.get("date", "")
+            recorded_at = datetime.fromisoformat(date_str) if date_str else datetime.now()
+            if timezone.is_naive(recorded_at):
+                recorded_at = timezone.make_aware(recorded_at, current_tz)
+
+            key = (worker.pk, detail_name, timezone.localtime(recorded_at, current_tz).date())
+            if key in seen:
+                continue
+            seen.add(key)
 
-                ProductionEntry.objects.create(
+            entries.append(
+                ProductionEntry(
                     worker=worker,
                     machine=machine,
                     detail_name=detail_name,
-                    parts_made=parts_made,
-                    defective_parts=defects,
-                    temperature_c=Decimal(str(avg_temp).replace(",", ".")) if avg_temp else None,
-                    vibration_mm=Decimal(str(avg_vib).replace(",", ".")) if avg_vib else None,
-                    tool_wear_percent=Decimal(str(avg_wear).replace(",", ".")) if avg_wear else None,
-                    shift=shift,
+                    parts_made=int(row.get("parts_made", 0) or 0),
+                    defective_parts=int(row.get("defects", 0) or 0),
+                    temperature_c=_decimal(row.get("avg_temp")),
+                    vibration_mm=_decimal(row.get("avg_vib")),
+                    tool_wear_percent=_decimal(row.get("avg_wear")),
+                    shift=row.get("shift", "").strip(),
                     note="Импортировано из CSV",
                     recorded_at=recorded_at,
                 )
+            )
+
+        created = ProductionEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE)
         self.stdout.write("Сотрудники и производственные записи загружены.")
+        return created
+
+    def _load_synthetic(
+        self,
+        count: int,
+        profile: SyntheticProfile,
+        days: int,
+        seed: int,
+        batch_size: int,
+    ) -> None:
+        names = [machine.name for machine in profile.machines]
+        existing = set(Machine.objects.filter(name__in=names).values_list("name", flat=True))
+        Machine.objects.bulk_create(
+            [Machine(name=name) for name in names if name not in existing],
+            ignore_conflicts=True,
+        )
+        machine_ids = dict(Machine.objects.filter(name__in=names).values_list("name", "id"))
+        worker_ids = list(
+            User.objects.filter(role=User.Role.WORKER).order_by("id").values_list("id", flat=True)
+        )
+
+        end = timezone.now()
+        start = end - timedelta(days=max(days, 1))
+        started = time.perf_counter()
+        inserted = 0
+        for batch in generate_entries(
+            count,
+            profile,
+            machine_ids,
+            worker_ids,
+            start=start,
+            end=end,
+            seed=seed,
+            batch_size=batch_size,
+        ):
+            with transaction.atomic():
+                ProductionEntry.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+            inserted += len(batch)
+            rate = inserted / max(time.perf_counter() - started, 1e-9)
+            self.stdout.write(f"Синтетических записей: {inserted}/{count} ({rate:,.0f} в с)")
+
+        rollups.rebuild()
+        TableVersion.bump(Machine._meta.label_lower, ProductionEntry._meta.label_lower)
+        self.stdout.write("Дневные сводки пересчитаны.")
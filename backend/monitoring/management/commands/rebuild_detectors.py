@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring import detector
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает скользящие детекторы станков и журнал аномалий по всей истории."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--window",
+            type=int,
+            default=detector.DEFAULT_WINDOW,
+            help="Размер скользящего окна (по умолчанию Thresholds.window).",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options["window"] < 2:
+            raise CommandError("Окно должно быть не меньше 2 замеров.")
+        started = time.perf_counter()
+        processed = detector.rebuild(window=options["window"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"Детекторы пересчитаны: {processed} записей за {elapsed:.1f} с.")
+        )
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring import forecasting
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает прогноз расхода инструмента: EWMA и недельный профиль по списаниям "
+        "и сообщениям о браке, дни до нуля и даты заказа. Запускайте по расписанию (cron)."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--window",
+            type=int,
+            default=forecasting.DEFAULT_WINDOW,
+            help="Окно истории в днях.",
+        )
+        parser.add_argument(
+            "--halflife",
+            type=float,
+            default=forecasting.DEFAULT_HALFLIFE,
+            help="За сколько дней вес наблюдения в EWMA падает вдвое.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        started = time.perf_counter()
+        try:
+            result = forecasting.refresh_forecasts(options["window"], options["halflife"])
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        elapsed = time.perf_counter() - started
+        basis = ", ".join(f"{name}: {count}" for name, count in sorted(result.basis.items()))
+        timings = ", ".join(f"{name} {value:.2f} с" for name, value in result.timings.items())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Прогноз пересчитан для {result.tools} инструментов за {elapsed:.1f} с"
+                f"{f' ({timings})' if timings else ''}."
+            )
+        )
+        if basis:
+            self.stdout.write(f"  основа прогноза — {basis}")
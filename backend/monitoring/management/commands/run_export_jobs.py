@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from monitoring.export_jobs import claim_next_job, run_job
+from monitoring.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = "Фоновый обработчик заданий выгрузки: опрашивает БД и формирует файлы."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Пауза между опросами очереди, секунд.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Обработать все ожидающие задания и завершиться.",
+        )
+        parser.add_argument(
+            "--stale-after",
+            type=int,
+            default=1800,
+            help="Через сколько секунд зависшее задание возвращается в очередь.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        stale_after = timedelta(seconds=options["stale_after"])
+        self.stdout.write("Обработчик выгрузок запущен.")
+        try:
+            while True:
+                close_old_connections()
+                job = claim_next_job(stale_after=stale_after)
+                if job is None:
+                    if options["once"]:
+                        break
+                    time.sleep(options["interval"])
+                    continue
+                started = time.perf_counter()
+                job = run_job(job)
+                elapsed = time.perf_counter() - started
+                if job.status == ExportJob.Status.DONE:
+                    self.stdout.write(
+                        self.style.SUCCESS(f"Задание #{job.pk} готово за {elapsed:.1f} с.")
+                    )
+                else:
+                    self.stderr.write(self.style.ERROR(f"Задание #{job.pk}: {job.error}"))
+        except KeyboardInterrupt:
+            self.stdout.write("Обработчик выгрузок остановлен.")
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("monitoring", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="productionentry",
+            index=models.Index(fields=["recorded_at", "id"], name="entry_recorded_keyset_idx"),
+        ),
+    ]
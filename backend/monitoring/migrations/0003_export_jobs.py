@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("monitoring", "0002_productionentry_keyset_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TableVersion",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("table", models.CharField(max_length=80, unique=True)),
+                ("version", models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Версия таблицы",
+                "verbose_name_plural": "Версии таблиц",
+                "ordering": ["table"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ExportJob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("export_format", models.CharField(choices=[("xlsx", "Excel"), ("csv", "CSV")], default="xlsx", max_length=10)),
+                ("params", models.JSONField(blank=True, default=dict)),
+                ("params_key", models.CharField(db_index=True, max_length=64)),
+                ("status", models.CharField(choices=[("pending", "В очереди"), ("running", "Формируется"), ("done", "Готово"), ("failed", "Ошибка")], db_index=True, default="pending", max_length=20)),
+                ("data_version", models.CharField(blank=True, max_length=255)),
+                ("file_name", models.CharField(blank=True, max_length=255)),
+                ("file_size", models.PositiveBigIntegerField(blank=True, null=True)),
+                ("error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("requested_by", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="export_jobs", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "verbose_name": "Задание выгрузки",
+                "verbose_name_plural": "Задания выгрузки",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("monitoring", "0003_export_jobs"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField()),
+                ("shift", models.CharField(blank=True, max_length=40)),
+                ("entries", models.PositiveIntegerField(default=0)),
+                ("parts_made", models.PositiveBigIntegerField(default=0)),
+                ("defective_parts", models.PositiveBigIntegerField(default=0)),
+                ("temperature_sum", models.FloatField(default=0)),
+                ("temperature_count", models.PositiveIntegerField(default=0)),
+                ("vibration_sum", models.FloatField(default=0)),
+                ("vibration_count", models.PositiveIntegerField(default=0)),
+                ("wear_sum", models.FloatField(default=0)),
+                ("wear_count", models.PositiveIntegerField(default=0)),
+                ("machine", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="daily_rollups", to="monitoring.machine")),
+                ("worker", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="daily_rollups", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "verbose_name": "Сводка за день",
+                "verbose_name_plural": "Сводки за день",
+                "ordering": ["day", "worker", "machine", "shift"],
+                "constraints": [models.UniqueConstraint(fields=("day", "worker", "machine", "shift"), name="daily_rollup_unique_key")],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("monitoring", "0004_daily_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GatewayToken",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=120, unique=True)),
+                ("token_hash", models.CharField(max_length=64, unique=True)),
+                ("is_active", models.BooleanField(default=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("last_used_at", models.DateTimeField(blank=True, null=True)),
+                ("default_worker", models.ForeignKey(help_text="Сотрудник, на которого записываются строки без поля worker.", limit_choices_to={"role": "worker"}, on_delete=django.db.models.deletion.PROTECT, related_name="gateway_tokens", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "verbose_name": "Токен шлюза",
+                "verbose_name_plural": "Токены шлюзов",
+                "ordering": ["name"],
+            },
+        ),
+        migrations.CreateModel(
+            name="IngestBatch",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("idempotency_key", models.CharField(max_length=120)),
+                ("accepted", models.PositiveIntegerField(default=0)),
+                ("rejected", models.PositiveIntegerField(default=0)),
+                ("response", models.JSONField(default=dict)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("gateway", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="batches", to="monitoring.gatewaytoken")),
+            ],
+            options={
+                "verbose_name": "Пакет от шлюза",
+                "verbose_name_plural": "Пакеты от шлюзов",
+                "ordering": ["-created_at"],
+                "constraints": [models.UniqueConstraint(fields=("gateway", "idempotency_key"), name="ingest_batch_idempotency_key")],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("monitoring", "0005_gateway_ingest"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tableversion",
+            name="updated_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("monitoring", "0006_table_version_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MachineDetectorState",
+            fields=[
+                ("machine", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name="detector_state", serialize=False, to="monitoring.machine")),
+                ("window", models.PositiveIntegerField()),
+                ("observations", models.PositiveBigIntegerField(default=0)),
+                ("state", models.BinaryField(help_text="Скользящие суммы, EWMA и окно замеров (float64).")),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("last_entry", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="+", to="monitoring.productionentry")),
+            ],
+            options={
+                "verbose_name": "Состояние детектора станка",
+                "verbose_name_plural": "Состояния детекторов станков",
+            },
+        ),
+        migrations.CreateModel(
+            name="MachineAnomaly",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("kind", models.CharField(choices=[("outlier", "Выброс"), ("drift", "Дрейф")], max_length=20)),
+                ("channel", models.CharField(max_length=20)),
+                ("value", models.FloatField()),
+                ("score", models.FloatField(help_text="z-оценка относительно базовой линии.")),
+                ("baseline_mean", models.FloatField()),
+                ("baseline_std", models.FloatField()),
+                ("recorded_at", models.DateTimeField()),
+                ("entry", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="anomalies", to="monitoring.productionentry")),
+                ("machine", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="anomalies", to="monitoring.machine")),
+            ],
+            options={
+                "verbose_name": "Аномалия станка",
+                "verbose_name_plural": "Аномалии станков",
+                "ordering": ["-recorded_at", "-id"],
+                "indexes": [models.Index(fields=["recorded_at"], name="anomaly_recorded_idx"), models.Index(fields=["machine", "recorded_at"], name="anomaly_machine_recorded_idx")],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("monitoring", "0007_machine_detectors"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TelemetryChunk",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField(help_text="Местная дата; отрезок не пересекает границу суток.")),
+                ("start_at", models.DateTimeField()),
+                ("end_at", models.DateTimeField()),
+                ("samples", models.PositiveIntegerField()),
+                ("data", models.BinaryField(help_text="Замеры: смещение в мс (uint32) и T/V/W (float32).")),
+            ],
+            options={
+                "verbose_name": "Отрезок телеметрии",
+                "verbose_name_plural": "Отрезки телеметрии",
+                "ordering": ["machine", "start_at"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="productionentry",
+            index=models.Index(fields=["machine", "recorded_at"], name="entry_machine_recorded_idx"),
+        ),
+        migrations.AddField(
+            model_name="telemetrychunk",
+            name="machine",
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="telemetry_chunks", to="monitoring.machine"),
+        ),
+        migrations.AddIndex(
+            model_name="telemetrychunk",
+            index=models.Index(fields=["machine", "day", "start_at"], name="telemetry_machine_day_idx"),
+        ),
+    ]
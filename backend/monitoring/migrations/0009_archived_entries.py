@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("monitoring", "0008_telemetry_chunks"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedEntry",
+            fields=[
+                ("id", models.BigIntegerField(help_text="Номер исходной записи производства.", primary_key=True, serialize=False)),
+                ("month", models.DateField(help_text="Первое число местного месяца записи.")),
+                ("detail_name", models.CharField(max_length=160)),
+                ("parts_made", models.PositiveIntegerField()),
+                ("defective_parts", models.PositiveIntegerField(default=0)),
+                ("temperature_c", models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ("vibration_mm", models.DecimalField(blank=True, decimal_places=3, max_digits=5, null=True)),
+                ("tool_wear_percent", models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ("shift", models.CharField(blank=True, max_length=40)),
+                ("note", models.TextField(blank=True)),
+                ("recorded_at", models.DateTimeField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                ("machine", models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name="+", to="monitoring.machine")),
+                ("worker", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "verbose_name": "Архивная запись производства",
+                "verbose_name_plural": "Архив записей производства",
+                "ordering": ["-recorded_at"],
+                "indexes": [models.Index(fields=["month", "recorded_at"], name="archive_month_recorded_idx"), models.Index(fields=["recorded_at", "id"], name="archive_recorded_idx")],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("monitoring", "0009_archived_entries"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="exportjob",
+            name="export_format",
+            field=models.CharField(choices=[("xlsx", "Excel"), ("csv", "CSV"), ("npz", "NumPy (столбцы)")], default="xlsx", max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name="archivedentry",
+            index=models.Index(fields=["machine", "recorded_at"], name="archive_machine_recorded_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="productionentry",
+            index=models.Index(fields=["worker", "recorded_at"], name="entry_worker_recorded_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="toolissue",
+            index=models.Index(fields=["recorded_at"], name="issue_recorded_idx"),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("monitoring", "0010_export_filters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportJob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("kind", models.CharField(choices=[("process", "Замеры процесса"), ("employees", "Показатели сотрудников"), ("inventory", "Склад инструмента")], max_length=20)),
+                ("params", models.JSONField(blank=True, default=dict)),
+                ("status", models.CharField(choices=[("pending", "В очереди"), ("running", "Загружается"), ("done", "Готово"), ("failed", "Ошибка")], db_index=True, default="pending", max_length=20)),
+                ("file_name", models.CharField(max_length=255)),
+                ("file_size", models.PositiveBigIntegerField(default=0)),
+                ("columns", models.JSONField(blank=True, default=list, help_text="Заголовок файла, приведённый к полям загрузки.")),
+                ("delimiter", models.CharField(default=",", max_length=1)),
+                ("position", models.PositiveBigIntegerField(default=0, help_text="Смещение в файле после последнего зафиксированного пакета, байт.")),
+                ("lines", models.PositiveIntegerField(default=0)),
+                ("accepted", models.PositiveIntegerField(default=0)),
+                ("rejected", models.PositiveIntegerField(default=0)),
+                ("warnings", models.JSONField(blank=True, default=list)),
+                ("error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("heartbeat_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("requested_by", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="import_jobs", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "verbose_name": "Задание загрузки",
+                "verbose_name_plural": "Задания загрузки",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
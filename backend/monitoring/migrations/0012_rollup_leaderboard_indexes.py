@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("monitoring", "0011_import_jobs"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="dailyrollup",
+            index=models.Index(fields=["day", "worker", "shift", "parts_made", "defective_parts"], name="rollup_day_totals_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="dailyrollup",
+            index=models.Index(fields=["worker", "day", "parts_made", "defective_parts"], name="rollup_worker_totals_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="dailyrollup",
+            index=models.Index(fields=["shift", "day", "worker", "parts_made", "defective_parts"], name="rollup_shift_totals_idx"),
+        ),
+    ]
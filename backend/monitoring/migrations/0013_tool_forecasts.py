@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("monitoring", "0012_rollup_leaderboard_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ToolForecast",
+            fields=[
+                ("tool", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name="forecast", serialize=False, to="monitoring.tool")),
+                ("basis", models.CharField(choices=[("history", "По истории"), ("manual", "Ручной расход"), ("none", "Нет данных")], default="none", max_length=16)),
+                ("daily_outflow", models.FloatField(default=0, help_text="Сглаженный расход, шт./день.")),
+                ("weekday_factors", models.JSONField(default=list, help_text="Множители расхода по дням недели, пн–вс.")),
+                ("available", models.PositiveIntegerField(default=0, help_text="Годный остаток на момент расчёта.")),
+                ("days_to_zero", models.FloatField(blank=True, null=True)),
+                ("stockout_on", models.DateField(blank=True, null=True)),
+                ("reorder_on", models.DateField(blank=True, null=True)),
+                ("history_days", models.PositiveIntegerField(default=0)),
+                ("computed_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "verbose_name": "Прогноз расхода",
+                "verbose_name_plural": "Прогнозы расхода",
+                "ordering": ["reorder_on"],
+            },
+        ),
+        migrations.CreateModel(
+            name="StockMovement",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("delta", models.IntegerField(help_text="Изменение общего остатка: расход со знаком минус.")),
+                ("stock_after", models.PositiveIntegerField()),
+                ("source", models.CharField(choices=[("manual", "Правка"), ("batch", "Пакетная правка"), ("import", "Загрузка CSV")], default="manual", max_length=16)),
+                ("recorded_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("tool", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="movements", to="monitoring.tool")),
+            ],
+            options={
+                "verbose_name": "Движение остатка",
+                "verbose_name_plural": "Движения остатков",
+                "ordering": ["-recorded_at"],
+                "indexes": [models.Index(fields=["recorded_at"], name="movement_recorded_idx")],
+            },
+        ),
+    ]
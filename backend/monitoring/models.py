@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+from datetime import datetime
+
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.utils import timezone
 
 
@@ -84,12 +87,105 @@ class ProductionEntry(models.Model):
 
     class Meta:
         ordering = ["-recorded_at"]
+        indexes = [
+            models.Index(fields=["recorded_at", "id"], name="entry_recorded_keyset_idx"),
+            models.Index(fields=["machine", "recorded_at"], name="entry_machine_recorded_idx"),
+            models.Index(fields=["worker", "recorded_at"], name="entry_worker_recorded_idx"),
+        ]
         verbose_name = "Запись производства"
         verbose_name_plural = "Записи производства"
 
     def __str__(self) -> str:
         return f"{self.detail_name} — {self.worker.username} ({self.recorded_at:%Y-%m-%d})"
 
+    def save(self, *args, **kwargs) -> None:
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
+
+class ArchivedEntry(models.Model):
+    """Запись производства, перенесённая из горячей таблицы командой archive_entries."""
+
+    id = models.BigIntegerField(primary_key=True, help_text="Номер исходной записи производства.")
+    month = models.DateField(help_text="Первое число местного месяца записи.")
+    worker = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    machine = models.ForeignKey(Machine, on_delete=models.PROTECT, related_name="+")
+    detail_name = models.CharField(max_length=160)
+    parts_made = models.PositiveIntegerField()
+    defective_parts = models.PositiveIntegerField(default=0)
+    temperature_c = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    vibration_mm = models.DecimalField(max_digits=5, decimal_places=3, null=True, blank=True)
+    tool_wear_percent = models.DecimalField(
+        max_digits=6, decimal_places=2, null=True, blank=True
+    )
+    shift = models.CharField(max_length=40, blank=True)
+    note = models.TextField(blank=True)
+    recorded_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-recorded_at"]
+        indexes = [
+            models.Index(fields=["month", "recorded_at"], name="archive_month_recorded_idx"),
+            models.Index(fields=["recorded_at", "id"], name="archive_recorded_idx"),
+            models.Index(fields=["machine", "recorded_at"], name="archive_machine_recorded_idx"),
+        ]
+        verbose_name = "Архивная запись производства"
+        verbose_name_plural = "Архив записей производства"
+
+    def __str__(self) -> str:
+        return f"{self.detail_name} ({self.recorded_at:%Y-%m-%d})"
+
+
+class DailyRollup(models.Model):
+    day = models.DateField()
+    worker = models.ForeignKey(User, on_delete=models.CASCADE, related_name="daily_rollups")
+    machine = models.ForeignKey(Machine, on_delete=models.CASCADE, related_name="daily_rollups")
+    shift = models.CharField(max_length=40, blank=True)
+    entries = models.PositiveIntegerField(default=0)
+    parts_made = models.PositiveBigIntegerField(default=0)
+    defective_parts = models.PositiveBigIntegerField(default=0)
+    temperature_sum = models.FloatField(default=0)
+    temperature_count = models.PositiveIntegerField(default=0)
+    vibration_sum = models.FloatField(default=0)
+    vibration_count = models.PositiveIntegerField(default=0)
+    wear_sum = models.FloatField(default=0)
+    wear_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["day", "worker", "machine", "shift"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "worker", "machine", "shift"],
+                name="daily_rollup_unique_key",
+            ),
+        ]
+        # Покрывающие индексы рейтингов и дневных рядов: суммы читаются из индекса без обращения
+        # к строкам таблицы. Первым идёт поле отбора — период, сотрудник или смена.
+        indexes = [
+            models.Index(
+                fields=["day", "worker", "shift", "parts_made", "defective_parts"],
+                name="rollup_day_totals_idx",
+            ),
+            models.Index(
+                fields=["worker", "day", "parts_made", "defective_parts"],
+                name="rollup_worker_totals_idx",
+            ),
+            models.Index(
+                fields=["shift", "day", "worker", "parts_made", "defective_parts"],
+                name="rollup_shift_totals_idx",
+            ),
+        ]
+        verbose_name = "Сводка за день"
+        verbose_name_plural = "Сводки за день"
+
+    def __str__(self) -> str:
+        return f"{self.day:%Y-%m-%d} {self.worker_id}/{self.machine_id}/{self.shift}"
+
 
 class Tool(models.Model):
     name = models.CharField(max_length=180, unique=True)
@@ -131,8 +227,324 @@ class ToolIssue(models.Model):
 
     class Meta:
         ordering = ["-recorded_at"]
+        indexes = [models.Index(fields=["recorded_at"], name="issue_recorded_idx")]
         verbose_name = "Сообщение об инструменте"
         verbose_name_plural = "Сообщения об инструменте"
 
     def __str__(self) -> str:
         return f"{self.tool.name} — {self.defective_count} шт."
+
+
+class StockMovement(models.Model):
+    class Source(models.TextChoices):
+        MANUAL = "manual", "Правка"
+        BATCH = "batch", "Пакетная правка"
+        IMPORT = "import", "Загрузка CSV"
+
+    tool = models.ForeignKey(Tool, on_delete=models.CASCADE, related_name="movements")
+    delta = models.IntegerField(help_text="Изменение общего остатка: расход со знаком минус.")
+    stock_after = models.PositiveIntegerField()
+    source = models.CharField(max_length=16, choices=Source.choices, default=Source.MANUAL)
+    recorded_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-recorded_at"]
+        indexes = [models.Index(fields=["recorded_at"], name="movement_recorded_idx")]
+        verbose_name = "Движение остатка"
+        verbose_name_plural = "Движения остатков"
+
+    def __str__(self) -> str:
+        return f"{self.tool_id}: {self.delta:+d}"
+
+
+class ToolForecast(models.Model):
+    class Basis(models.TextChoices):
+        HISTORY = "history", "По истории"
+        MANUAL = "manual", "Ручной расход"
+        NONE = "none", "Нет данных"
+
+    tool = models.OneToOneField(
+        Tool, on_delete=models.CASCADE, primary_key=True, related_name="forecast"
+    )
+    basis = models.CharField(max_length=16, choices=Basis.choices, default=Basis.NONE)
+    daily_outflow = models.FloatField(default=0, help_text="Сглаженный расход, шт./день.")
+    weekday_factors = models.JSONField(
+        default=list, help_text="Множители расхода по дням недели, пн–вс."
+    )
+    available = models.PositiveIntegerField(
+        default=0, help_text="Годный остаток на момент расчёта."
+    )
+    days_to_zero = models.FloatField(null=True, blank=True)
+    stockout_on = models.DateField(null=True, blank=True)
+    reorder_on = models.DateField(null=True, blank=True)
+    history_days = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["reorder_on"]
+        verbose_name = "Прогноз расхода"
+        verbose_name_plural = "Прогнозы расхода"
+
+    def __str__(self) -> str:
+        return f"{self.tool_id}: {self.daily_outflow:.2f}/день"
+
+
+class TableVersion(models.Model):
+    table = models.CharField(max_length=80, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["table"]
+        verbose_name = "Версия таблицы"
+        verbose_name_plural = "Версии таблиц"
+
+    def __str__(self) -> str:
+        return f"{self.table} v{self.version}"
+
+    @classmethod
+    def bump(cls, *tables: str) -> None:
+        for table in tables:
+            now = timezone.now()
+            changes = {"version": F("version") + 1, "updated_at": now}
+            if not cls.objects.filter(table=table).update(**changes):
+                _, created = cls.objects.get_or_create(
+                    table=table, defaults={"version": 1, "updated_at": now}
+                )
+                if not created:
+                    cls.objects.filter(table=table).update(**changes)
+
+    @classmethod
+    def snapshot(cls, tables: list[str] | tuple[str, ...]) -> dict[str, int]:
+        versions = dict(cls.objects.filter(table__in=tables).values_list("table", "version"))
+        return {table: versions.get(table, 0) for table in tables}
+
+    @classmethod
+    def state(cls, tables: list[str] | tuple[str, ...]) -> tuple[dict[str, int], datetime | None]:
+        rows = cls.objects.filter(table__in=tables).values_list("table", "version", "updated_at")
+        versions = {table: 0 for table in tables}
+        latest = None
+        for table, version, updated_at in rows:
+            versions[table] = version
+            latest = updated_at if latest is None else max(latest, updated_at)
+        return versions, latest
+
+
+class ExportJob(models.Model):
+    class Format(models.TextChoices):
+        XLSX = "xlsx", "Excel"
+        CSV = "csv", "CSV"
+        NPZ = "npz", "NumPy (столбцы)"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "В очереди"
+        RUNNING = "running", "Формируется"
+        DONE = "done", "Готово"
+        FAILED = "failed", "Ошибка"
+
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="export_jobs",
+    )
+    export_format = models.CharField(max_length=10, choices=Format.choices, default=Format.XLSX)
+    params = models.JSONField(default=dict, blank=True)
+    params_key = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+        db_index=True,
+    )
+    data_version = models.CharField(max_length=255, blank=True)
+    file_name = models.CharField(max_length=255, blank=True)
+    file_size = models.PositiveBigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Задание выгрузки"
+        verbose_name_plural = "Задания выгрузки"
+
+    def __str__(self) -> str:
+        return f"{self.get_export_format_display()} #{self.pk} ({self.get_status_display()})"
+
+
+class ImportJob(models.Model):
+    class Kind(models.TextChoices):
+        PROCESS = "process", "Замеры процесса"
+        EMPLOYEES = "employees", "Показатели сотрудников"
+        INVENTORY = "inventory", "Склад инструмента"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "В очереди"
+        RUNNING = "running", "Загружается"
+        DONE = "done", "Готово"
+        FAILED = "failed", "Ошибка"
+
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="import_jobs",
+    )
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+        db_index=True,
+    )
+    file_name = models.CharField(max_length=255)
+    file_size = models.PositiveBigIntegerField(default=0)
+    columns = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Заголовок файла, приведённый к полям загрузки.",
+    )
+    delimiter = models.CharField(max_length=1, default=",")
+    position = models.PositiveBigIntegerField(
+        default=0,
+        help_text="Смещение в файле после последнего зафиксированного пакета, байт.",
+    )
+    lines = models.PositiveIntegerField(default=0)
+    accepted = models.PositiveIntegerField(default=0)
+    rejected = models.PositiveIntegerField(default=0)
+    warnings = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Задание загрузки"
+        verbose_name_plural = "Задания загрузки"
+
+    def __str__(self) -> str:
+        return f"{self.get_kind_display()} #{self.pk} ({self.get_status_display()})"
+
+
+class GatewayToken(models.Model):
+    name = models.CharField(max_length=120, unique=True)
+    token_hash = models.CharField(max_length=64, unique=True)
+    default_worker = models.ForeignKey(
+        User,
+        on_delete=models.PROTECT,
+        related_name="gateway_tokens",
+        limit_choices_to={"role": User.Role.WORKER},
+        help_text="Сотрудник, на которого записываются строки без поля worker.",
+    )
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["name"]
+        verbose_name = "Токен шлюза"
+        verbose_name_plural = "Токены шлюзов"
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class IngestBatch(models.Model):
+    gateway = models.ForeignKey(GatewayToken, on_delete=models.CASCADE, related_name="batches")
+    idempotency_key = models.CharField(max_length=120)
+    accepted = models.PositiveIntegerField(default=0)
+    rejected = models.PositiveIntegerField(default=0)
+    response = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["gateway", "idempotency_key"],
+                name="ingest_batch_idempotency_key",
+            ),
+        ]
+        verbose_name = "Пакет от шлюза"
+        verbose_name_plural = "Пакеты от шлюзов"
+
+    def __str__(self) -> str:
+        return f"{self.gateway.name}: {self.idempotency_key}"
+
+
+class MachineDetectorState(models.Model):
+    machine = models.OneToOneField(
+        Machine,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="detector_state",
+    )
+    window = models.PositiveIntegerField()
+    observations = models.PositiveBigIntegerField(default=0)
+    last_entry = models.ForeignKey(
+        ProductionEntry,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    state = models.BinaryField(help_text="Скользящие суммы, EWMA и окно замеров (float64).")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Состояние детектора станка"
+        verbose_name_plural = "Состояния детекторов станков"
+
+    def __str__(self) -> str:
+        return f"{self.machine.name}: {self.observations} замеров"
+
+
+class MachineAnomaly(models.Model):
+    class Kind(models.TextChoices):
+        OUTLIER = "outlier", "Выброс"
+        DRIFT = "drift", "Дрейф"
+
+    machine = models.ForeignKey(Machine, on_delete=models.CASCADE, related_name="anomalies")
+    entry = models.ForeignKey(ProductionEntry, on_delete=models.CASCADE, related_name="anomalies")
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    channel = models.CharField(max_length=20)
+    value = models.FloatField()
+    score = models.FloatField(help_text="z-оценка относительно базовой линии.")
+    baseline_mean = models.FloatField()
+    baseline_std = models.FloatField()
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-recorded_at", "-id"]
+        indexes = [
+            models.Index(fields=["recorded_at"], name="anomaly_recorded_idx"),
+            models.Index(fields=["machine", "recorded_at"], name="anomaly_machine_recorded_idx"),
+        ]
+        verbose_name = "Аномалия станка"
+        verbose_name_plural = "Аномалии станков"
+
+    def __str__(self) -> str:
+        return f"{self.machine.name}: {self.get_kind_display()} {self.channel}"
+
+
+class TelemetryChunk(models.Model):
+    machine = models.ForeignKey(Machine, on_delete=models.CASCADE, related_name="telemetry_chunks")
+    day = models.DateField(help_text="Местная дата; отрезок не пересекает границу суток.")
+    start_at = models.DateTimeField()
+    end_at = models.DateTimeField()
+    samples = models.PositiveIntegerField()
+    data = models.BinaryField(help_text="Замеры: смещение в мс (uint32) и T/V/W (float32).")
+
+    class Meta:
+        ordering = ["machine", "start_at"]
+        indexes = [
+            models.Index(fields=["machine", "day", "start_at"], name="telemetry_machine_day_idx"),
+        ]
+        verbose_name = "Отрезок телеметрии"
+        verbose_name_plural = "Отрезки телеметрии"
+
+    def __str__(self) -> str:
+        return f"{self.machine.name}: {self.start_at:%Y-%m-%d %H:%M} ({self.samples})"
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import base64
+import binascii
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from django.db.models import Max, Q, QuerySet
+
+DEFAULT_PAGE_SIZE = 5000
+MAX_PAGE_SIZE = 20000
+
+
+class CursorError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Cursor:
+    recorded_at: datetime
+    pk: int
+
+    def encode(self) -> str:
+        raw = f"{self.recorded_at.isoformat()}|{self.pk}".encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> Cursor:
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+            stamp, pk = raw.rsplit("|", 1)
+            recorded_at = datetime.fromisoformat(stamp)
+            if recorded_at.tzinfo is None:
+                raise ValueError("naive timestamp")
+            return cls(recorded_at=recorded_at, pk=int(pk))
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise CursorError("Некорректный курсор.") from None
+
+
+@dataclass(frozen=True)
+class PageRequest:
+    """Страница записей: по курсору (recorded_at, id) в порядке времени записи либо, для
+    досинхронизации, по since — после монотонного id. Ключ since не пропускает записи, которые
+    пришли позже с более ранним recorded_at (шлюз, импорт CSV)."""
+
+    cursor: Cursor | None
+    limit: int | None
+    since: int | None = None
+
+    @classmethod
+    def from_params(cls, params: Mapping[str, str], allow_unbounded: bool = False) -> PageRequest:
+        """Без limit — страница по умолчанию; у потоковых ответов (allow_unbounded) запрос
+        совсем без параметров страницы отдаёт всю историю, как до появления страниц."""
+        token = params.get("cursor") or ""
+        cursor = Cursor.decode(token) if token else None
+        since = _since(params.get("since") or "")
+        if cursor is not None and since is not None:
+            raise CursorError("Параметры «cursor» и «since» нельзя передавать вместе.")
+
+        raw_limit = params.get("limit") or ""
+        if not raw_limit:
+            if allow_unbounded and cursor is None and since is None:
+                return cls(cursor=None, limit=None)
+            return cls(cursor=cursor, limit=DEFAULT_PAGE_SIZE, since=since)
+        if raw_limit == "all" and allow_unbounded:
+            return cls(cursor=cursor, limit=None, since=since)
+        try:
+            limit = int(raw_limit)
+        except ValueError:
+            raise CursorError("Параметр «limit» должен быть числом.") from None
+        if limit <= 0:
+            raise CursorError("Параметр «limit» должен быть положительным.")
+        return cls(cursor=cursor, limit=min(limit, MAX_PAGE_SIZE), since=since)
+
+    def apply(self, queryset: QuerySet) -> QuerySet:
+        if self.since is not None:
+            queryset = queryset.order_by("id").filter(id__gt=self.since)
+        else:
+            queryset = queryset.order_by("recorded_at", "id")
+            if self.cursor is not None:
+                queryset = queryset.filter(
+                    Q(recorded_at__gt=self.cursor.recorded_at)
+                    | Q(recorded_at=self.cursor.recorded_at, id__gt=self.cursor.pk)
+                )
+        if self.limit is None:
+            return queryset
+        return queryset[: self.limit + 1]
+
+    def sync_point(self, queryset: QuerySet) -> int | None:
+        """Наибольший id до чтения страницы по времени: с него клиент продолжит через since.
+        Записи, вставленные во время чтения, придут повторно, но не потеряются."""
+        if self.since is not None:
+            return None
+        return queryset.aggregate(last=Max("id"))["last"] or 0
+
+    def page_meta(
+        self, fetched: int, last: Cursor | None, sync_point: int | None = None
+    ) -> dict[str, Any]:
+        if self.since is not None:
+            next_cursor = None
+            next_since = last.pk if last else self.since
+        else:
+            next_cursor = last or self.cursor
+            next_since = sync_point
+        return {
+            "next_cursor": next_cursor.encode() if next_cursor else None,
+            "next_since": next_since,
+            "has_more": self.limit is not None and fetched > self.limit,
+            "limit": self.limit,
+        }
+
+
+def _since(raw: str) -> int | None:
+    if not raw:
+        return None
+    try:
+        since = int(raw)
+    except ValueError:
+        raise CursorError("Параметр «since» должен быть числом (next_since из ответа).") from None
+    if since < 0:
+        raise CursorError("Параметр «since» не может быть отрицательным.")
+    return since
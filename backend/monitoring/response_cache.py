@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Model
+from django.http import HttpRequest, HttpResponse
+
+from .conditional import state_digest, tracked_tables
+
+CACHE_ALIAS = "responses"
+MAX_CACHED_BYTES = 8 * 1024 * 1024
+# Блокировка держится, только пока строится одна страница; зависший владелец не мешает дольше.
+LOCK_TIMEOUT = 10
+COUNTERS = ("hits", "misses", "concurrent")
+
+# Имена представлений под кешем, чтобы отдавать счётчики по каждому.
+CACHED_VIEWS: list[str] = []
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _count(name: str, counter: str) -> None:
+    cache = _cache()
+    key = f"stats:{name}:{counter}"
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Ключ вытеснили между add и incr — счётчик начнётся заново.
+        cache.add(key, 1, timeout=None)
+
+
+def stats() -> dict[str, dict[str, int]]:
+    cache = _cache()
+    keys = [f"stats:{name}:{counter}" for name in CACHED_VIEWS for counter in COUNTERS]
+    values = cache.get_many(keys)
+    return {
+        name: {counter: values.get(f"stats:{name}:{counter}", 0) for counter in COUNTERS}
+        for name in CACHED_VIEWS
+    }
+
+
+def _hit(entry: tuple[str, bytes]) -> HttpResponse:
+    content_type, content = entry
+    return HttpResponse(content, content_type=content_type)
+
+
+def cached_response(*models: type[Model]) -> Callable:
+    """Кеширует ограниченные ответы руководителя по версиям таблиц: запись в любую из них
+    меняет ключ. Потоковые ответы проходят мимо кеша."""
+    tables = tracked_tables(models)
+
+    def decorator(view: Callable[..., HttpResponse]) -> Callable[..., HttpResponse]:
+        name = view.__name__
+        CACHED_VIEWS.append(name)
+
+        @wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            digest = state_digest(request, tables) if request.method == "GET" else None
+            if digest is None:
+                return view(request, *args, **kwargs)
+
+            cache = _cache()
+            key = f"response:{name}:{digest}"
+            entry = cache.get(key)
+            if entry is not None:
+                _count(name, "hits")
+                return _hit(entry)
+
+            # Защита от лавины: ответ строит и сохраняет тот, кто взял короткую блокировку
+            # атомарным add. Остальные промахи не ждут его, а строят ответ сами и в кеш не пишут.
+            lock_key = f"lock:{key}"
+            if not cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+                _count(name, "concurrent")
+                return view(request, *args, **kwargs)
+
+            _count(name, "misses")
+            try:
+                response = view(request, *args, **kwargs)
+                # Потоковые ответы (вся история) не кешируются: копия в памяти свела бы на нет
+                # постоянный расход памяти потока.
+                if (
+                    response.status_code == 200
+                    and not response.streaming
+                    and len(response.content) <= MAX_CACHED_BYTES
+                ):
+                    cache.set(
+                        key,
+                        (response["Content-Type"], response.content),
+                        settings.RESPONSE_CACHE_TIMEOUT,
+                    )
+            finally:
+                cache.delete(lock_key)
+            return response
+
+        return wrapper
+
+    return decorator
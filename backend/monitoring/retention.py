@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import (
+    ArchivedEntry,
+    IngestBatch,
+    MachineAnomaly,
+    MachineDetectorState,
+    ProductionEntry,
+    TableVersion,
+)
+from .signals import bump_workers
+
+DEFAULT_BATCH_SIZE = 1000
+# Пауза между пакетами: ожидающие записи сервиса успевают взять блокировку.
+DEFAULT_PAUSE = 0.05
+
+# Поля, общие для горячей таблицы и архива; month и archived_at архив заполняет сам.
+COPIED_FIELDS = (
+    "id",
+    "worker_id",
+    "machine_id",
+    "detail_name",
+    "parts_made",
+    "defective_parts",
+    "temperature_c",
+    "vibration_mm",
+    "tool_wear_percent",
+    "shift",
+    "note",
+    "recorded_at",
+)
+
+
+@dataclass
+class ArchiveResult:
+    moved: int = 0
+    batches: int = 0
+    months: dict[date, int] = field(default_factory=dict)
+
+
+def month_of(moment: datetime) -> date:
+    return timezone.localtime(moment).date().replace(day=1)
+
+
+def _copy_sql() -> str:
+    quote = connection.ops.quote_name
+    columns = ", ".join(
+        quote(ProductionEntry._meta.get_field(name).column) for name in COPIED_FIELDS
+    )
+    return (
+        f"INSERT INTO {quote(ArchivedEntry._meta.db_table)} "
+        f"({columns}, {quote('month')}, {quote('archived_at')}) "
+        f"SELECT {columns}, %s, %s FROM {quote(ProductionEntry._meta.db_table)} "
+        f"WHERE {quote('id')} IN ({{placeholders}})"
+    )
+
+
+def _delete_sql() -> str:
+    quote = connection.ops.quote_name
+    return (
+        f"DELETE FROM {quote(ProductionEntry._meta.db_table)} "
+        f"WHERE {quote('id')} IN ({{placeholders}})"
+    )
+
+
+def _move_batch(cutoff: datetime, batch_size: int) -> list[tuple[int, datetime, int]]:
+    with transaction.atomic():
+        # Запись версии первой: SQLite сразу берёт блокировку записи, и строки пакета
+        # не меняются между чтением и удалением; на других СУБД строки держит FOR UPDATE.
+        TableVersion.bump(ProductionEntry._meta.label_lower)
+        rows = list(
+            ProductionEntry.objects.select_for_update()
+            .filter(recorded_at__lt=cutoff)
+            .order_by("recorded_at", "id")
+            .values_list("id", "recorded_at", "worker_id")[:batch_size]
+        )
+        if not rows:
+            transaction.set_rollback(True)
+            return rows
+        by_month: dict[date, list[int]] = {}
+        for pk, recorded_at, _ in rows:
+            by_month.setdefault(month_of(recorded_at), []).append(pk)
+        # Строки копируются внутри СУБД: ORM-вставка тратила бы время под блокировкой записи.
+        sql = _copy_sql()
+        month_field = ArchivedEntry._meta.get_field("month")
+        archived_field = ArchivedEntry._meta.get_field("archived_at")
+        archived_at = archived_field.get_db_prep_value(timezone.now(), connection)
+        with connection.cursor() as cursor:
+            for month, ids in by_month.items():
+                cursor.execute(
+                    sql.format(placeholders=", ".join(["%s"] * len(ids))),
+                    [month_field.get_db_prep_value(month, connection), archived_at, *ids],
+                )
+        ids = [pk for pk, _, _ in rows]
+        MachineAnomaly.objects.filter(entry_id__in=ids).delete()
+        MachineDetectorState.objects.filter(last_entry_id__in=ids).update(last_entry=None)
+        # Удаление мимо ORM и сигналов: сводки DailyRollup должны сохранить вклад архивных
+        # записей, а связанные строки уже отвязаны выше.
+        with connection.cursor() as cursor:
+            cursor.execute(_delete_sql().format(placeholders=", ".join(["%s"] * len(ids))), ids)
+        TableVersion.bump(ArchivedEntry._meta.label_lower)
+        bump_workers(worker_id for _, _, worker_id in rows)
+    return rows
+
+
+def archive_entries(
+    cutoff: datetime,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_batches: int | None = None,
+    pause: float = DEFAULT_PAUSE,
+) -> ArchiveResult:
+    """Переносит записи старше cutoff в архив короткими транзакциями по batch_size строк."""
+    result = ArchiveResult()
+    while max_batches is None or result.batches < max_batches:
+        rows = _move_batch(cutoff, batch_size)
+        if not rows:
+            break
+        result.moved += len(rows)
+        result.batches += 1
+        for _, recorded_at, _ in rows:
+            month = month_of(recorded_at)
+            result.months[month] = result.months.get(month, 0) + 1
+        time.sleep(pause)
+    return result
+
+
+def pending_months(cutoff: datetime) -> dict[date, int]:
+    months: dict[date, int] = {}
+    for recorded_at in (
+        ProductionEntry.objects.filter(recorded_at__lt=cutoff)
+        .values_list("recorded_at", flat=True)
+        .iterator(chunk_size=DEFAULT_BATCH_SIZE)
+    ):
+        month = month_of(recorded_at)
+        months[month] = months.get(month, 0) + 1
+    return months
+
+
+def expired_ingest_batches(before: datetime):
+    return IngestBatch.objects.filter(created_at__lt=before)
+
+
+def prune_ingest_batches(before: datetime) -> int:
+    """Удаляет ключи идемпотентности шлюзов старше before: повтор такого пакета уже не ждём."""
+    deleted, _ = expired_ingest_batches(before).delete()
+    return deleted
+
+
+def compact() -> None:
+    """Возвращает освободившиеся страницы SQLite. VACUUM на время работы блокирует запись."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("VACUUM")
+        cursor.execute("ANALYZE")
@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, NamedTuple
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, QuerySet, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ArchivedEntry, DailyRollup, ProductionEntry, TableVersion, User
+
+ROLLUP_SOURCE_FIELDS = (
+    "worker_id",
+    "machine_id",
+    "shift",
+    "recorded_at",
+    "parts_made",
+    "defective_parts",
+    "temperature_c",
+    "vibration_mm",
+    "tool_wear_percent",
+)
+
+COUNTERS = (
+    "entries",
+    "parts_made",
+    "defective_parts",
+    "temperature_sum",
+    "temperature_count",
+    "vibration_sum",
+    "vibration_count",
+    "wear_sum",
+    "wear_count",
+)
+
+
+class RollupKey(NamedTuple):
+    day: date
+    worker_id: int
+    machine_id: int
+    shift: str
+
+
+def local_day(moment: datetime) -> date:
+    if timezone.is_naive(moment):
+        return moment.date()
+    return timezone.localtime(moment).date()
+
+
+def _sensor(value: Any) -> tuple[float, int]:
+    if value is None:
+        return 0.0, 0
+    return float(value), 1
+
+
+def contribution(values: dict[str, Any]) -> tuple[RollupKey, dict[str, float]]:
+    key = RollupKey(
+        day=local_day(values["recorded_at"]),
+        worker_id=values["worker_id"],
+        machine_id=values["machine_id"],
+        shift=values["shift"] or "",
+    )
+    temperature, temperature_count = _sensor(values["temperature_c"])
+    vibration, vibration_count = _sensor(values["vibration_mm"])
+    wear, wear_count = _sensor(values["tool_wear_percent"])
+    return key, {
+        "entries": 1,
+        "parts_made": values["parts_made"],
+        "defective_parts": values["defective_parts"],
+        "temperature_sum": temperature,
+        "temperature_count": temperature_count,
+        "vibration_sum": vibration,
+        "vibration_count": vibration_count,
+        "wear_sum": wear,
+        "wear_count": wear_count,
+    }
+
+
+def entry_values(entry: ProductionEntry) -> dict[str, Any]:
+    return {field: getattr(entry, field) for field in ROLLUP_SOURCE_FIELDS}
+
+
+def apply_deltas(deltas: dict[RollupKey, dict[str, float]], sign: int = 1) -> None:
+    with transaction.atomic():
+        for key, delta in deltas.items():
+            lookup = key._asdict()
+            updates = {
+                name: F(name) + sign * delta[name] for name in COUNTERS if delta.get(name)
+            }
+            if DailyRollup.objects.filter(**lookup).update(**updates):
+                continue
+            if sign < 0:
+                continue
+            _, created = DailyRollup.objects.get_or_create(
+                **lookup, defaults={name: delta[name] for name in COUNTERS}
+            )
+            if not created:
+                DailyRollup.objects.filter(**lookup).update(**updates)
+        if sign < 0:
+            for key in deltas:
+                DailyRollup.objects.filter(**key._asdict(), entries__lte=0).delete()
+
+
+def accumulate(rows: Iterable[dict[str, Any]]) -> dict[RollupKey, dict[str, float]]:
+    totals: dict[RollupKey, dict[str, float]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for values in rows:
+        key, delta = contribution(values)
+        bucket = totals[key]
+        for name in COUNTERS:
+            bucket[name] += delta[name]
+    return dict(totals)
+
+
+def add_entries(entries: Iterable[ProductionEntry]) -> None:
+    apply_deltas(accumulate(entry_values(entry) for entry in entries))
+
+
+def remove_entries(entries: Iterable[ProductionEntry]) -> None:
+    apply_deltas(accumulate(entry_values(entry) for entry in entries), sign=-1)
+
+
+def replace_entry(previous: dict[str, Any] | None, current: dict[str, Any]) -> None:
+    if previous is None:
+        apply_deltas(accumulate([current]))
+        return
+    old_key, old_delta = contribution(previous)
+    new_key, new_delta = contribution(current)
+    if old_key != new_key:
+        with transaction.atomic():
+            apply_deltas({old_key: old_delta}, sign=-1)
+            apply_deltas({new_key: new_delta})
+        return
+    updates = {
+        name: F(name) + (new_delta[name] - old_delta[name])
+        for name in COUNTERS
+        if new_delta[name] != old_delta[name]
+    }
+    if updates and not DailyRollup.objects.filter(**new_key._asdict()).update(**updates):
+        # Строки сводки нет (например, сводки ещё не построены): вклад записи пишется заново.
+        apply_deltas(accumulate([current]))
+
+
+def _grouped(queryset):
+    return (
+        queryset.order_by()
+        .annotate(day=TruncDate("recorded_at", tzinfo=timezone.get_current_timezone()))
+        .values("day", "worker_id", "machine_id", "shift")
+        .annotate(
+            entry_count=Count("id"),
+            parts_total=Sum("parts_made"),
+            defects_total=Sum("defective_parts"),
+            temperature_total=Sum("temperature_c"),
+            temperature_n=Count("temperature_c"),
+            vibration_total=Sum("vibration_mm"),
+            vibration_n=Count("vibration_mm"),
+            wear_total=Sum("tool_wear_percent"),
+            wear_n=Count("tool_wear_percent"),
+        )
+    )
+
+
+def rebuild(sources=None, batch_size: int = 2000) -> int:
+    """Пересчитывает сводки по горячей таблице и архиву; день на границе архива есть в обоих."""
+    if sources is None:
+        sources = (ProductionEntry.objects.all(), ArchivedEntry.objects.all())
+    totals: dict[RollupKey, dict[str, float]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    with transaction.atomic():
+        for queryset in sources:
+            for row in _grouped(queryset).iterator(chunk_size=batch_size):
+                bucket = totals[
+                    RollupKey(row["day"], row["worker_id"], row["machine_id"], row["shift"] or "")
+                ]
+                bucket["entries"] += row["entry_count"]
+                bucket["parts_made"] += row["parts_total"] or 0
+                bucket["defective_parts"] += row["defects_total"] or 0
+                bucket["temperature_sum"] += float(row["temperature_total"] or 0)
+                bucket["temperature_count"] += row["temperature_n"]
+                bucket["vibration_sum"] += float(row["vibration_total"] or 0)
+                bucket["vibration_count"] += row["vibration_n"]
+                bucket["wear_sum"] += float(row["wear_total"] or 0)
+                bucket["wear_count"] += row["wear_n"]
+        DailyRollup.objects.all().delete()
+        DailyRollup.objects.bulk_create(
+            (DailyRollup(**key._asdict(), **counters) for key, counters in totals.items()),
+            batch_size=batch_size,
+        )
+        # Пересчёт идёт мимо сигналов записей: закешированные рейтинги сбрасывает своя версия.
+        TableVersion.bump(DailyRollup._meta.label_lower)
+    return len(totals)
+
+
+LEADERBOARDS = ("parts", "defect_rate")
+DEFAULT_LEADERS = 5
+MAX_LEADERS = 100
+
+
+def parse_day(value: Any, field: str) -> date | None:
+    if value in (None, ""):
+        return None
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Параметр «{field}» должен быть датой ГГГГ-ММ-ДД.") from None
+
+
+@dataclass(frozen=True)
+class RollupFilter:
+    """Отбор дневных сводок: границы дней включительно, сотрудник — логин без учёта регистра."""
+
+    day_from: date | None = None
+    day_to: date | None = None
+    shift: str = ""
+    worker: str = ""
+
+    @classmethod
+    def from_params(cls, params: Mapping[str, Any]) -> RollupFilter:
+        day_from = parse_day(params.get("from"), "from")
+        day_to = parse_day(params.get("to"), "to")
+        if day_from is not None and day_to is not None and day_from > day_to:
+            raise ValueError("Параметр «from» не должен быть позже «to».")
+        # «all» — значение «без отбора» в фильтрах дашборда.
+        shift = (params.get("shift") or "").strip()
+        worker = (params.get("worker") or "").strip()
+        return cls(
+            day_from=day_from,
+            day_to=day_to,
+            shift="" if shift == "all" else shift,
+            worker="" if worker == "all" else worker,
+        )
+
+    def apply(self, queryset: QuerySet[DailyRollup]) -> QuerySet[DailyRollup]:
+        if self.day_from is not None:
+            queryset = queryset.filter(day__gte=self.day_from)
+        if self.day_to is not None:
+            queryset = queryset.filter(day__lte=self.day_to)
+        if self.shift:
+            queryset = queryset.filter(shift=self.shift)
+        if self.worker:
+            queryset = queryset.filter(
+                worker_id__in=User.objects.filter(username__iexact=self.worker).values("id")
+            )
+        return queryset
+
+
+def leaderboard(rollup_filter: RollupFilter, by: str, limit: int) -> list[dict[str, Any]]:
+    """Первые limit сотрудников по выпуску или доле брака: GROUP BY и LIMIT выполняет СУБД."""
+    if by not in LEADERBOARDS:
+        raise ValueError(f"Параметр «by» должен быть одним из: {', '.join(LEADERBOARDS)}.")
+    totals = (
+        rollup_filter.apply(DailyRollup.objects.order_by())
+        .values("worker_id")
+        .annotate(total=Sum("parts_made"), defects=Sum("defective_parts"))
+        .annotate(
+            rate=Case(
+                When(total__gt=0, then=F("defects") * 100.0 / F("total")),
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        )
+    )
+    if by == "parts":
+        totals = totals.order_by("-total", "worker_id")
+    else:
+        totals = totals.order_by("-rate", "-defects", "worker_id")
+    leaders = list(totals[:limit])
+    # Имена читаются только для отобранных строк, а не соединением со всей таблицей сводок.
+    workers = User.objects.in_bulk([row["worker_id"] for row in leaders])
+    rows: list[dict[str, Any]] = []
+    for row in leaders:
+        worker = workers[row["worker_id"]]
+        rows.append(
+            {
+                "id": worker.username.upper(),
+                "name": worker.get_full_name() or worker.username,
+                "total": row["total"],
+                "defects": row["defects"],
+                "rate": round(row["rate"], 3),
+            }
+        )
+    return rows
+
+
+def daily_series(rollup_filter: RollupFilter) -> list[dict[str, Any]]:
+    """Выпуск и брак по дням: одна точка на день, где есть записи под фильтром."""
+    return [
+        {"date": row["day"].isoformat(), "parts": row["parts"], "defects": row["defects"]}
+        for row in rollup_filter.apply(DailyRollup.objects.order_by())
+        .values("day")
+        .annotate(parts=Sum("parts_made"), defects=Sum("defective_parts"))
+        .order_by("day")
+    ]
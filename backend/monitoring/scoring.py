@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, fields
+
+import numpy as np
+
+EPS = 1e-9
+
+RISK_WEIGHTS = (0.87, 0.45, 0.32)
+
+
+@dataclass(frozen=True)
+class Thresholds:
+    T_crit: float = 28.0
+    V_crit: float = 0.25
+    W_crit: float = 60.0
+    p_crit: float = 0.7
+    window: int = 50
+
+    @classmethod
+    def from_params(cls, params: Mapping[str, str]) -> Thresholds:
+        values: dict[str, float | int] = {}
+        for field in fields(cls):
+            raw = params.get(field.name)
+            if raw in (None, ""):
+                continue
+            try:
+                value = float(str(raw).replace(",", "."))
+            except ValueError:
+                raise ValueError(f"Порог «{field.name}» должен быть числом.") from None
+            if not np.isfinite(value):
+                raise ValueError(f"Порог «{field.name}» должен быть числом.")
+            values[field.name] = int(value) if field.type == "int" else value
+        return cls(**values)
+
+
+@dataclass
+class ProcessScores:
+    t: np.ndarray
+    v: np.ndarray
+    w: np.ndarray
+    t_scaled: np.ndarray
+    v_scaled: np.ndarray
+    w_scaled: np.ndarray
+    p: np.ndarray
+    p_alert: np.ndarray
+    t_alert: np.ndarray
+    v_alert: np.ndarray
+    w_alert: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.p.shape[0])
+
+    @property
+    def avg_p(self) -> float:
+        return float(self.p.mean()) if len(self) else 0.0
+
+    @property
+    def alert_mask(self) -> np.ndarray:
+        return self.p_alert | self.t_alert | self.v_alert | self.w_alert
+
+    def alert_indices(self) -> np.ndarray:
+        return np.flatnonzero(self.alert_mask)
+
+    def alert_reasons(self, thresholds: Thresholds) -> list[tuple[int, list[str]]]:
+        indices = self.alert_indices()
+        columns = (
+            (self.p_alert, self.p, "p={:.2f}>" + f"{thresholds.p_crit:.2f}"),
+            (self.t_alert, self.t, "T={:.2f}>" + f"{thresholds.T_crit:.2f}"),
+            (self.v_alert, self.v, "V={:.3f}>" + f"{thresholds.V_crit:.3f}"),
+            (self.w_alert, self.w, "W={:.1f}>" + f"{thresholds.W_crit:.1f}"),
+        )
+        picked = [
+            (mask[indices].tolist(), values[indices].tolist(), template.format)
+            for mask, values, template in columns
+        ]
+        result: list[tuple[int, list[str]]] = []
+        for position, index in enumerate(indices.tolist()):
+            result.append(
+                (
+                    index,
+                    [
+                        fmt(values[position])
+                        for flags, values, fmt in picked
+                        if flags[position]
+                    ],
+                )
+            )
+        return result
+
+
+def min_max_scale(values: np.ndarray) -> np.ndarray:
+    finite = values[np.isfinite(values)]
+    if not finite.size:
+        return np.zeros_like(values)
+    low = finite.min()
+    span = finite.max() - low
+    if span < EPS:
+        return np.zeros_like(values)
+    return (values - low) / (span + EPS)
+
+
+def risk_probability(
+    t_scaled: np.ndarray, v_scaled: np.ndarray, w_scaled: np.ndarray
+) -> np.ndarray:
+    weight_t, weight_v, weight_w = RISK_WEIGHTS
+    q = weight_t * t_scaled + weight_v * v_scaled + weight_w * w_scaled
+    return 1.0 / (1.0 + np.exp(-(2.0 * q - 1.0)))
+
+
+def score_process(
+    t: Sequence[float] | np.ndarray,
+    v: Sequence[float] | np.ndarray,
+    w: Sequence[float] | np.ndarray,
+    thresholds: Thresholds,
+) -> ProcessScores:
+    t_arr = np.asarray(t, dtype=np.float64)
+    v_arr = np.asarray(v, dtype=np.float64)
+    w_arr = np.asarray(w, dtype=np.float64)
+    t_scaled = min_max_scale(t_arr)
+    v_scaled = min_max_scale(v_arr)
+    w_scaled = min_max_scale(w_arr)
+    p = risk_probability(t_scaled, v_scaled, w_scaled)
+    return ProcessScores(
+        t=t_arr,
+        v=v_arr,
+        w=w_arr,
+        t_scaled=t_scaled,
+        v_scaled=v_scaled,
+        w_scaled=w_scaled,
+        p=p,
+        p_alert=p > thresholds.p_crit,
+        t_alert=t_arr > thresholds.T_crit,
+        v_alert=v_arr > thresholds.V_crit,
+        w_alert=w_arr > thresholds.W_crit,
+    )
+
+
+def alert_message(index: int, reasons: list[str], ts: str | None = None) -> str:
+    suffix = f" ({ts})" if ts else ""
+    return f"⚠️ Ряд {index + 1}{suffix}: {', '.join(reasons)}"
+
+
+def sensor_reasons(t: float, v: float, w: float, thresholds: Thresholds) -> list[str]:
+    # Проверка одного замера по статическим порогам; p требует всей выборки и здесь не считается.
+    reasons: list[str] = []
+    if t > thresholds.T_crit:
+        reasons.append(f"T={t:.2f}>{thresholds.T_crit:.2f}")
+    if v > thresholds.V_crit:
+        reasons.append(f"V={v:.3f}>{thresholds.V_crit:.3f}")
+    if w > thresholds.W_crit:
+        reasons.append(f"W={w:.1f}>{thresholds.W_crit:.1f}")
+    return reasons
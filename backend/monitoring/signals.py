@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from typing import Any
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from . import detector, events, rollups
+from .models import Machine, ProductionEntry, StockMovement, TableVersion, Tool, ToolIssue, User
+
+TRACKED_MODELS = (ProductionEntry, Tool, ToolIssue, Machine, User)
+
+
+def table_name(model: type) -> str:
+    return model._meta.label_lower
+
+
+def _bump_version(sender: type, **kwargs: Any) -> None:
+    update_fields = kwargs.get("update_fields")
+    if sender is User and update_fields and set(update_fields) <= {"last_login", "password"}:
+        return
+    TableVersion.bump(table_name(sender))
+
+
+for _model in TRACKED_MODELS:
+    post_save.connect(_bump_version, sender=_model, dispatch_uid=f"version-save-{_model.__name__}")
+    post_delete.connect(
+        _bump_version, sender=_model, dispatch_uid=f"version-delete-{_model.__name__}"
+    )
+
+
+def worker_table(worker_id: int) -> str:
+    """Счётчик записей сотрудника: ключ кеша его панелей «последние записи» и «сообщения»."""
+    return f"{table_name(User)}:{worker_id}"
+
+
+def bump_workers(worker_ids: Iterable[int]) -> None:
+    TableVersion.bump(*(worker_table(worker_id) for worker_id in sorted(set(worker_ids))))
+
+
+def _bump_worker(sender: type, instance: ProductionEntry | ToolIssue, **kwargs: Any) -> None:
+    if kwargs.get("raw"):
+        return
+    worker_id = instance.worker_id if sender is ProductionEntry else instance.reported_by_id
+    bump_workers([worker_id])
+
+
+for _model in (ProductionEntry, ToolIssue):
+    post_save.connect(_bump_worker, sender=_model, dispatch_uid=f"worker-save-{_model.__name__}")
+    post_delete.connect(
+        _bump_worker, sender=_model, dispatch_uid=f"worker-delete-{_model.__name__}"
+    )
+
+
+def _remember_rollup_source(sender: type, instance: ProductionEntry, **kwargs: Any) -> None:
+    instance._rollup_previous = None
+    if instance._state.adding or instance.pk is None or kwargs.get("raw"):
+        return
+    instance._rollup_previous = (
+        ProductionEntry.objects.filter(pk=instance.pk)
+        .values(*rollups.ROLLUP_SOURCE_FIELDS)
+        .first()
+    )
+
+
+def _rollup_entry_saved(sender: type, instance: ProductionEntry, **kwargs: Any) -> None:
+    if kwargs.get("raw"):
+        return
+    previous = getattr(instance, "_rollup_previous", None)
+    rollups.replace_entry(previous, rollups.entry_values(instance))
+    instance._rollup_previous = None
+
+
+def _rollup_entry_deleted(sender: type, instance: ProductionEntry, **kwargs: Any) -> None:
+    rollups.remove_entries([instance])
+
+
+pre_save.connect(_remember_rollup_source, sender=ProductionEntry, dispatch_uid="rollup-pre-save")
+post_save.connect(_rollup_entry_saved, sender=ProductionEntry, dispatch_uid="rollup-save")
+post_delete.connect(_rollup_entry_deleted, sender=ProductionEntry, dispatch_uid="rollup-delete")
+
+
+def _remember_stock(sender: type, instance: Tool, **kwargs: Any) -> None:
+    instance._stock_previous = None
+    update_fields = kwargs.get("update_fields")
+    if instance._state.adding or instance.pk is None or kwargs.get("raw"):
+        return
+    if update_fields is not None and "stock" not in update_fields:
+        return
+    instance._stock_previous = (
+        Tool.objects.filter(pk=instance.pk).values_list("stock", flat=True).first()
+    )
+
+
+def _record_stock(sender: type, instance: Tool, **kwargs: Any) -> None:
+    # Пакетные правки идут через bulk_update мимо сигналов и пишут движения сами.
+    previous = getattr(instance, "_stock_previous", None)
+    if previous is not None and previous != instance.stock:
+        StockMovement.objects.create(
+            tool=instance, delta=instance.stock - previous, stock_after=instance.stock
+        )
+    instance._stock_previous = None
+
+
+pre_save.connect(_remember_stock, sender=Tool, dispatch_uid="stock-pre-save")
+post_save.connect(_record_stock, sender=Tool, dispatch_uid="stock-save")
+
+
+def _entry_created(sender: type, instance: ProductionEntry, created: bool, **kwargs: Any) -> None:
+    if created and not kwargs.get("raw"):
+        anomalies = detector.observe_entries([instance])
+        transaction.on_commit(lambda: events.publish_entries([instance]))
+        if anomalies:
+            transaction.on_commit(lambda: events.publish_anomalies(anomalies))
+
+
+def _publish_issue(sender: type, instance: ToolIssue, created: bool, **kwargs: Any) -> None:
+    if created and not kwargs.get("raw"):
+        transaction.on_commit(lambda: events.publish_issue(instance))
+
+
+post_save.connect(_entry_created, sender=ProductionEntry, dispatch_uid="events-entry")
+post_save.connect(_publish_issue, sender=ToolIssue, dispatch_uid="events-issue")
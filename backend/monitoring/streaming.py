@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import ProductionEntry
+from .pagination import Cursor, PageRequest
+from .wire import FLOAT64, INT64, TEXT, UINT8, ColumnarTable, columnar_chunks, epoch_ms
+
+CHUNK_SIZE = 2000
+MAX_WARNINGS = 1000
+
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+
+def process_values(queryset=None):
+    if queryset is None:
+        queryset = ProductionEntry.objects.all()
+    return queryset.annotate(
+        t=Cast("temperature_c", FloatField()),
+        v=Cast("vibration_mm", FloatField()),
+        w=Cast("tool_wear_percent", FloatField()),
+    ).values_list(
+        "id",
+        "t",
+        "v",
+        "w",
+        "defective_parts",
+        "machine__name",
+        "machine__subdivision",
+        "recorded_at",
+        "detail_name",
+        "shift",
+    )
+
+
+# Столбцы /api/manager/process/ в столбцовом формате; ts — миллисекунды Unix-времени.
+PROCESS_COLUMNS = {
+    "id": INT64,
+    "t": FLOAT64,
+    "v": FLOAT64,
+    "w": FLOAT64,
+    "defect": UINT8,
+    "machine": TEXT,
+    "machine_subdivision": TEXT,
+    "ts": INT64,
+    "detail": TEXT,
+    "shift": TEXT,
+}
+
+
+@dataclass
+class ProcessScan:
+    """Проход по строкам страницы: записи без замеров пропускаются с предупреждением."""
+
+    page: PageRequest
+    warnings: list[str] = field(default_factory=list)
+    skipped: int = 0
+    fetched: int = 0
+    last: Cursor | None = None
+    sync_point: int | None = None
+
+    def rows(self, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple]:
+        self.sync_point = self.page.sync_point(ProductionEntry.objects.all())
+        rows = self.page.apply(process_values()).iterator(chunk_size=chunk_size)
+        for row in rows:
+            pk, t, v, w, recorded_at = row[0], row[1], row[2], row[3], row[7]
+            self.fetched += 1
+            if self.page.limit is not None and self.fetched > self.page.limit:
+                break
+            self.last = Cursor(recorded_at=recorded_at, pk=pk)
+            if t is None or v is None or w is None:
+                self.skipped += 1
+                if len(self.warnings) < MAX_WARNINGS:
+                    self.warnings.append(
+                        f"Запись {pk} от {recorded_at:%Y-%m-%d %H:%M} пропущена: нет замеров."
+                    )
+                continue
+            yield row
+
+    def meta(self) -> dict[str, Any]:
+        warnings = list(self.warnings)
+        if self.skipped > len(warnings):
+            warnings.append(f"И ещё {self.skipped - len(warnings)} записей без замеров.")
+        meta = self.page.page_meta(self.fetched, self.last, self.sync_point)
+        return {"warnings": warnings, **meta}
+
+
+def stream_process_rows(page: PageRequest, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    tz = timezone.get_current_timezone()
+    scan = ProcessScan(page)
+    batch: list[str] = []
+    separator = ""
+
+    yield b'{"rows":['
+    for pk, t, v, w, defective, machine, subdivision, recorded_at, detail, shift in scan.rows(
+        chunk_size
+    ):
+        batch.append(
+            _encode(
+                {
+                    "id": pk,
+                    "t": t,
+                    "v": v,
+                    "w": w,
+                    "defect": 1 if defective > 0 else 0,
+                    "machine": machine,
+                    "machine_subdivision": subdivision,
+                    "ts": recorded_at.astimezone(tz).isoformat(),
+                    "detail": detail,
+                    "shift": shift,
+                }
+            )
+        )
+        if len(batch) >= chunk_size:
+            yield (separator + ",".join(batch)).encode()
+            separator = ","
+            batch.clear()
+    if batch:
+        yield (separator + ",".join(batch)).encode()
+
+    tail = _encode(scan.meta())
+    yield ("]," + tail[1:]).encode()
+
+
+def columnar_process_rows(
+    page: PageRequest, wire_format: str, chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Та же страница, что у stream_process_rows, одним массивом на поле."""
+    scan = ProcessScan(page)
+    table = ColumnarTable(PROCESS_COLUMNS)
+    append = table.append
+    for pk, t, v, w, defective, machine, subdivision, recorded_at, detail, shift in scan.rows(
+        chunk_size
+    ):
+        append(
+            (
+                pk,
+                t,
+                v,
+                w,
+                1 if defective > 0 else 0,
+                machine,
+                subdivision,
+                epoch_ms(recorded_at),
+                detail,
+                shift,
+            )
+        )
+    yield from columnar_chunks(wire_format, table, scan.meta())
+
+
+def employee_row(entry: ProductionEntry) -> dict[str, Any]:
+    worker = entry.worker
+    return {
+        "id": worker.username.upper(),
+        "name": worker.get_full_name() or worker.username,
+        "shift": entry.shift or "",
+        "parts_made": entry.parts_made,
+        "defects": entry.defective_parts,
+        "avg_temp": float(entry.temperature_c) if entry.temperature_c is not None else 0.0,
+        "avg_vib": float(entry.vibration_mm) if entry.vibration_mm is not None else 0.0,
+        "avg_wear": float(entry.tool_wear_percent) if entry.tool_wear_percent is not None else 0.0,
+        "date": timezone.localtime(entry.recorded_at).date().isoformat(),
+        "machine": entry.machine.name,
+        "detail": entry.detail_name,
+    }
+
+
+@dataclass
+class EmployeeScan:
+    """Проход по записям страницы /api/manager/employees/ без списка в памяти."""
+
+    page: PageRequest
+    fetched: int = 0
+    last: Cursor | None = None
+    sync_point: int | None = None
+
+    def rows(self, chunk_size: int = CHUNK_SIZE) -> Iterator[dict[str, Any]]:
+        self.sync_point = self.page.sync_point(ProductionEntry.objects.all())
+        entries = self.page.apply(ProductionEntry.objects.select_related("worker", "machine"))
+        for entry in entries.iterator(chunk_size=chunk_size):
+            self.fetched += 1
+            if self.page.limit is not None and self.fetched > self.page.limit:
+                break
+            self.last = Cursor(recorded_at=entry.recorded_at, pk=entry.pk)
+            yield employee_row(entry)
+
+    def meta(self) -> dict[str, Any]:
+        return self.page.page_meta(self.fetched, self.last, self.sync_point)
+
+
+def stream_employee_rows(page: PageRequest, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    scan = EmployeeScan(page)
+    batch: list[str] = []
+    separator = ""
+
+    yield b'{"rows":['
+    for row in scan.rows(chunk_size):
+        batch.append(_encode(row))
+        if len(batch) >= chunk_size:
+            yield (separator + ",".join(batch)).encode()
+            separator = ","
+            batch.clear()
+    if batch:
+        yield (separator + ",".join(batch)).encode()
+
+    tail = _encode(scan.meta())
+    yield ("]," + tail[1:]).encode()
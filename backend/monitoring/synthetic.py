@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import csv
+from collections import Counter, defaultdict
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+
+from .models import ProductionEntry
+
+DEFAULT_SHIFTS = ("А", "Б", "В", "Ночь")
+DETAIL_NAMES = tuple(f"Деталь {index:02d}" for index in range(1, 41))
+
+
+@dataclass(frozen=True)
+class MachineProfile:
+    name: str
+    temperature: tuple[float, float]
+    vibration: tuple[float, float]
+    wear: tuple[float, float]
+    defect_weight: float
+
+
+@dataclass(frozen=True)
+class SyntheticProfile:
+    machines: tuple[MachineProfile, ...]
+    shifts: tuple[str, ...]
+    shift_weights: tuple[float, ...]
+    parts: tuple[float, float]
+    defect_rate: float
+
+    @classmethod
+    def default(cls) -> SyntheticProfile:
+        return cls(
+            machines=tuple(
+                MachineProfile(
+                    name=f"CNC-{index:02d}",
+                    temperature=(24.0 + index * 0.2, 1.6),
+                    vibration=(0.13, 0.05),
+                    wear=(35.0, 12.0),
+                    defect_weight=1.0,
+                )
+                for index in range(1, 9)
+            ),
+            shifts=DEFAULT_SHIFTS,
+            shift_weights=(0.25, 0.25, 0.25, 0.25),
+            parts=(90.0, 25.0),
+            defect_rate=0.02,
+        )
+
+    @classmethod
+    def from_csv(cls, demo_csv: Path, employees_csv: Path) -> SyntheticProfile:
+        readings: dict[str, list[tuple[float, float, float, float]]] = defaultdict(list)
+        with demo_csv.open(newline="", encoding="utf-8") as fp:
+            for row in csv.DictReader(fp):
+                machine = (row.get("machine") or "").strip()
+                try:
+                    readings[machine].append(
+                        (
+                            float(row["temperature"]),
+                            float(row["vibration"]),
+                            float(row["wear"]),
+                            float(row.get("defect") or 0),
+                        )
+                    )
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+        shifts: Counter[str] = Counter()
+        parts: list[float] = []
+        defects = 0.0
+        with employees_csv.open(newline="", encoding="utf-8") as fp:
+            for row in csv.DictReader(fp):
+                shift = (row.get("shift") or "").strip()
+                if shift:
+                    shifts[shift] += 1
+                try:
+                    parts.append(float(row["parts_made"]))
+                    defects += float(row.get("defects") or 0)
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+        fallback = cls.default()
+        profiles = []
+        overall_defect = np.mean([r[3] for rows in readings.values() for r in rows] or [0.0])
+        for name, rows in readings.items():
+            if not name or len(rows) < 2:
+                continue
+            data = np.array(rows)
+            profiles.append(
+                MachineProfile(
+                    name=name,
+                    temperature=(float(data[:, 0].mean()), float(data[:, 0].std(ddof=1))),
+                    vibration=(float(data[:, 1].mean()), float(data[:, 1].std(ddof=1))),
+                    wear=(float(data[:, 2].mean()), float(data[:, 2].std(ddof=1))),
+                    defect_weight=float(data[:, 3].mean() / overall_defect)
+                    if overall_defect
+                    else 1.0,
+                )
+            )
+        total_shifts = sum(shifts.values())
+        return cls(
+            machines=tuple(profiles) or fallback.machines,
+            shifts=tuple(shifts) or fallback.shifts,
+            shift_weights=tuple(count / total_shifts for count in shifts.values())
+            if total_shifts
+            else fallback.shift_weights,
+            parts=(float(np.mean(parts)), float(np.std(parts, ddof=1)))
+            if len(parts) > 1
+            else fallback.parts,
+            defect_rate=defects / sum(parts) if sum(parts) else fallback.defect_rate,
+        )
+
+
+def generate_entries(
+    count: int,
+    profile: SyntheticProfile,
+    machine_ids: dict[str, int],
+    worker_ids: list[int],
+    *,
+    start: datetime,
+    end: datetime,
+    seed: int = 42,
+    batch_size: int = 20000,
+) -> Iterator[list[ProductionEntry]]:
+    rng = np.random.default_rng(seed)
+    machines = [machine for machine in profile.machines if machine.name in machine_ids]
+    if not machines or not worker_ids:
+        return
+    temperature = np.array([m.temperature for m in machines])
+    vibration = np.array([m.vibration for m in machines])
+    wear = np.array([m.wear for m in machines])
+    defect_weight = np.array([m.defect_weight for m in machines])
+    ids = [machine_ids[m.name] for m in machines]
+    shift_weights = np.array(profile.shift_weights) / sum(profile.shift_weights)
+    span = (end - start).total_seconds()
+
+    for offset in range(0, count, batch_size):
+        size = min(batch_size, count - offset)
+        machine = rng.integers(0, len(machines), size)
+        worker = rng.integers(0, len(worker_ids), size)
+        shift = rng.choice(len(profile.shifts), size, p=shift_weights)
+        detail = rng.integers(0, len(DETAIL_NAMES), size)
+        t = rng.normal(temperature[machine, 0], temperature[machine, 1]).clip(-99, 999)
+        v = np.abs(rng.normal(vibration[machine, 0], vibration[machine, 1])).clip(0, 99)
+        w = rng.normal(wear[machine, 0], wear[machine, 1]).clip(0, 100)
+        parts = np.maximum(rng.normal(*profile.parts, size).round(), 1).astype(np.int64)
+        rate = np.clip(profile.defect_rate * defect_weight[machine], 0, 1)
+        defects = rng.binomial(parts, rate)
+        seconds = np.sort(
+            span * (offset + rng.uniform(0, size, size)) / count
+        )
+        yield [
+            ProductionEntry(
+                worker_id=worker_ids[worker[row]],
+                machine_id=ids[machine[row]],
+                detail_name=DETAIL_NAMES[detail[row]],
+                parts_made=int(parts[row]),
+                defective_parts=int(defects[row]),
+                temperature_c=Decimal(f"{t[row]:.2f}"),
+                vibration_mm=Decimal(f"{v[row]:.3f}"),
+                tool_wear_percent=Decimal(f"{w[row]:.2f}"),
+                shift=profile.shifts[shift[row]],
+                note="Синтетические данные",
+                recorded_at=start + timedelta(seconds=float(seconds[row])),
+            )
+            for row in range(size)
+        ]
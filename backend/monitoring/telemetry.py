@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from typing import Any
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .gateway import PayloadError
+from .models import Machine, ProductionEntry, TelemetryChunk
+
+SAMPLE_DTYPE = np.dtype([("offset_ms", "<u4"), ("t", "<f4"), ("v", "<f4"), ("w", "<f4")])
+CHANNELS = ("t", "v", "w")
+# Знаков после запятой при выдаче: как у DecimalField в ProductionEntry.
+CHANNEL_DIGITS = {"t": 2, "v": 3, "w": 2}
+CHUNK_SAMPLES = 3600
+# Последний отрезок суток дозаполняется, только пока в нём меньше замеров: иначе частые
+# мелкие пакеты каждый раз переписывали бы почти полный BLOB, и дописывание росло бы квадратично.
+TOP_UP_SAMPLES = 256
+# Замер в JSON занимает около 40 байт: пакет длиннее не пройдёт DATA_UPLOAD_MAX_MEMORY_SIZE.
+JSON_SAMPLE_BYTES = 40
+MAX_APPEND_SAMPLES = (
+    settings.DATA_UPLOAD_MAX_MEMORY_SIZE // JSON_SAMPLE_BYTES
+    if settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+    else 86_400
+)
+ENTRY_WINDOW_MAX = timedelta(hours=12)
+
+
+@dataclass
+class Series:
+    ts_ms: np.ndarray
+    t: np.ndarray
+    v: np.ndarray
+    w: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.ts_ms.shape[0])
+
+    @classmethod
+    def empty(cls) -> Series:
+        return cls(np.empty(0, np.int64), *(np.empty(0, np.float32) for _ in CHANNELS))
+
+    def to_dict(self) -> dict[str, list[Any]]:
+        result: dict[str, list[Any]] = {"ts": self.ts_ms.tolist()}
+        for name in CHANNELS:
+            result[name] = _json_values(getattr(self, name), CHANNEL_DIGITS[name])
+        return result
+
+
+def _json_values(values: np.ndarray, digits: int) -> list[float | None]:
+    rounded = np.round(values.astype(np.float64), digits)
+    return [None if math.isnan(value) else value for value in rounded.tolist()]
+
+
+def _epoch_ms(moment: datetime) -> int:
+    return int(moment.timestamp() * 1000)
+
+
+def _from_epoch_ms(value: int) -> datetime:
+    return datetime.fromtimestamp(value / 1000, tz=dt_timezone.utc)
+
+
+def _local_day(value_ms: int) -> date:
+    return timezone.localtime(_from_epoch_ms(value_ms)).date()
+
+
+def _day_end_ms(day: date) -> int:
+    return _epoch_ms(timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min)))
+
+
+def _encode(start_ms: int, ts_ms: np.ndarray, t, v, w) -> bytes:
+    records = np.empty(ts_ms.shape[0], dtype=SAMPLE_DTYPE)
+    records["offset_ms"] = ts_ms - start_ms
+    records["t"], records["v"], records["w"] = t, v, w
+    return records.tobytes()
+
+
+def _decode(chunk: TelemetryChunk) -> tuple[np.ndarray, np.ndarray]:
+    records = np.frombuffer(bytes(chunk.data), dtype=SAMPLE_DTYPE)
+    return _epoch_ms(chunk.start_at) + records["offset_ms"].astype(np.int64), records
+
+
+def append(machine_id: int, ts_ms: np.ndarray, t: np.ndarray, v: np.ndarray, w: np.ndarray) -> int:
+    """Дописывает замеры по суткам; последний отрезок суток дозаполняется, если замеры позже
+    и он ещё мал (TOP_UP_SAMPLES), иначе начинается новый."""
+    ts_ms = np.asarray(ts_ms, dtype=np.int64)
+    columns = [np.asarray(values, dtype=np.float32) for values in (t, v, w)]
+    if not ts_ms.size:
+        return 0
+    order = np.argsort(ts_ms, kind="stable")
+    ts_ms = ts_ms[order]
+    columns = [values[order] for values in columns]
+
+    with transaction.atomic():
+        start = 0
+        while start < ts_ms.size:
+            day = _local_day(int(ts_ms[start]))
+            stop = int(np.searchsorted(ts_ms, _day_end_ms(day), side="left"))
+            _append_day(machine_id, day, ts_ms[start:stop], [c[start:stop] for c in columns])
+            start = stop
+    return int(ts_ms.size)
+
+
+def _append_day(machine_id: int, day: date, ts_ms: np.ndarray, columns: list[np.ndarray]) -> None:
+    new_chunks: list[TelemetryChunk] = []
+    position = 0
+    # BLOB читается, только если отрезок действительно дозаполняется.
+    last = (
+        TelemetryChunk.objects.filter(machine_id=machine_id, day=day)
+        .defer("data")
+        .order_by("-start_at")
+        .first()
+    )
+    if last is not None and last.samples < TOP_UP_SAMPLES and _epoch_ms(last.end_at) <= ts_ms[0]:
+        take = min(CHUNK_SAMPLES - last.samples, ts_ms.size)
+        start_ms = _epoch_ms(last.start_at)
+        last.data = bytes(last.data) + _encode(
+            start_ms, ts_ms[:take], *(c[:take] for c in columns)
+        )
+        last.samples += take
+        last.end_at = _from_epoch_ms(int(ts_ms[take - 1]))
+        last.save(update_fields=["data", "samples", "end_at"])
+        position = take
+
+    while position < ts_ms.size:
+        stop = min(position + CHUNK_SAMPLES, ts_ms.size)
+        start_ms = int(ts_ms[position])
+        new_chunks.append(
+            TelemetryChunk(
+                machine_id=machine_id,
+                day=day,
+                start_at=_from_epoch_ms(start_ms),
+                end_at=_from_epoch_ms(int(ts_ms[stop - 1])),
+                samples=stop - position,
+                data=_encode(
+                    start_ms, ts_ms[position:stop], *(c[position:stop] for c in columns)
+                ),
+            )
+        )
+        position = stop
+    TelemetryChunk.objects.bulk_create(new_chunks)
+
+
+def read(machine_id: int, start: datetime, end: datetime) -> Series:
+    """Замеры станка в полуинтервале [start, end), упорядоченные по времени."""
+    chunks = TelemetryChunk.objects.filter(
+        machine_id=machine_id,
+        day__gte=timezone.localtime(start).date() - timedelta(days=1),
+        day__lte=timezone.localtime(end).date(),
+        start_at__lt=end,
+        end_at__gte=start,
+    ).order_by("start_at")
+    parts_ts: list[np.ndarray] = []
+    parts: list[np.ndarray] = []
+    for chunk in chunks:
+        ts_ms, records = _decode(chunk)
+        parts_ts.append(ts_ms)
+        parts.append(records)
+    if not parts:
+        return Series.empty()
+
+    ts_ms = np.concatenate(parts_ts)
+    records = np.concatenate(parts)
+    if ts_ms.size > 1 and np.any(ts_ms[1:] < ts_ms[:-1]):
+        order = np.argsort(ts_ms, kind="stable")
+        ts_ms, records = ts_ms[order], records[order]
+    mask = (ts_ms >= _epoch_ms(start)) & (ts_ms < _epoch_ms(end))
+    return Series(ts_ms[mask], *(np.ascontiguousarray(records[name][mask]) for name in CHANNELS))
+
+
+def downsample(series: Series, resolution_s: float) -> dict[str, list[Any]]:
+    """Корзины по времени: число замеров и минимум/среднее/максимум каждого канала."""
+    if not len(series):
+        empty = {f"{name}_{stat}": [] for name in CHANNELS for stat in ("min", "mean", "max")}
+        return {"ts": [], "count": [], **empty}
+    step = max(int(resolution_s * 1000), 1)
+    buckets = (series.ts_ms - series.ts_ms[0]) // step
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    result: dict[str, list[Any]] = {
+        "ts": (series.ts_ms[0] + buckets[starts] * step).tolist(),
+        "count": np.diff(np.r_[starts, len(series)]).tolist(),
+    }
+    for name in CHANNELS:
+        values = getattr(series, name).astype(np.float64)
+        finite = np.isfinite(values)
+        counts = np.add.reduceat(finite.astype(np.int64), starts)
+        sums = np.add.reduceat(np.where(finite, values, 0.0), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(counts > 0, sums / counts, np.nan)
+        digits = CHANNEL_DIGITS[name]
+        result[f"{name}_min"] = _json_values(np.fmin.reduceat(values, starts), digits)
+        result[f"{name}_mean"] = _json_values(means, digits)
+        result[f"{name}_max"] = _json_values(np.fmax.reduceat(values, starts), digits)
+    return result
+
+
+def entry_window(entry: ProductionEntry) -> tuple[datetime, datetime]:
+    """Окно замеров записи: от предыдущей записи того же станка до её времени, не длиннее 12 ч."""
+    previous = (
+        ProductionEntry.objects.filter(
+            machine_id=entry.machine_id, recorded_at__lt=entry.recorded_at
+        )
+        .order_by("-recorded_at")
+        .values_list("recorded_at", flat=True)
+        .first()
+    )
+    start = entry.recorded_at - ENTRY_WINDOW_MAX
+    if previous is not None and previous > start:
+        start = previous
+    return start, entry.recorded_at + timedelta(milliseconds=1)
+
+
+def _timestamps(raw: list[Any]) -> np.ndarray:
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in raw):
+        seconds = np.asarray(raw, dtype=np.float64)
+        if not np.all(np.isfinite(seconds)):
+            raise PayloadError("Поле «ts» содержит нечисловые значения.")
+        return np.round(seconds * 1000).astype(np.int64)
+    result = np.empty(len(raw), dtype=np.int64)
+    current_tz = timezone.get_current_timezone()
+    for index, value in enumerate(raw):
+        try:
+            parsed = parse_datetime(str(value))
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise PayloadError(f"Замер {index}: время должно быть числом секунд или ISO 8601.")
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed, current_tz)
+        result[index] = _epoch_ms(parsed)
+    return result
+
+
+def parse_samples(body: bytes) -> tuple[str, np.ndarray, list[np.ndarray]]:
+    """Разбирает столбцы {"machine", "ts", "t", "v", "w"} или {"machine", "samples": [...]}."""
+    try:
+        payload = json.loads(body.decode("utf-8") or "{}")
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise PayloadError("Некорректный JSON.") from None
+    if not isinstance(payload, dict):
+        raise PayloadError("Ожидается JSON-объект.")
+    machine = str(payload.get("machine") or "").strip()
+    if not machine:
+        raise PayloadError("Поле «machine» обязательно.")
+
+    if "samples" in payload:
+        samples = payload["samples"]
+        if not isinstance(samples, list) or not all(
+            isinstance(row, list) and len(row) == 4 for row in samples
+        ):
+            raise PayloadError("«samples» — список строк [ts, t, v, w].")
+        raw_ts = [row[0] for row in samples]
+        raw_columns = [[row[index] for row in samples] for index in (1, 2, 3)]
+    else:
+        raw_ts = payload.get("ts")
+        raw_columns = [payload.get(name) for name in CHANNELS]
+        if not isinstance(raw_ts, list) or not all(
+            isinstance(column, list) and len(column) == len(raw_ts) for column in raw_columns
+        ):
+            raise PayloadError("Поля «ts», «t», «v», «w» — списки одной длины.")
+    if len(raw_ts) > MAX_APPEND_SAMPLES:
+        raise PayloadError(f"В пакете не больше {MAX_APPEND_SAMPLES} замеров.")
+
+    columns: list[np.ndarray] = []
+    for name, raw in zip(CHANNELS, raw_columns):
+        try:
+            values = np.asarray([np.nan if value is None else value for value in raw], np.float64)
+        except (TypeError, ValueError):
+            raise PayloadError(f"Поле «{name}» должно содержать числа.") from None
+        if np.any(np.isinf(values)):
+            raise PayloadError(f"Поле «{name}» содержит бесконечные значения.")
+        columns.append(values.astype(np.float32))
+    return machine, _timestamps(raw_ts), columns
+
+
+def machine_id_by_name(name: str) -> int | None:
+    return Machine.objects.filter(name=name).values_list("id", flat=True).first()
@@ -0,0 +1,375 @@
+import json
+import tempfile
+from datetime import date, timedelta
+
+import numpy as np
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from monitoring import detector, rollups
+from monitoring.benchmarking import seed_entries
+from monitoring.downsampling import downsample_indices
+from monitoring.forecasting import WEEK, days_until
+from monitoring.gateway import insert_entries, issue_token
+from monitoring.imports import claim_next_import, create_import, run_import
+from monitoring.models import (
+    ArchivedEntry,
+    DailyRollup,
+    ImportJob,
+    Machine,
+    MachineDetectorState,
+    ProductionEntry,
+    Tool,
+    User,
+)
+from monitoring.retention import archive_entries
+
+# Сессия, пользователь и одно чтение TableVersion.
+CONDITIONAL_QUERIES = 3
+
+
+def _consume(response) -> None:
+    if response.streaming:
+        b"".join(response.streaming_content)
+
+
+def _rollup_rows() -> list[tuple]:
+    # Суммы датчиков округляются: порядок сложения в сигналах и в пересчёте разный.
+    return sorted(
+        (
+            *values[:4],
+            *(round(value, 6) if isinstance(value, float) else value for value in values[4:]),
+        )
+        for values in DailyRollup.objects.values_list(
+            "day", "worker_id", "machine_id", "shift", *rollups.COUNTERS
+        )
+    )
+
+
+class ConditionalGetTests(TestCase):
+    paths = ("/api/manager/process/", "/api/manager/employees/", "/api/manager/inventory/")
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        seed_entries(200, workers=3, tools=5)
+        cls.manager = User.objects.create(username="manager", role=User.Role.MANAGER)
+
+    def setUp(self) -> None:
+        caches["responses"].clear()
+        self.client.force_login(self.manager)
+
+    def _etag(self, path: str) -> str:
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        _consume(response)
+        return response["ETag"]
+
+    def test_unchanged_poll_costs_one_version_query(self) -> None:
+        for path in self.paths:
+            with self.subTest(path=path):
+                etag = self._etag(path)
+                with self.assertNumQueries(CONDITIONAL_QUERIES):
+                    response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_write_changes_etag(self) -> None:
+        etag = self._etag("/api/manager/inventory/")
+        Tool.objects.create(name="Новый инструмент", stock=1, min_threshold=0)
+        response = self.client.get("/api/manager/inventory/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class WorkerDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        seed_entries(200, workers=3, tools=5)
+        cls.worker = User.objects.filter(role=User.Role.WORKER).first()
+
+    def setUp(self) -> None:
+        caches["default"].clear()
+        self.client.force_login(self.worker)
+
+    def test_repeat_load_reads_cached_lists_and_panels(self) -> None:
+        self.assertEqual(self.client.get("/").status_code, 200)
+        # Сессия, пользователь и версии таблиц; списки и панели берутся из кэша.
+        with self.assertNumQueries(3):
+            response = self.client.get("/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_new_entry_refreshes_recent_panel(self) -> None:
+        self.client.get("/")
+        ProductionEntry.objects.create(
+            worker=self.worker,
+            machine=Machine.objects.first(),
+            detail_name="Контрольная деталь",
+            parts_made=5,
+        )
+        self.assertContains(self.client.get("/"), "Контрольная деталь")
+
+
+class EmployeeImportTests(TestCase):
+    header = "id,name,parts_made,defects,date,machine\n"
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.manager = User.objects.create(username="manager", role=User.Role.MANAGER)
+        Machine.objects.create(name="Станок 1")
+
+    def setUp(self) -> None:
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.enterContext(override_settings(IMPORT_ROOT=root.name))
+
+    def _import(self, body: str, **options) -> ImportJob:
+        upload = SimpleUploadedFile("employees.csv", (self.header + body).encode())
+        create_import(self.manager, ImportJob.Kind.EMPLOYEES, upload, {})
+        return run_import(claim_next_import(), **options)
+
+    def _row(self, index: int, defects: int = 1) -> str:
+        return f"W{index},Сотрудник {index},10,{defects},2024-05-0{index}T08:00:00,Станок 1\n"
+
+    def test_resume_continues_after_committed_chunk(self) -> None:
+        first = self._row(1) + self._row(2)
+        body = first + self._row(3) + self._row(4, defects=11) + self._row(5)
+        job = self._import(body, chunk_rows=2, max_chunks=1)
+        self.assertEqual(job.status, ImportJob.Status.PENDING)
+        self.assertEqual((job.accepted, job.lines), (2, 3))
+        self.assertEqual(job.position, len((self.header + first).encode()))
+
+        job = run_import(claim_next_import(), chunk_rows=2)
+        self.assertEqual(job.status, ImportJob.Status.DONE)
+        self.assertEqual((job.accepted, job.rejected), (4, 1))
+        self.assertEqual(ProductionEntry.objects.count(), 4)
+        self.assertEqual(len(job.warnings), 1)
+        self.assertTrue(job.warnings[0].startswith("Строка 5 "))
+
+    def test_rejected_rows_create_no_accounts(self) -> None:
+        job = self._import(
+            "W1,Иванов,10,1,2024-05-01T08:00:00,Станок 1\n"
+            "W2,Петров,10,11,2024-05-01T08:00:00,Станок 1\n"
+            "W3,Сидоров,10,1,2024-05-01T08:00:00,Нет такого\n"
+        )
+        self.assertEqual((job.accepted, job.rejected), (1, 2))
+        self.assertEqual(
+            list(User.objects.filter(role=User.Role.WORKER).values_list("username", flat=True)),
+            ["w1"],
+        )
+        self.assertEqual(ProductionEntry.objects.get().worker.first_name, "Иванов")
+
+
+class GatewayIngestTests(TestCase):
+    path = "/api/gateway/entries/"
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        seed_entries(0, workers=2, tools=1, issues=0)
+        cls.machine = Machine.objects.order_by("id").first().name
+        _, cls.token = issue_token("Линия 1", User.objects.get(username="bench000"))
+
+    def _post(self, body: str, content_type: str, **headers):
+        return self.client.post(
+            self.path,
+            body,
+            content_type=content_type,
+            HTTP_AUTHORIZATION=f"Bearer {self.token}",
+            **headers,
+        )
+
+    def _row(self, **fields) -> dict:
+        return {"machine": self.machine, "detail": "Корпус", "parts_made": 10, **fields}
+
+    def test_rejects_bad_rows_and_reports_ndjson_lines(self) -> None:
+        rows = [
+            json.dumps(self._row()),
+            "{не json",
+            "",
+            json.dumps(self._row(defective_parts=11)),
+            json.dumps(self._row(worker="BENCH001")),
+            json.dumps(self._row(machine="Нет такого")),
+        ]
+        response = self._post("\n".join(rows), "application/x-ndjson")
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual((result["accepted"], result["rejected"]), (2, 3))
+        self.assertEqual(result["rows"], [0, 3])
+        self.assertEqual([error["line"] for error in result["errors"]], [2, 4, 6])
+        workers = ProductionEntry.objects.order_by("id").values_list("worker__username", flat=True)
+        self.assertEqual(list(workers), ["bench000", "bench001"])
+
+    def test_idempotency_key_replays_first_response(self) -> None:
+        body = json.dumps({"entries": [self._row(), self._row(parts_made=5)]})
+        first = self._post(body, "application/json", HTTP_IDEMPOTENCY_KEY="batch-1")
+        second = self._post(body, "application/json", HTTP_IDEMPOTENCY_KEY="batch-1")
+        self.assertEqual(first.json(), second.json())
+        self.assertNotIn("Idempotent-Replayed", first)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(ProductionEntry.objects.count(), 2)
+
+    def test_rejects_bad_token_and_payload(self) -> None:
+        response = self.client.post(
+            self.path, "[]", content_type="application/json", HTTP_AUTHORIZATION="Bearer нет"
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self._post("{", "application/json").status_code, 400)
+        self.assertEqual(self._post('{"entries": 1}', "application/json").status_code, 400)
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        seed_entries(300, workers=3, tools=1, issues=0)
+
+    def test_in_place_edits_match_rebuild(self) -> None:
+        entries = list(ProductionEntry.objects.order_by("id")[:4])
+        entries[0].parts_made += 7
+        entries[0].temperature_c = None
+        entries[0].save()
+        entries[1].shift = "Ночная" if entries[1].shift != "Ночная" else "Дневная"
+        entries[1].save()
+        entries[2].recorded_at -= timedelta(days=3)
+        entries[2].worker = User.objects.exclude(pk=entries[2].worker_id).first()
+        entries[2].save()
+        entries[3].delete()
+        ProductionEntry.objects.create(
+            worker=entries[0].worker, machine=entries[0].machine, detail_name="Новая", parts_made=3
+        )
+
+        incremental = _rollup_rows()
+        rollups.rebuild()
+        self.assertEqual(incremental, _rollup_rows())
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        seed_entries(300, workers=3, tools=1, issues=0)
+
+    def test_moves_old_entries_and_keeps_rollups(self) -> None:
+        cutoff = timezone.now() - timedelta(days=180)
+        old = set(
+            ProductionEntry.objects.filter(recorded_at__lt=cutoff).values_list("id", flat=True)
+        )
+        kept = ProductionEntry.objects.count() - len(old)
+        before = _rollup_rows()
+
+        result = archive_entries(cutoff, batch_size=40, pause=0)
+
+        self.assertEqual(result.moved, len(old))
+        self.assertEqual(result.batches, -(-len(old) // 40))
+        self.assertEqual(sum(result.months.values()), len(old))
+        self.assertEqual(set(ArchivedEntry.objects.values_list("id", flat=True)), old)
+        self.assertEqual(ProductionEntry.objects.count(), kept)
+        self.assertFalse(ProductionEntry.objects.filter(recorded_at__lt=cutoff).exists())
+        self.assertEqual(before, _rollup_rows())
+        # Сводки по-прежнему сходятся с пересчётом по горячей таблице и архиву.
+        rollups.rebuild()
+        self.assertEqual(before, _rollup_rows())
+        self.assertEqual(archive_entries(cutoff, pause=0).moved, 0)
+
+
+class DetectorStateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        seed_entries(60, workers=1, tools=1, issues=0)
+
+    def test_saved_window_survives_ingest(self) -> None:
+        entries = list(ProductionEntry.objects.order_by("recorded_at", "id"))
+        machine = entries[0].machine
+        mine = [entry for entry in entries if entry.machine_id == machine.pk]
+        detector.observe_entries(mine[:-3], window=12)
+
+        new = [
+            ProductionEntry(
+                worker=entry.worker,
+                machine=machine,
+                detail_name=entry.detail_name,
+                parts_made=entry.parts_made,
+                defective_parts=entry.defective_parts,
+                temperature_c=entry.temperature_c,
+                vibration_mm=entry.vibration_mm,
+                tool_wear_percent=entry.tool_wear_percent,
+            )
+            for entry in mine[-3:]
+        ]
+        insert_entries(new)
+
+        state = MachineDetectorState.objects.get(machine=machine)
+        self.assertEqual(state.window, 12)
+        self.assertEqual(state.observations, len(mine))
+        self.assertEqual(state.last_entry_id, new[-1].pk)
+        expected = detector.RollingDetector(12)
+        for entry in mine:
+            expected.observe(detector.entry_channels(entry))
+        self.assertEqual(bytes(state.state), expected.to_bytes())
+
+
+class DaysUntilTests(SimpleTestCase):
+    monday = date(2024, 5, 6)
+
+    def _simulate(self, amount: float, rate: float, factors: np.ndarray, today: date) -> float:
+        left, day = amount, 0
+        while day < 10 * WEEK * 52:
+            spend = rate * factors[(today.weekday() + day) % WEEK]
+            if spend > 0 and left <= spend:
+                return day + left / spend
+            left -= spend
+            day += 1
+        return float("inf")
+
+    def test_flat_profile_and_edge_cases(self) -> None:
+        days = days_until(
+            np.array([10.0, 0.0, -5.0, 10.0]),
+            np.array([2.0, 2.0, 2.0, 0.0]),
+            np.ones((4, WEEK)),
+            self.monday,
+        )
+        np.testing.assert_array_equal(days, [5.0, 0.0, 0.0, np.inf])
+
+    def test_weekly_profile_matches_day_by_day_simulation(self) -> None:
+        rng = np.random.default_rng(7)
+        amount = rng.uniform(0, 300, 50)
+        rates = rng.uniform(0.5, 5, 50)
+        factors = rng.uniform(0, 2, (50, WEEK))
+        # Расход только по понедельникам: остаток переходит через пустые дни недели.
+        factors[:5] = 0.0
+        factors[:5, 0] = WEEK
+        for today in (self.monday, self.monday + timedelta(days=4)):
+            with self.subTest(today=today):
+                expected = [
+                    self._simulate(*values, today) for values in zip(amount, rates, factors)
+                ]
+                np.testing.assert_allclose(days_until(amount, rates, factors, today), expected)
+
+
+class DownsamplingTests(SimpleTestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(3)
+        self.x = np.arange(1000, dtype=np.float64)
+        self.y = np.sin(self.x / 40) + rng.normal(0, 0.05, self.x.size)
+
+    def test_short_series_is_returned_whole(self) -> None:
+        for method in ("lttb", "minmax"):
+            with self.subTest(method=method):
+                indices = downsample_indices(self.x[:50], self.y[:50], 100, method)
+                np.testing.assert_array_equal(indices, np.arange(50))
+
+    def test_lttb_keeps_ends_and_spikes_over_limit(self) -> None:
+        # В одной корзине провал и превышение: без limit LTTB берёт провал с большей площадью.
+        self.y[512], self.y[517] = -3.0, 1.4
+        self.assertNotIn(517, downsample_indices(self.x, self.y, 100, "lttb"))
+        indices = downsample_indices(self.x, self.y, 100, "lttb", limit=1.3)
+        self.assertEqual(indices.size, 100)
+        self.assertEqual((indices[0], indices[-1]), (0, 999))
+        self.assertTrue(np.all(np.diff(indices) > 0))
+        self.assertIn(517, indices)
+
+    def test_minmax_keeps_each_bucket_extremes(self) -> None:
+        indices = downsample_indices(self.x, self.y, 100, "minmax")
+        self.assertLessEqual(indices.size, 100)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+        edges = np.linspace(0, self.y.size, 51).astype(int)
+        for lo, hi in zip(edges[:-1], edges[1:]):
+            self.assertIn(lo + int(np.argmin(self.y[lo:hi])), indices)
+            self.assertIn(lo + int(np.argmax(self.y[lo:hi])), indices)
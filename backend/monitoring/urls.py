@@ -9,10 +9,74 @@ urlpatterns = [
     path("", views.dashboard, name="dashboard"),
     path("entries/new/", views.create_production_entry, name="create_production_entry"),
     path("tools/report/", views.report_tool_issue, name="report_tool_issue"),
+    path("api/gateway/entries/", views.api_gateway_ingest, name="api_gateway_ingest"),
+    path(
+        "api/gateway/telemetry/",
+        views.api_gateway_telemetry,
+        name="api_gateway_telemetry",
+    ),
     path("export/excel/", views.export_excel, name="export_excel"),
+    path("export/csv/", views.export_csv, name="export_csv"),
+    path("api/manager/exports/", views.api_export_start, name="api_manager_export_start"),
+    path(
+        "api/manager/exports/<int:pk>/",
+        views.api_export_status,
+        name="api_manager_export_status",
+    ),
+    path(
+        "api/manager/exports/<int:pk>/download/",
+        views.api_export_download,
+        name="api_manager_export_download",
+    ),
+    path("api/manager/imports/", views.api_import_start, name="api_manager_import_start"),
+    path(
+        "api/manager/imports/<int:pk>/",
+        views.api_import_status,
+        name="api_manager_import_status",
+    ),
     path("api/manager/process/", views.api_process_rows, name="api_manager_process"),
+    path(
+        "api/manager/process/scored/",
+        views.api_process_scored,
+        name="api_manager_process_scored",
+    ),
+    path(
+        "api/manager/process/series/",
+        views.api_process_series,
+        name="api_manager_process_series",
+    ),
     path("api/manager/employees/", views.api_employee_rows, name="api_manager_employees"),
+    path(
+        "api/manager/employees/daily/",
+        views.api_employee_daily,
+        name="api_manager_employees_daily",
+    ),
+    path(
+        "api/manager/employees/leaders/",
+        views.api_employee_leaders,
+        name="api_manager_employees_leaders",
+    ),
+    path(
+        "api/manager/employees/series/",
+        views.api_employee_series,
+        name="api_manager_employees_series",
+    ),
+    path("api/manager/telemetry/", views.api_telemetry, name="api_manager_telemetry"),
+    path(
+        "api/manager/entries/<int:pk>/telemetry/",
+        views.api_entry_telemetry,
+        name="api_manager_entry_telemetry",
+    ),
+    path("api/manager/anomalies/", views.api_anomalies, name="api_manager_anomalies"),
+    path("api/manager/detectors/", views.api_detectors, name="api_manager_detectors"),
+    path("api/manager/events/", views.api_events, name="api_manager_events"),
+    path("api/manager/cache/", views.api_cache_stats, name="api_manager_cache_stats"),
     path("api/manager/inventory/", views.api_inventory_rows, name="api_manager_inventory"),
+    path(
+        "api/manager/inventory/batch/",
+        views.api_inventory_batch_update,
+        name="api_manager_inventory_batch",
+    ),
     path(
         "api/manager/inventory/<int:pk>/",
         views.api_inventory_update,
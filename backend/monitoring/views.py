@@ -1,23 +1,91 @@
 from __future__ import annotations
 
 import json
-from collections.abc import Iterable
-from decimal import Decimal, InvalidOperation
+import math
+from collections.abc import Iterator
+from datetime import datetime, timedelta
 from typing import Any
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView
-from django.http import HttpRequest, HttpResponse, HttpResponseForbidden, JsonResponse
+from django.core.exceptions import RequestDataTooBig
+from django.http import (
+    FileResponse,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseForbidden,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
-
-from openpyxl import Workbook
-
+from django.utils.dateparse import parse_datetime
+
+import numpy as np
+
+from . import telemetry, write_behind
+from .conditional import versioned
+from .detector import CHANNELS, RollingDetector
+from .downsampling import METHODS, downsample_indices
+from .events import anomaly_to_dict, event_stream
+from .export_jobs import (
+    CONTENT_TYPES,
+    artifact_path,
+    download_name,
+    job_to_dict,
+    request_export,
+)
+from .exports import (
+    CSV_CONTENT_TYPE,
+    CSV_FILENAME,
+    EXPORT_FILENAME,
+    XLSX_CONTENT_TYPE,
+    ExportFilter,
+    spool_workbook,
+    stream_csv,
+)
 from .forms import ProductionEntryForm, ToolIssueForm
-from .models import ProductionEntry, Tool, ToolIssue, User
+from .gateway import PayloadError, authenticate, ingest, parse_payload
+from .imports import create_import, import_to_dict
+from .inventory import MAX_BATCH_ITEMS, apply_patches, parse_patch
+from .models import (
+    DailyRollup,
+    ExportJob,
+    ImportJob,
+    Machine,
+    MachineAnomaly,
+    MachineDetectorState,
+    ProductionEntry,
+    TableVersion,
+    Tool,
+    ToolForecast,
+    ToolIssue,
+    User,
+)
+from .pagination import CursorError, PageRequest
+from .response_cache import cached_response, stats as cache_stats
+from .rollups import (
+    DEFAULT_LEADERS,
+    MAX_LEADERS,
+    RollupFilter,
+    daily_series,
+    leaderboard,
+)
+from .scoring import Thresholds, alert_message, score_process
+from .signals import table_name, worker_table
+from .streaming import (
+    EmployeeScan,
+    columnar_process_rows,
+    stream_employee_rows,
+    stream_process_rows,
+)
+from .wire import FLOAT64, FORMATS, INT64, TEXT, ColumnarTable, columnar_chunks, negotiated
+from .write_behind import WriteBehindTimeout
 
 
 class CustomLoginView(LoginView):
@@ -35,8 +103,14 @@ def dashboard(request: HttpRequest) -> HttpResponse:
     if user.is_manager():
         return render(request, "monitoring/manager_dashboard.html")
 
-    entry_form = ProductionEntryForm()
-    issue_form = ToolIssueForm()
+    # Один запрос версий: по ним берутся кешированные списки станков и инструментов
+    # и фрагменты панелей; наборы ниже ленивые и выполняются только при промахе кеша.
+    machines, tools, writes = (
+        table_name(Machine),
+        table_name(Tool),
+        worker_table(user.pk),
+    )
+    versions = TableVersion.snapshot((machines, tools, writes))
     recent_entries = (
         ProductionEntry.objects.filter(worker=user)
         .select_related("machine")
@@ -45,10 +119,15 @@ def dashboard(request: HttpRequest) -> HttpResponse:
     recent_issues = ToolIssue.objects.filter(reported_by=user).select_related("tool")[:20]
 
     context = {
-        "entry_form": entry_form,
-        "issue_form": issue_form,
+        "entry_form": ProductionEntryForm(machine_version=versions[machines]),
+        "issue_form": ToolIssueForm(tool_version=versions[tools]),
         "recent_entries": recent_entries,
         "recent_issues": recent_issues,
+        "versions": {
+            "machines": versions[machines],
+            "tools": versions[tools],
+            "writes": versions[writes],
+        },
     }
     return render(request, "monitoring/worker_dashboard.html", context)
 
@@ -64,8 +143,12 @@ def create_production_entry(request: HttpRequest) -> HttpResponse:
         if form.is_valid():
             entry = form.save(commit=False)
             entry.worker = user
-            entry.save()
-            messages.success(request, "Запись о выпуске деталей добавлена.")
+            try:
+                write_behind.save_entry(entry)
+            except WriteBehindTimeout:
+                messages.error(request, "Сервер перегружен, запись не сохранена. Повторите.")
+            else:
+                messages.success(request, "Запись о выпуске деталей добавлена.")
         else:
             messages.error(request, "Не удалось сохранить данные, проверьте форму.")
     return redirect("dashboard")
@@ -80,121 +163,193 @@ def report_tool_issue(request: HttpRequest) -> HttpResponse:
     form = ToolIssueForm(request.POST or None)
     if request.method == "POST":
         if form.is_valid():
-            issue = form.save(commit=False)
-            issue.reported_by = user
-            issue.save()
-
-            tool = issue.tool
-            tool.defective_stock += issue.defective_count
-            tool.save(update_fields=["defective_stock", "last_updated_at"])
-
-            messages.success(request, "Сообщение об инструменте передано руководителю.")
+            try:
+                write_behind.report_defects(
+                    tool_id=form.cleaned_data["tool"].pk,
+                    reported_by=user,
+                    defective_count=form.cleaned_data["defective_count"],
+                    description=form.cleaned_data["description"],
+                )
+            except WriteBehindTimeout:
+                messages.error(request, "Сервер перегружен, сообщение не сохранено. Повторите.")
+            else:
+                messages.success(request, "Сообщение об инструменте передано руководителю.")
         else:
             messages.error(request, "Не удалось передать сообщение, проверьте форму.")
     return redirect("dashboard")
 
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def api_gateway_ingest(request: HttpRequest) -> HttpResponse:
+    gateway = authenticate(request.headers.get("Authorization", ""))
+    if gateway is None:
+        return JsonResponse({"error": "Неверный или отключённый токен шлюза."}, status=401)
+
+    try:
+        rows, lines = parse_payload(request.body, request.content_type or "")
+    except PayloadError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    idempotency_key = request.headers.get("Idempotency-Key", "").strip()[:120]
+    result, replayed = ingest(rows, gateway, idempotency_key, lines)
+    response = JsonResponse(result)
+    if replayed:
+        response["Idempotent-Replayed"] = "true"
+    return response
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def api_gateway_telemetry(request: HttpRequest) -> HttpResponse:
+    gateway = authenticate(request.headers.get("Authorization", ""))
+    if gateway is None:
+        return JsonResponse({"error": "Неверный или отключённый токен шлюза."}, status=401)
+
+    try:
+        machine, ts_ms, (t, v, w) = telemetry.parse_samples(request.body)
+    except PayloadError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    except RequestDataTooBig:
+        return JsonResponse(
+            {"error": f"Пакет слишком большой: не больше {telemetry.MAX_APPEND_SAMPLES} замеров."},
+            status=413,
+        )
+    machine_id = telemetry.machine_id_by_name(machine)
+    if machine_id is None:
+        return JsonResponse({"error": f"Станок «{machine}» не найден."}, status=400)
+
+    appended = telemetry.append(machine_id, ts_ms, t, v, w)
+    return JsonResponse({"machine": machine, "appended": appended})
+
+
 @login_required
 def export_excel(request: HttpRequest) -> HttpResponse:
     user: User = request.user  # type: ignore[assignment]
     if not user.is_manager():
         return HttpResponseForbidden("Доступ только для руководителя.")
 
-    workbook = Workbook()
-    production_sheet = workbook.active
-    production_sheet.title = "Производство"
-    production_sheet.append(
-        [
-            "Дата и время",
-            "Сотрудник",
-            "Смена",
-            "Станок",
-            "Подразделение",
-            "Деталь",
-            "Выпуск, шт.",
-            "Брак, шт.",
-            "Температура, °C",
-            "Вибрация, мм/с",
-            "Износ, %",
-            "Комментарий",
-        ]
+    try:
+        export_filter = ExportFilter.from_params(request.GET)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return FileResponse(
+        spool_workbook(export_filter),
+        as_attachment=True,
+        filename=EXPORT_FILENAME,
+        content_type=XLSX_CONTENT_TYPE,
     )
 
-    entries: Iterable[ProductionEntry] = ProductionEntry.objects.select_related(
-        "worker", "machine"
-    ).order_by("-recorded_at")
-
-    for entry in entries:
-        production_sheet.append(
-            [
-                entry.recorded_at.strftime("%Y-%m-%d %H:%M"),
-                entry.worker.get_full_name() or entry.worker.username,
-                entry.shift,
-                entry.machine.name,
-                entry.machine.subdivision,
-                entry.detail_name,
-                entry.parts_made,
-                entry.defective_parts,
-                entry.temperature_c,
-                entry.vibration_mm,
-                entry.tool_wear_percent,
-                entry.note,
-            ]
-        )
 
-    tool_sheet = workbook.create_sheet("Инструменты")
-    tool_sheet.append(
-        [
-            "Инструмент",
-            "Общий остаток",
-            "Брак",
-            "Мин. порог",
-            "Местоположение",
-            "Средний расход/день",
-            "Обновлено",
-        ]
-    )
+@login_required
+def export_csv(request: HttpRequest) -> HttpResponse:
+    user: User = request.user  # type: ignore[assignment]
+    if not user.is_manager():
+        return HttpResponseForbidden("Доступ только для руководителя.")
 
-    for tool in Tool.objects.all():
-        tool_sheet.append(
-            [
-                tool.name,
-                tool.stock,
-                tool.defective_stock,
-                tool.min_threshold,
-                tool.location,
-                tool.avg_daily_outflow,
-                tool.last_updated_at.strftime("%Y-%m-%d %H:%M"),
-            ]
-        )
+    try:
+        export_filter = ExportFilter.from_params(request.GET)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    response = StreamingHttpResponse(stream_csv(export_filter), content_type=CSV_CONTENT_TYPE)
+    response["Content-Disposition"] = f'attachment; filename="{CSV_FILENAME}"'
+    return response
 
-    issues_sheet = workbook.create_sheet("Сообщения")
-    issues_sheet.append(
-        [
-            "Дата",
-            "Сотрудник",
-            "Инструмент",
-            "Кол-во с браком",
-            "Комментарий",
-        ]
-    )
-    for issue in ToolIssue.objects.select_related("tool", "reported_by").all():
-        issues_sheet.append(
-            [
-                issue.recorded_at.strftime("%Y-%m-%d %H:%M"),
-                issue.reported_by.get_full_name() or issue.reported_by.username,
-                issue.tool.name,
-                issue.defective_count,
-                issue.description,
-            ]
-        )
 
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+@login_required
+@require_http_methods(["POST"])
+def api_export_start(request: HttpRequest) -> HttpResponse:
+    user: User = request.user  # type: ignore[assignment]
+    if not user.is_manager():
+        return HttpResponseForbidden("Доступ только для руководителя.")
+
+    try:
+        payload = json.loads(request.body or "{}")
+        if not isinstance(payload, dict):
+            raise ValueError("Payload must be a JSON object.")
+    except (json.JSONDecodeError, ValueError):
+        return JsonResponse({"error": "Некорректный JSON"}, status=400)
+
+    export_format = str(payload.get("format") or ExportJob.Format.XLSX)
+    if export_format not in ExportJob.Format.values:
+        return JsonResponse({"error": "Неизвестный формат выгрузки."}, status=400)
+
+    try:
+        export_filter = ExportFilter.from_params(payload)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    job, created = request_export(user, export_format, export_filter.to_params())
+    return JsonResponse({"job": job_to_dict(job)}, status=202 if created else 200)
+
+
+@login_required
+def api_export_status(request: HttpRequest, pk: int) -> HttpResponse:
+    user: User = request.user  # type: ignore[assignment]
+    if not user.is_manager():
+        return HttpResponseForbidden("Доступ только для руководителя.")
+
+    job = get_object_or_404(ExportJob, pk=pk)
+    return JsonResponse({"job": job_to_dict(job)})
+
+
+@login_required
+def api_export_download(request: HttpRequest, pk: int) -> HttpResponse:
+    user: User = request.user  # type: ignore[assignment]
+    if not user.is_manager():
+        return HttpResponseForbidden("Доступ только для руководителя.")
+
+    job = get_object_or_404(ExportJob, pk=pk)
+    if job.status != ExportJob.Status.DONE or not job.file_name:
+        return JsonResponse(
+            {"error": "Выгрузка ещё не готова.", "job": job_to_dict(job)}, status=409
+        )
+    try:
+        handle = artifact_path(job).open("rb")
+    except FileNotFoundError:
+        return JsonResponse({"error": "Файл выгрузки удалён, запустите её заново."}, status=410)
+    return FileResponse(
+        handle,
+        as_attachment=True,
+        filename=download_name(job),
+        content_type=CONTENT_TYPES[ExportJob.Format(job.export_format)],
     )
-    response["Content-Disposition"] = 'attachment; filename="quality_monitor.xlsx"'
-    workbook.save(response)
-    return response
+
+
+@login_required
+@require_http_methods(["POST"])
+def api_import_start(request: HttpRequest) -> HttpResponse:
+    user: User = request.user  # type: ignore[assignment]
+    if not user.is_manager():
+        return HttpResponseForbidden("Доступ только для руководителя.")
+
+    upload = request.FILES.get("file")
+    if upload is None:
+        return JsonResponse({"error": "Приложите CSV-файл в поле «file»."}, status=400)
+    kind = request.POST.get("kind", "")
+    if kind not in ImportJob.Kind.values:
+        return JsonResponse({"error": "Неизвестный вид загрузки."}, status=400)
+    params = {
+        name: request.POST[name].strip()
+        for name in ("worker", "machine", "detail")
+        if request.POST.get(name, "").strip()
+    }
+    if "worker" in params:
+        params["worker"] = params["worker"].lower()
+    try:
+        job = create_import(user, kind, upload, params)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse({"job": import_to_dict(job)}, status=202)
+
+
+@login_required
+def api_import_status(request: HttpRequest, pk: int) -> HttpResponse:
+    user: User = request.user  # type: ignore[assignment]
+    if not user.is_manager():
+        return HttpResponseForbidden("Доступ только для руководителя.")
+
+    job = get_object_or_404(ImportJob, pk=pk)
+    return JsonResponse({"job": import_to_dict(job)})
 
 
 def _decimal_to_float(value: Any) -> float | None:
@@ -218,96 +373,415 @@ def _tool_to_dict(tool: Tool) -> dict[str, Any]:
         "updated_at": timezone.localtime(tool.last_updated_at).isoformat()
         if tool.last_updated_at
         else None,
+        "forecast": _forecast_to_dict(getattr(tool, "forecast", None)),
     }
 
 
+def _forecast_to_dict(forecast: ToolForecast | None) -> dict[str, Any] | None:
+    # Прогноз читается готовым: его пересчитывает команда refresh_forecasts.
+    if forecast is None:
+        return None
+    return {
+        "basis": forecast.basis,
+        "daily_outflow": forecast.daily_outflow,
+        "weekday_factors": forecast.weekday_factors,
+        "available": forecast.available,
+        "days_to_zero": forecast.days_to_zero,
+        "stockout_on": forecast.stockout_on.isoformat() if forecast.stockout_on else None,
+        "reorder_on": forecast.reorder_on.isoformat() if forecast.reorder_on else None,
+        "history_days": forecast.history_days,
+        "computed_at": timezone.localtime(forecast.computed_at).isoformat(),
+    }
+
+
+def _parse_moment(value: str | None, field: str) -> datetime | None:
+    if not value:
+        return None
+    try:
+        moment = parse_datetime(value)
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValueError(f"Параметр «{field}» должен быть в формате ISO 8601.")
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def _page_response(chunks: Iterator[bytes], content_type: str, page: PageRequest) -> HttpResponse:
+    # Вся история уходит потоком и в кеш ответов не попадает; страница ограниченного размера
+    # собирается целиком, чтобы её мог сохранить cached_response.
+    if page.limit is None:
+        return StreamingHttpResponse(chunks, content_type=content_type)
+    return HttpResponse(b"".join(chunks), content_type=content_type)
+
+
 @login_required
+@gzip_page
+@negotiated
+@versioned(ProductionEntry, Machine)
+@cached_response(ProductionEntry, Machine)
 def api_process_rows(request: HttpRequest) -> HttpResponse:
     user: User = request.user  # type: ignore[assignment]
     if not user.is_manager():
         return HttpResponseForbidden("Доступ только для руководителя.")
 
-    rows: list[dict[str, Any]] = []
-    warnings: list[str] = []
+    try:
+        page = PageRequest.from_params(request.GET, allow_unbounded=True)
+    except CursorError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    if request.wire_format != "json":
+        return _page_response(
+            columnar_process_rows(page, request.wire_format), FORMATS[request.wire_format], page
+        )
+    return _page_response(stream_process_rows(page), "application/json", page)
 
+
+@login_required
+@versioned(ProductionEntry, Machine)
+@cached_response(ProductionEntry, Machine)
+def api_process_scored(request: HttpRequest) -> HttpResponse:
+    user: User = request.user  # type: ignore[assignment]
+    if not user.is_manager():
+        return HttpResponseForbidden("Доступ только для руководителя.")
+
+    try:
+        thresholds = Thresholds.from_params(request.GET)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    tail: int | None = None
+    if request.GET.get("tail"):
+        try:
+            tail = int(request.GET["tail"])
+        except ValueError:
+            tail = -1
+        if tail < 0:
+            return JsonResponse(
+                {"error": "Параметр «tail» должен быть неотрицательным числом."}, status=400
+            )
+
+    warnings: list[str] = []
+    meta: list[tuple[Any, ...]] = []
+    readings: list[tuple[float, float, float]] = []
     entries = (
-        ProductionEntry.objects.select_related("machine")
-        .order_by("recorded_at")
-        .all()
+        ProductionEntry.objects.order_by("recorded_at", "id")
+        .values_list(
+            "id",
+            "temperature_c",
+            "vibration_mm",
+            "tool_wear_percent",
+            "defective_parts",
+            "machine__name",
+            "machine__subdivision",
+            "recorded_at",
+            "detail_name",
+            "shift",
+        )
+        .iterator(chunk_size=2000)
     )
-    for entry in entries:
-        if (
-            entry.temperature_c is None
-            or entry.vibration_mm is None
-            or entry.tool_wear_percent is None
-        ):
+    for pk, t, v, w, defective, machine, subdivision, recorded_at, detail, shift in entries:
+        if t is None or v is None or w is None:
             warnings.append(
-                f"Запись {entry.pk} от {entry.recorded_at:%Y-%m-%d %H:%M} пропущена: нет замеров."
+                f"Запись {pk} от {recorded_at:%Y-%m-%d %H:%M} пропущена: нет замеров."
             )
             continue
-        rows.append(
+        readings.append((float(t), float(v), float(w)))
+        meta.append((pk, defective, machine, subdivision, recorded_at, detail, shift))
+
+    matrix = np.array(readings, dtype=np.float64).reshape(-1, 3)
+    scores = score_process(matrix[:, 0], matrix[:, 1], matrix[:, 2], thresholds)
+
+    t_values = scores.t.tolist()
+    v_values = scores.v.tolist()
+    w_values = scores.w.tolist()
+    t_scaled = scores.t_scaled.tolist()
+    v_scaled = scores.v_scaled.tolist()
+    w_scaled = scores.w_scaled.tolist()
+    p_values = scores.p.tolist()
+
+    timestamps: dict[int, str] = {}
+
+    def row_ts(index: int) -> str:
+        if index not in timestamps:
+            timestamps[index] = timezone.localtime(meta[index][4]).isoformat()
+        return timestamps[index]
+
+    def scored_row(index: int) -> dict[str, Any]:
+        pk, defective, machine, subdivision, _, detail, shift = meta[index]
+        return {
+            "id": pk,
+            "index": index,
+            "t": t_values[index],
+            "v": v_values[index],
+            "w": w_values[index],
+            "t_scaled": t_scaled[index],
+            "v_scaled": v_scaled[index],
+            "w_scaled": w_scaled[index],
+            "p": p_values[index],
+            "defect": 1 if defective > 0 else 0,
+            "machine": machine,
+            "machine_subdivision": subdivision,
+            "ts": row_ts(index),
+            "detail": detail,
+            "shift": shift,
+        }
+
+    alerts: list[dict[str, Any]] = []
+    for index, reasons in scores.alert_reasons(thresholds):
+        alerts.append(
             {
-                "id": entry.pk,
-                "t": float(entry.temperature_c),
-                "v": float(entry.vibration_mm),
-                "w": float(entry.tool_wear_percent),
-                "defect": 1 if entry.defective_parts > 0 else 0,
-                "machine": entry.machine.name,
-                "machine_subdivision": entry.machine.subdivision,
-                "ts": timezone.localtime(entry.recorded_at).isoformat(),
-                "detail": entry.detail_name,
-                "shift": entry.shift,
+                "type": "process",
+                "index": index,
+                "id": meta[index][0],
+                "reasons": reasons,
+                "message": alert_message(index, reasons, row_ts(index)),
             }
         )
 
-    return JsonResponse({"rows": rows, "warnings": warnings})
+    total = len(scores)
+    start = 0 if tail is None else max(total - tail, 0)
+    rows = [scored_row(index) for index in range(start, total)]
+
+    return JsonResponse(
+        {
+            "rows": rows,
+            "total": total,
+            "avgP": scores.avg_p,
+            "latest": scored_row(total - 1) if total else None,
+            "alerts": alerts,
+            "warnings": warnings,
+        }
+    )
+
+
+DEFAULT_SERIES_POINTS = 1000
+MAX_SERIES_POINTS = 10_000
 
 
 @login_required
+@versioned(ProductionEntry, Machine)
+@cached_response(ProductionEntry, Machine)
+def api_process_series(request: HttpRequest) -> HttpResponse:
+    user: User = request.user  # type: ignore[assignment]
+    if not user.is_manager():
+        return HttpResponseForbidden("Доступ только для руководителя.")
+
+    try:
+        thresholds = Thresholds.from_params(request.GET)
+        start = _parse_moment(request.GET.get("from"), "from")
+        end = _parse_moment(request.GET.get("to"), "to")
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    try:
+        points = int(request.GET.get("points") or DEFAULT_SERIES_POINTS)
+    except ValueError:
+        points = 0
+    if not 3 <= points <= MAX_SERIES_POINTS:
+        return JsonResponse(
+            {"error": f"Параметр «points» — целое от 3 до {MAX_SERIES_POINTS}."}, status=400
+        )
+    method = request.GET.get("method") or METHODS[0]
+    if method not in METHODS:
+        return JsonResponse({"error": f"Параметр «method»: {', '.join(METHODS)}."}, status=400)
+
+    queryset = ProductionEntry.objects.filter(
+        temperature_c__isnull=False, vibration_mm__isnull=False, tool_wear_percent__isnull=False
+    )
+    if start:
+        queryset = queryset.filter(recorded_at__gte=start)
+    if end:
+        queryset = queryset.filter(recorded_at__lt=end)
+    if request.GET.get("machine"):
+        queryset = queryset.filter(machine__name=request.GET["machine"])
+    rows = list(
+        queryset.order_by("recorded_at", "id")
+        .values_list("id", "recorded_at", "temperature_c", "vibration_mm", "tool_wear_percent")
+        .iterator(chunk_size=2000)
+    )
+
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    x = np.fromiter((row[1].timestamp() for row in rows), dtype=np.float64, count=len(rows))
+    matrix = np.array([row[2:] for row in rows], dtype=np.float64).reshape(-1, 3)
+    scores = score_process(matrix[:, 0], matrix[:, 1], matrix[:, 2], thresholds)
+
+    limits = {
+        "t": thresholds.T_crit,
+        "v": thresholds.V_crit,
+        "w": thresholds.W_crit,
+        "p": thresholds.p_crit,
+    }
+    series: dict[str, dict[str, list[Any]]] = {}
+    for name, limit in limits.items():
+        values = getattr(scores, name)
+        picked = downsample_indices(x, values, points, method, limit)
+        series[name] = {
+            "id": ids[picked].tolist(),
+            "ts": [timezone.localtime(rows[index][1]).isoformat() for index in picked.tolist()],
+            "values": values[picked].tolist(),
+        }
+    return JsonResponse(
+        {
+            "total": len(rows),
+            "points": points,
+            "method": method,
+            "thresholds": limits,
+            "series": series,
+        }
+    )
+
+
+# Столбцы /api/manager/employees/ в столбцовом формате, в порядке полей строки.
+EMPLOYEE_COLUMNS = {
+    "id": TEXT,
+    "name": TEXT,
+    "shift": TEXT,
+    "parts_made": INT64,
+    "defects": INT64,
+    "avg_temp": FLOAT64,
+    "avg_vib": FLOAT64,
+    "avg_wear": FLOAT64,
+    "date": TEXT,
+    "machine": TEXT,
+    "detail": TEXT,
+}
+
+
+@login_required
+@gzip_page
+@negotiated
+@versioned(ProductionEntry, User, Machine)
+@cached_response(ProductionEntry, User, Machine)
 def api_employee_rows(request: HttpRequest) -> HttpResponse:
     user: User = request.user  # type: ignore[assignment]
     if not user.is_manager():
         return HttpResponseForbidden("Доступ только для руководителя.")
 
-    rows: list[dict[str, Any]] = []
-    entries = (
-        ProductionEntry.objects.select_related("worker", "machine")
-        .order_by("recorded_at")
-        .all()
+    try:
+        page = PageRequest.from_params(request.GET, allow_unbounded=True)
+    except CursorError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    if request.wire_format != "json":
+        scan = EmployeeScan(page)
+        table = ColumnarTable(EMPLOYEE_COLUMNS)
+        table.extend(row.values() for row in scan.rows())
+        chunks = columnar_chunks(request.wire_format, table, scan.meta())
+        return _page_response(chunks, FORMATS[request.wire_format], page)
+    # Запрос без параметров страницы (так опрашивает дашборд) получает всю историю потоком.
+    return _page_response(stream_employee_rows(page), "application/json", page)
+
+
+def _average(total: float, count: int) -> float:
+    return round(total / count, 3) if count else 0.0
+
+
+@login_required
+def api_employee_daily(request: HttpRequest) -> HttpResponse:
+    user: User = request.user  # type: ignore[assignment]
+    if not user.is_manager():
+        return HttpResponseForbidden("Доступ только для руководителя.")
+
+    try:
+        rollup_filter = RollupFilter.from_params(request.GET)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    queryset = rollup_filter.apply(
+        DailyRollup.objects.order_by("day", "worker_id", "machine_id", "shift")
     )
-    for entry in entries:
-        worker = entry.worker
+
+    rows: list[dict[str, Any]] = []
+    for rollup in queryset.values(
+        "day",
+        "shift",
+        "entries",
+        "parts_made",
+        "defective_parts",
+        "temperature_sum",
+        "temperature_count",
+        "vibration_sum",
+        "vibration_count",
+        "wear_sum",
+        "wear_count",
+        "worker__username",
+        "worker__first_name",
+        "worker__last_name",
+        "machine__name",
+    ):
+        full_name = f"{rollup['worker__first_name']} {rollup['worker__last_name']}".strip()
         rows.append(
             {
-                "id": worker.username.upper(),
-                "name": worker.get_full_name() or worker.username,
-                "shift": entry.shift or "",
-                "parts_made": entry.parts_made,
-                "defects": entry.defective_parts,
-                "avg_temp": float(entry.temperature_c)
-                if entry.temperature_c is not None
-                else 0.0,
-                "avg_vib": float(entry.vibration_mm)
-                if entry.vibration_mm is not None
-                else 0.0,
-                "avg_wear": float(entry.tool_wear_percent)
-                if entry.tool_wear_percent is not None
-                else 0.0,
-                "date": timezone.localtime(entry.recorded_at).date().isoformat(),
-                "machine": entry.machine.name,
-                "detail": entry.detail_name,
+                "id": rollup["worker__username"].upper(),
+                "name": full_name or rollup["worker__username"],
+                "shift": rollup["shift"],
+                "entries": rollup["entries"],
+                "parts_made": rollup["parts_made"],
+                "defects": rollup["defective_parts"],
+                "avg_temp": _average(rollup["temperature_sum"], rollup["temperature_count"]),
+                "avg_vib": _average(rollup["vibration_sum"], rollup["vibration_count"]),
+                "avg_wear": _average(rollup["wear_sum"], rollup["wear_count"]),
+                "date": rollup["day"].isoformat(),
+                "machine": rollup["machine__name"],
             }
         )
     return JsonResponse({"rows": rows})
 
 
+def _leader_limit(value: str | None) -> int:
+    if not value:
+        return DEFAULT_LEADERS
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("Параметр «limit» должен быть целым числом.") from None
+    if not 1 <= limit <= MAX_LEADERS:
+        raise ValueError(f"Параметр «limit» должен быть от 1 до {MAX_LEADERS}.")
+    return limit
+
+
+@login_required
+@versioned(ProductionEntry, DailyRollup, User)
+@cached_response(ProductionEntry, DailyRollup, User)
+def api_employee_leaders(request: HttpRequest) -> HttpResponse:
+    user: User = request.user  # type: ignore[assignment]
+    if not user.is_manager():
+        return HttpResponseForbidden("Доступ только для руководителя.")
+
+    by = request.GET.get("by") or "parts"
+    try:
+        rollup_filter = RollupFilter.from_params(request.GET)
+        limit = _leader_limit(request.GET.get("limit"))
+        rows = leaderboard(rollup_filter, by, limit)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse({"by": by, "limit": limit, "rows": rows})
+
+
+@login_required
+@versioned(ProductionEntry, DailyRollup, User)
+@cached_response(ProductionEntry, DailyRollup, User)
+def api_employee_series(request: HttpRequest) -> HttpResponse:
+    user: User = request.user  # type: ignore[assignment]
+    if not user.is_manager():
+        return HttpResponseForbidden("Доступ только для руководителя.")
+
+    try:
+        rollup_filter = RollupFilter.from_params(request.GET)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse({"rows": daily_series(rollup_filter)})
+
+
 @login_required
+@versioned(Tool, ToolForecast)
+@cached_response(Tool, ToolForecast)
 def api_inventory_rows(request: HttpRequest) -> HttpResponse:
     user: User = request.user  # type: ignore[assignment]
     if not user.is_manager():
         return HttpResponseForbidden("Доступ только для руководителя.")
 
-    rows = [_tool_to_dict(tool) for tool in Tool.objects.all().order_by("name")]
+    tools = Tool.objects.select_related("forecast").order_by("name")
+    rows = [_tool_to_dict(tool) for tool in tools]
     return JsonResponse({"rows": rows})
 
 
@@ -318,7 +792,7 @@ def api_inventory_update(request: HttpRequest, pk: int) -> HttpResponse:
     if not user.is_manager():
         return HttpResponseForbidden("Доступ только для руководителя.")
 
-    tool = get_object_or_404(Tool, pk=pk)
+    tool = get_object_or_404(Tool.objects.select_related("forecast"), pk=pk)
 
     try:
         payload = json.loads(request.body or "{}")
@@ -327,60 +801,195 @@ def api_inventory_update(request: HttpRequest, pk: int) -> HttpResponse:
     except (json.JSONDecodeError, ValueError):
         return JsonResponse({"error": "Некорректный JSON"}, status=400)
 
-    errors: list[str] = []
-
-    def parse_int(field: str, allow_none: bool = False) -> int | None:
-        if field not in payload:
-            return getattr(tool, field)
-        value = payload.get(field)
-        if value in ("", None):
-            if allow_none:
-                return None
-            errors.append(f"Поле «{field}» не может быть пустым.")
-            return getattr(tool, field)
-        try:
-            candidate = int(value)
-            if candidate < 0:
-                errors.append(f"Поле «{field}» должно быть неотрицательным.")
-                return getattr(tool, field)
-            return candidate
-        except (TypeError, ValueError):
-            errors.append(f"Поле «{field}» должно быть числом.")
-            return getattr(tool, field)
-
-    stock = parse_int("stock")
-    defective_stock = parse_int("defective_stock")
-    min_threshold = parse_int("min_threshold")
-
-    avg_daily_outflow = tool.avg_daily_outflow
-    if "avg_daily_outflow" in payload:
-        avg_value = payload.get("avg_daily_outflow")
-        if avg_value in (None, ""):
-            avg_daily_outflow = None
-        else:
-            try:
-                candidate = Decimal(str(avg_value))
-                if candidate < 0:
-                    errors.append("Поле «avg_daily_outflow» должно быть неотрицательным.")
-                else:
-                    avg_daily_outflow = candidate
-            except (InvalidOperation, TypeError, ValueError):
-                errors.append("Поле «avg_daily_outflow» должно быть числом.")
-
-    location = tool.location
-    if "location" in payload:
-        location = str(payload.get("location") or "")
-
+    changes, errors = parse_patch(tool, payload)
     if errors:
         return JsonResponse({"error": " ".join(errors)}, status=400)
 
-    tool.stock = stock if stock is not None else tool.stock
-    tool.defective_stock = (
-        defective_stock if defective_stock is not None else tool.defective_stock
-    )
-    tool.min_threshold = min_threshold if min_threshold is not None else tool.min_threshold
-    tool.location = location
-    tool.avg_daily_outflow = avg_daily_outflow
-    tool.save()
+    for name, value in changes.items():
+        setattr(tool, name, value)
+    tool.save(update_fields=[*changes, "last_updated_at"])
 
     return JsonResponse({"row": _tool_to_dict(tool)})
+
+
+@login_required
+@require_http_methods(["PATCH", "POST"])
+def api_inventory_batch_update(request: HttpRequest) -> HttpResponse:
+    user: User = request.user  # type: ignore[assignment]
+    if not user.is_manager():
+        return HttpResponseForbidden("Доступ только для руководителя.")
+
+    try:
+        payload = json.loads(request.body or "[]")
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Некорректный JSON"}, status=400)
+    items = payload.get("items") if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        return JsonResponse(
+            {"error": "Ожидается список правок или объект с полем «items»."}, status=400
+        )
+    if len(items) > MAX_BATCH_ITEMS:
+        return JsonResponse(
+            {"error": f"В пакете не больше {MAX_BATCH_ITEMS} правок."}, status=400
+        )
+
+    batch = apply_patches(items)
+    for result in batch.results:
+        if "errors" not in result:
+            result["row"] = _tool_to_dict(batch.tools[result["id"]])
+    return JsonResponse(
+        {"updated": batch.updated, "rejected": batch.rejected, "results": batch.results}
+    )
+
+
+MAX_ANOMALIES = 2000
+
+
+@login_required
+def api_anomalies(request: HttpRequest) -> HttpResponse:
+    user: User = request.user  # type: ignore[assignment]
+    if not user.is_manager():
+        return HttpResponseForbidden("Доступ только для руководителя.")
+
+    queryset = MachineAnomaly.objects.select_related("machine").order_by("-recorded_at", "-id")
+    if request.GET.get("machine"):
+        queryset = queryset.filter(machine__name=request.GET["machine"])
+    if request.GET.get("kind"):
+        if request.GET["kind"] not in MachineAnomaly.Kind.values:
+            return JsonResponse({"error": "Параметр «kind»: outlier или drift."}, status=400)
+        queryset = queryset.filter(kind=request.GET["kind"])
+    if request.GET.get("channel"):
+        if request.GET["channel"] not in CHANNELS:
+            return JsonResponse(
+                {"error": f"Параметр «channel»: {', '.join(CHANNELS)}."}, status=400
+            )
+        queryset = queryset.filter(channel=request.GET["channel"])
+    if request.GET.get("since"):
+        try:
+            since = parse_datetime(request.GET["since"])
+        except ValueError:
+            since = None
+        if since is None:
+            return JsonResponse(
+                {"error": "Параметр «since» должен быть в формате ISO 8601."}, status=400
+            )
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        queryset = queryset.filter(recorded_at__gte=since)
+    try:
+        limit = min(max(int(request.GET.get("limit") or 200), 1), MAX_ANOMALIES)
+    except ValueError:
+        return JsonResponse({"error": "Параметр «limit» должен быть числом."}, status=400)
+
+    rows = [anomaly_to_dict(anomaly, anomaly.machine.name) for anomaly in queryset[:limit]]
+    return JsonResponse({"rows": rows})
+
+
+@login_required
+def api_detectors(request: HttpRequest) -> HttpResponse:
+    user: User = request.user  # type: ignore[assignment]
+    if not user.is_manager():
+        return HttpResponseForbidden("Доступ только для руководителя.")
+
+    rows = [
+        {
+            "machine": state.machine.name,
+            "window": state.window,
+            "observations": state.observations,
+            "updated_at": timezone.localtime(state.updated_at).isoformat(),
+            "channels": RollingDetector(state.window, state.state).summary(),
+        }
+        for state in MachineDetectorState.objects.select_related("machine").order_by(
+            "machine__name"
+        )
+    ]
+    return JsonResponse({"rows": rows})
+
+
+@login_required
+async def api_events(request: HttpRequest) -> HttpResponse:
+    user: User = await request.auser()  # type: ignore[assignment]
+    if not user.is_manager():
+        return HttpResponseForbidden("Доступ только для руководителя.")
+
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id", "")
+    response = StreamingHttpResponse(
+        event_stream(last_event_id.strip()), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@login_required
+def api_cache_stats(request: HttpRequest) -> HttpResponse:
+    user: User = request.user  # type: ignore[assignment]
+    if not user.is_manager():
+        return HttpResponseForbidden("Доступ только для руководителя.")
+
+    return JsonResponse({"views": cache_stats()})
+
+
+MAX_TELEMETRY_POINTS = 5000
+DEFAULT_TELEMETRY_SPAN = timedelta(hours=1)
+
+
+def _telemetry_response(
+    request: HttpRequest, machine: Machine, start: datetime, end: datetime, **extra: Any
+) -> HttpResponse:
+    try:
+        resolution = float(request.GET.get("resolution") or 0)
+    except ValueError:
+        resolution = -1.0
+    if not math.isfinite(resolution) or resolution < 0:
+        return JsonResponse(
+            {"error": "Параметр «resolution» должен быть числом секунд."}, status=400
+        )
+
+    series = telemetry.read(machine.pk, start, end)
+    if not resolution and len(series) > MAX_TELEMETRY_POINTS:
+        # Без явного шага длинный интервал ужимается до MAX_TELEMETRY_POINTS корзин.
+        resolution = math.ceil((end - start).total_seconds() / MAX_TELEMETRY_POINTS)
+    return JsonResponse(
+        {
+            **extra,
+            "machine": machine.name,
+            "from": timezone.localtime(start).isoformat(),
+            "to": timezone.localtime(end).isoformat(),
+            "samples": len(series),
+            "resolution": resolution or None,
+            "series": telemetry.downsample(series, resolution) if resolution else series.to_dict(),
+        }
+    )
+
+
+@login_required
+def api_telemetry(request: HttpRequest) -> HttpResponse:
+    user: User = request.user  # type: ignore[assignment]
+    if not user.is_manager():
+        return HttpResponseForbidden("Доступ только для руководителя.")
+
+    machine = Machine.objects.filter(name=request.GET.get("machine", "")).first()
+    if machine is None:
+        return JsonResponse(
+            {"error": "Параметр «machine»: имя существующего станка."}, status=400
+        )
+    try:
+        end = _parse_moment(request.GET.get("to"), "to") or timezone.now()
+        start = _parse_moment(request.GET.get("from"), "from") or end - DEFAULT_TELEMETRY_SPAN
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    if start >= end:
+        return JsonResponse({"error": "Параметр «from» должен быть раньше «to»."}, status=400)
+    return _telemetry_response(request, machine, start, end)
+
+
+@login_required
+def api_entry_telemetry(request: HttpRequest, pk: int) -> HttpResponse:
+    user: User = request.user  # type: ignore[assignment]
+    if not user.is_manager():
+        return HttpResponseForbidden("Доступ только для руководителя.")
+
+    entry = get_object_or_404(ProductionEntry.objects.select_related("machine"), pk=pk)
+    start, end = telemetry.entry_window(entry)
+    return _telemetry_response(request, entry.machine, start, end, entry_id=entry.pk)
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import json
+from array import array
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from functools import wraps
+from typing import Any
+
+import numpy as np
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import msgpack
+except ImportError:  # необязательная зависимость: без неё доступен только JSON
+    msgpack = None
+
+JSON = "application/json"
+COLUMNS = "application/vnd.monitoring.columns+json"
+MSGPACK = "application/msgpack"
+FORMATS = {"json": JSON, "columns": COLUMNS, "msgpack": MSGPACK}
+# Прежние названия MessagePack, которые ещё встречаются в заголовке Accept.
+MSGPACK_ALIASES = ("application/x-msgpack", "application/vnd.msgpack")
+
+# Типы столбцов: числа хранятся типизированными массивами, строки — кодами словаря.
+INT64 = "i8"
+FLOAT64 = "f8"
+UINT8 = "u1"
+TEXT = "text"
+TYPECODES = {INT64: "q", FLOAT64: "d", UINT8: "B", TEXT: "I"}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MILLISECOND = timedelta(milliseconds=1)
+
+_encode = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+
+def epoch_ms(moment: datetime) -> int:
+    return (moment - EPOCH) // MILLISECOND
+
+
+class FormatError(ValueError):
+    """Формат не выбран: status 400 — неверный ?format=, 406 — Accept без допустимых типов."""
+
+    def __init__(self, message: str, status: int) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def available_formats() -> tuple[str, ...]:
+    return tuple(name for name in FORMATS if name != "msgpack" or msgpack is not None)
+
+
+def negotiate(request: HttpRequest) -> str:
+    """Формат ответа: явный ?format= важнее заголовка Accept; без Accept — JSON."""
+    formats = available_formats()
+    requested = request.GET.get("format")
+    if requested:
+        if requested not in formats:
+            raise FormatError(
+                f"Формат «{requested}» недоступен; доступны: {', '.join(formats)}.", status=400
+            )
+        return requested
+    media_types = [FORMATS[name] for name in formats]
+    if msgpack is not None:
+        media_types.extend(MSGPACK_ALIASES)
+    if hasattr(request, "get_preferred_type"):
+        preferred = request.get_preferred_type(media_types)
+    else:
+        # Django до 5.2 не сравнивает веса q: берётся первый допустимый, JSON — первым.
+        preferred = next((media for media in media_types if request.accepts(media)), None)
+    if preferred is None:
+        raise FormatError(
+            f"Заголовок Accept не допускает ни одного формата: {', '.join(media_types)}.",
+            status=406,
+        )
+    if preferred in MSGPACK_ALIASES:
+        return "msgpack"
+    return next((name for name in formats if FORMATS[name] == preferred), "json")
+
+
+def negotiated(view: Callable[..., HttpResponse]) -> Callable[..., HttpResponse]:
+    """Выбирает формат до условного GET и кеша: их ключи учитывают request.wire_format."""
+
+    @wraps(view)
+    def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        try:
+            request.wire_format = negotiate(request)
+        except FormatError as exc:
+            return JsonResponse(
+                {"error": str(exc), "formats": list(available_formats())}, status=exc.status
+            )
+        response = view(request, *args, **kwargs)
+        patch_vary_headers(response, ("Accept",))
+        return response
+
+    return wrapper
+
+
+class ColumnarTable:
+    """Строки, разложенные по столбцам; строковые значения кодируются словарём."""
+
+    def __init__(self, schema: Mapping[str, str]) -> None:
+        self.schema = dict(schema)
+        self.length = 0
+        self._values = {name: array(TYPECODES[kind]) for name, kind in self.schema.items()}
+        self._dictionaries: dict[str, dict[Any, int]] = {
+            name: {} for name, kind in self.schema.items() if kind == TEXT
+        }
+        self._sinks = [
+            (self._values[name], self._dictionaries.get(name)) for name in self.schema
+        ]
+
+    def append(self, values: Iterable[Any]) -> None:
+        for (column, dictionary), value in zip(self._sinks, values):
+            if dictionary is not None:
+                value = dictionary.setdefault(value, len(dictionary))
+            column.append(value)
+        self.length += 1
+
+    def extend(self, rows: Iterable[Iterable[Any]]) -> None:
+        for row in rows:
+            self.append(row)
+
+    def columns(self) -> Iterator[tuple[str, np.ndarray, list[Any] | None]]:
+        for name, kind in self.schema.items():
+            values = np.frombuffer(self._values[name], dtype=TYPECODES[kind])
+            dictionary = self._dictionaries.get(name)
+            if dictionary is None:
+                yield name, values.astype(f"<{kind}", copy=False), None
+            else:
+                # Коды занимают наименьший подходящий тип: словари обычно короткие.
+                size = len(dictionary)
+                code_type = "<u1" if size <= 1 << 8 else "<u2" if size <= 1 << 16 else "<u4"
+                yield name, values.astype(code_type), list(dictionary)
+
+
+def _encode_json(table: ColumnarTable, meta: dict[str, Any]) -> Iterator[bytes]:
+    head = _encode({"format": "columns", "length": table.length})
+    yield (head[:-1] + ',"columns":{').encode()
+    separator = ""
+    for name, values, dictionary in table.columns():
+        column: Any = values.tolist()
+        if dictionary is not None:
+            column = {"dictionary": dictionary, "codes": column}
+        yield f"{separator}{_encode(name)}:{_encode(column)}".encode()
+        separator = ","
+    tail = _encode(meta)
+    yield ("}" + ("," + tail[1:] if meta else "}")).encode()
+
+
+def _typed(values: np.ndarray) -> dict[str, Any]:
+    return {"dtype": values.dtype.str, "data": values.tobytes()}
+
+
+def _encode_msgpack(table: ColumnarTable, meta: dict[str, Any]) -> Iterator[bytes]:
+    # Числа и коды уходят сырыми little-endian байтами: клиент читает их как TypedArray.
+    packer = msgpack.Packer()
+    yield packer.pack_map_header(3 + len(meta))
+    yield packer.pack("format") + packer.pack("columns")
+    yield packer.pack("length") + packer.pack(table.length)
+    schema = list(table.columns())
+    yield packer.pack("columns") + packer.pack_map_header(len(schema))
+    for name, values, dictionary in schema:
+        column: Any = _typed(values)
+        if dictionary is not None:
+            column = {"dictionary": dictionary, "codes": column}
+        yield packer.pack(name) + packer.pack(column)
+    for key, value in meta.items():
+        yield packer.pack(key) + packer.pack(value)
+
+
+def columnar_chunks(
+    wire_format: str, table: ColumnarTable, meta: dict[str, Any]
+) -> Iterator[bytes]:
+    if wire_format == "msgpack":
+        return _encode_msgpack(table, meta)
+    return _encode_json(table, meta)
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import queue
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from . import detector, events, inventory, rollups
+from .models import ProductionEntry, TableVersion, ToolIssue
+from .signals import bump_workers
+
+
+class WriteBehindTimeout(Exception):
+    """Запись не дождалась очереди и отменена; в базе её нет."""
+
+
+@dataclass(eq=False)
+class PendingWrite:
+    kind: str
+    payload: Any
+    done: threading.Event = field(default_factory=threading.Event)
+    state: str = "queued"
+    result: Any = None
+    error: BaseException | None = None
+
+
+def _write_entries(entries: list[ProductionEntry]) -> list[ProductionEntry]:
+    # Тот же путь, что у пакетной загрузки со шлюза: одна вставка на всю группу.
+    created = ProductionEntry.objects.bulk_create(entries)
+    rollups.add_entries(created)
+    TableVersion.bump(ProductionEntry._meta.label_lower)
+    bump_workers(entry.worker_id for entry in created)
+    anomalies = detector.observe_entries(created)
+    transaction.on_commit(lambda: events.publish_entries(created))
+    if anomalies:
+        transaction.on_commit(lambda: events.publish_anomalies(anomalies))
+    return created
+
+
+def _write_issues(reports: list[dict[str, Any]]) -> list[ToolIssue]:
+    # Событие tool_issue публикует сигнал post_save после COMMIT группы.
+    return [inventory.report_defects(**report) for report in reports]
+
+
+WRITERS: dict[str, Callable[[list[Any]], list[Any]]] = {
+    "entry": _write_entries,
+    "issue": _write_issues,
+}
+
+
+class WriteBehindQueue:
+    """Очередь записей с одним потоком-писателем и групповой фиксацией.
+
+    Пока писатель фиксирует одну группу, новые запросы копятся в очереди и уходят следующей
+    транзакцией. Запрос получает ответ только после COMMIT своей группы.
+    """
+
+    def __init__(self, max_batch: int = 200) -> None:
+        self.max_batch = max_batch
+        self._queue: queue.SimpleQueue[PendingWrite] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self.batches = 0
+        self.writes = 0
+
+    def submit(self, kind: str, payload: Any, timeout: float) -> Any:
+        write = PendingWrite(kind, payload)
+        self._ensure_writer()
+        self._queue.put(write)
+        if not write.done.wait(timeout):
+            with self._lock:
+                if write.state == "queued":
+                    write.state = "cancelled"
+                    raise WriteBehindTimeout
+            # Группа уже фиксируется — дожидаемся её, чтобы ответ совпал с базой.
+            write.done.wait()
+        if write.error is not None:
+            raise write.error
+        return write.result
+
+    def _ensure_writer(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="write-behind", daemon=True
+                )
+                self._thread.start()
+
+    def _take_batch(self) -> list[PendingWrite]:
+        pending = [self._queue.get()]
+        while len(pending) < self.max_batch:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        with self._lock:
+            batch = [write for write in pending if write.state == "queued"]
+            for write in batch:
+                write.state = "running"
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                continue
+            try:
+                self._commit(batch)
+            finally:
+                for write in batch:
+                    write.state = "done"
+                    write.done.set()
+
+    def _commit(self, batch: list[PendingWrite]) -> None:
+        try:
+            with transaction.atomic():
+                for kind, writer in WRITERS.items():
+                    group = [write for write in batch if write.kind == kind]
+                    if group:
+                        results = writer([write.payload for write in group])
+                        for write, result in zip(group, results):
+                            write.result = result
+        except Exception:
+            connection.close()
+            # Ошибка одной записи не должна отменять остальные: повторяем по одной.
+            for write in batch:
+                if write.kind == "entry":
+                    write.payload.pk = None
+                    write.payload._state.adding = True
+                try:
+                    with transaction.atomic():
+                        write.result = WRITERS[write.kind]([write.payload])[0]
+                    write.error = None
+                except Exception as exc:
+                    write.error = exc
+                    connection.close()
+        self.batches += 1
+        self.writes += len(batch)
+
+
+QUEUE = WriteBehindQueue()
+
+
+def save_entry(entry: ProductionEntry) -> ProductionEntry:
+    if not settings.WRITE_BEHIND:
+        entry.save()
+        return entry
+    return QUEUE.submit("entry", entry, settings.WRITE_BEHIND_TIMEOUT)
+
+
+def report_defects(**report: Any) -> ToolIssue:
+    if not settings.WRITE_BEHIND:
+        return inventory.report_defects(**report)
+    return QUEUE.submit("issue", report, settings.WRITE_BEHIND_TIMEOUT)